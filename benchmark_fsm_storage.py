@@ -0,0 +1,69 @@
+"""Benchmark FSM storage overhead per update: SQLiteStorage vs aiogram's MemoryStorage."""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from database.db import Database
+from bot.utils.fsm_storage import SQLiteStorage
+
+
+async def simulate_update(storage: BaseStorage, key: StorageKey, step: int) -> None:
+    """Storage calls of a typical conversation step: read the state, read and update the data, move on."""
+    await storage.get_state(key)
+    await storage.get_data(key)
+    await storage.set_data(key, {'challenge_id': step, 'language': 'python'})
+    await storage.set_state(key, f"Submission:step_{step % 3}")
+
+
+async def run(storage: BaseStorage, users: int, updates: int, hot_share: float) -> list:
+    """Replay updates, most of them from a small set of active users; return per-update times in µs."""
+    rng = random.Random(42)
+    hot_users = max(1, int(users * hot_share))
+    timings = []
+    for step in range(updates):
+        # 90% of updates come from the hot set, the rest from anyone
+        user_id = rng.randrange(hot_users) if rng.random() < 0.9 else rng.randrange(users)
+        key = StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+        started = time.perf_counter()
+        await simulate_update(storage, key, step)
+        timings.append((time.perf_counter() - started) * 1e6)
+    await storage.close()
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    print(f"{name:<28} mean {statistics.fmean(timings):8.1f} µs   "
+          f"p50 {timings[len(timings) // 2]:8.1f} µs   p99 {timings[int(len(timings) * 0.99)]:8.1f} µs")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--hot-share", type=float, default=0.05, help="Share of users sending most updates")
+    parser.add_argument("--cache-size", type=int, default=10000)
+    args = parser.parse_args()
+    
+    report("MemoryStorage", await run(MemoryStorage(), args.users, args.updates, args.hot_share))
+    
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "bench.db"))
+        await db.init_db()
+        
+        cold = SQLiteStorage(db, cache_size=args.cache_size)
+        report("SQLiteStorage (cold cache)", await run(cold, args.users, args.updates, args.hot_share))
+        # Same conversations again, now read from the database on a cache miss
+        warm = SQLiteStorage(db, cache_size=args.cache_size)
+        report("SQLiteStorage (restarted)", await run(warm, args.users, args.updates, args.hot_share))
+        tiny = SQLiteStorage(db, cache_size=100)
+        report("SQLiteStorage (cache 100)", await run(tiny, args.users, args.updates, args.hot_share))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
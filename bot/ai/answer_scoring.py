@@ -0,0 +1,192 @@
+"""Local scoring of interview answers against the model answers."""
+import asyncio
+import logging
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from bot.utils.question_store import InterviewQuestionStore, question_store
+from bot.config import (
+    INTERVIEW_MIN_ANSWER_WORDS, INTERVIEW_COPY_SIMILARITY, INTERVIEW_KEY_TERMS,
+    INTERVIEW_SCORING_CACHE_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_SCORE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:/|out of)\s*10\b", re.IGNORECASE)
+
+_STOPWORDS = frozenset("""
+a an the and or but if then else of to in on at by for with from into over as is are was were be
+been being it its this that these those there their they them we you your i he she his her not no
+can could should would will may might must do does did done has have had so such than too very
+also just only more most some any each all both either when where which who whom what how why
+use used using uses like e g i e etc one two about via while
+""".split())
+
+
+def answer_terms(text: str) -> List[str]:
+    """
+    Split an answer into lowercase terms.
+    
+    Stopwords are dropped and a trailing plural "s" is removed so
+    "queues" and "queue" count as the same term.
+    
+    Args:
+        text: Answer text
+    
+    Returns:
+        List of terms
+    """
+    terms = []
+    for word in _WORD.findall((text or "").lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class AnswerScorer:
+    """TF-IDF and key-term coverage model built once over the question bank.
+    
+    Only the IDF table is kept for the whole bank; the vector and key terms
+    of a model answer are computed when first needed and kept in a small
+    LRU cache, so scoring an answer is one sparse dot product.
+    """
+    
+    def __init__(self, store: Optional[InterviewQuestionStore] = None,
+                 cache_size: int = INTERVIEW_SCORING_CACHE_SIZE):
+        self.store = store if store is not None else question_store
+        self.cache_size = cache_size
+        self.idf: Dict[str, float] = {}
+        self.documents = 0
+        # question_id -> (reference vector, key terms)
+        self._references: OrderedDict = OrderedDict()
+        self._version = None
+        self._lock = asyncio.Lock()
+    
+    async def load(self) -> None:
+        """Build the model, or rebuild it after the question bank changed."""
+        await self.store.load()
+        async with self._lock:
+            if self._version == self.store.version:
+                return
+            version = self.store.version
+            # Tokenizing a large bank takes a while; keep the event loop free
+            self.idf, self.documents = await asyncio.to_thread(self.build, self.store.answers())
+            self._references.clear()
+            self._version = version
+            logger.info("Answer scoring model built: %d questions, %d terms", self.documents, len(self.idf))
+    
+    @staticmethod
+    def build(answers: List[str]) -> Tuple[Dict[str, float], int]:
+        """
+        Compute smoothed IDF weights over model answers.
+        
+        Args:
+            answers: Model answers of the question bank
+        
+        Returns:
+            (term -> IDF, number of answers)
+        """
+        document_frequency: Counter = Counter()
+        for answer in answers:
+            document_frequency.update(set(answer_terms(answer)))
+        
+        total = len(answers)
+        idf = {
+            term: math.log((1 + total) / (1 + frequency)) + 1.0
+            for term, frequency in document_frequency.items()
+        }
+        return idf, total
+    
+    def _vector(self, counts: Counter) -> Dict[str, float]:
+        """Turn term counts into a unit-length TF-IDF vector."""
+        # Terms unseen in the bank get the highest IDF
+        default_idf = math.log(1 + self.documents) + 1.0
+        vector = {
+            term: (1.0 + math.log(count)) * self.idf.get(term, default_idf)
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {term: weight / norm for term, weight in vector.items()} if norm else {}
+    
+    def _reference(self, question: Dict[str, Any]) -> Tuple[Dict[str, float], List[str]]:
+        """Get the vector and key terms of a model answer."""
+        cached = self._references.get(question['id'])
+        if cached is not None:
+            self._references.move_to_end(question['id'])
+            return cached
+        
+        vector = self._vector(Counter(answer_terms(question['answer'])))
+        key_terms = sorted(vector, key=lambda term: (-vector[term], term))[:INTERVIEW_KEY_TERMS]
+        self._references[question['id']] = (vector, key_terms)
+        if len(self._references) > self.cache_size:
+            self._references.popitem(last=False)
+        return vector, key_terms
+    
+    def score(self, question: Dict[str, Any], answer: str) -> Dict[str, Any]:
+        """
+        Compare an answer with the model answer of a question.
+        
+        Args:
+            question: Interview question row
+            answer: User's answer
+        
+        Returns:
+            Dict with 'words', 'similarity' (TF-IDF cosine, 0-1),
+            'coverage' (share of key terms used, 0-1), 'missing' key terms,
+            'score' (0-10) and 'trivial' ("empty", "too_short", "copied"
+            or None when the answer deserves an AI evaluation)
+        """
+        words = len((answer or "").split())
+        terms = answer_terms(answer)
+        vector = self._vector(Counter(terms))
+        reference, key_terms = self._reference(question)
+        similarity = sum(weight * reference.get(term, 0.0) for term, weight in vector.items())
+        
+        used = set(terms)
+        missing = [term for term in key_terms if term not in used]
+        coverage = 1.0 - len(missing) / len(key_terms) if key_terms else 0.0
+        
+        if not terms:
+            trivial = "empty"
+        elif words < INTERVIEW_MIN_ANSWER_WORDS:
+            trivial = "too_short"
+        elif similarity >= INTERVIEW_COPY_SIMILARITY:
+            trivial = "copied"
+        else:
+            trivial = None
+        
+        return {
+            'words': words,
+            'similarity': similarity,
+            'coverage': coverage,
+            'missing': missing,
+            'score': round(10 * (0.6 * coverage + 0.4 * similarity)),
+            'trivial': trivial
+        }
+
+
+def evaluation_score(text: str) -> Optional[int]:
+    """Get the "N/10" score from an AI evaluation, or None if there is none."""
+    match = _SCORE.search(text or "")
+    if not match:
+        return None
+    return max(0, min(10, round(float(match.group(1)))))
+
+
+def format_precheck(result: Dict[str, Any]) -> str:
+    """Describe a local score for the evaluation prompt."""
+    text = (
+        f"Local score {result['score']}/10: similarity to the reference answer "
+        f"{result['similarity']:.0%}, key term coverage {result['coverage']:.0%}"
+    )
+    if result['missing']:
+        text += f"; key terms not mentioned: {', '.join(result['missing'])}"
+    return text
+
+
+answer_scorer = AnswerScorer()
@@ -0,0 +1,52 @@
+"""Diffs between consecutive submissions for incremental reviews."""
+import difflib
+from typing import Optional
+from bot.ai.token_budget import estimate_tokens
+from bot.config import INCREMENTAL_REVIEW_MAX_CHANGED_RATIO, AI_DIFF_TOKEN_BUDGET
+
+# Unchanged lines shown around each change
+DIFF_CONTEXT_LINES = 3
+
+
+def _lines(code: str) -> list:
+    """Split code into lines, ignoring trailing whitespace."""
+    return [line.rstrip() for line in code.strip("\n").splitlines()]
+
+
+def changed_ratio(previous: str, current: str) -> float:
+    """
+    Get the share of lines that differ between two versions.
+    
+    Args:
+        previous: Previously submitted code
+        current: Newly submitted code
+    
+    Returns:
+        0.0 for identical code up to 1.0 for completely different code
+    """
+    return 1.0 - difflib.SequenceMatcher(None, _lines(previous), _lines(current), autojunk=False).ratio()
+
+
+def review_diff(previous: str, current: str) -> Optional[str]:
+    """
+    Build a unified diff for an incremental review.
+    
+    Args:
+        previous: Previously submitted code
+        current: Newly submitted code
+    
+    Returns:
+        Diff text, or None if a full review fits better: nothing changed,
+        too large a share of the code changed, or the diff is over
+        AI_DIFF_TOKEN_BUDGET
+    """
+    if changed_ratio(previous, current) > INCREMENTAL_REVIEW_MAX_CHANGED_RATIO:
+        return None
+    
+    diff = "\n".join(difflib.unified_diff(
+        _lines(previous), _lines(current),
+        fromfile="previous", tofile="current", n=DIFF_CONTEXT_LINES, lineterm=""
+    ))
+    if not diff or estimate_tokens(diff) > AI_DIFF_TOKEN_BUDGET:
+        return None
+    return diff
@@ -0,0 +1,242 @@
+"""Local stand-in for the Mistral API, used for load and latency testing.
+
+FakeMistralTransport plugs into the httpx client used by the Mistral SDK,
+so MistralAIClient runs unchanged while no request leaves the machine.
+Set MISTRAL_FAKE=1 to run the bot against it, or benchmark the client with:
+
+    python -m bot.ai.fake_mistral --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import AsyncIterator, Dict, Optional
+import httpx
+from bot.ai.token_budget import estimate_tokens
+from bot.config import (
+    MISTRAL_FAKE_SEED, MISTRAL_FAKE_TTFT_MS, MISTRAL_FAKE_LATENCY_SIGMA,
+    MISTRAL_FAKE_TOKENS_PER_SECOND, MISTRAL_FAKE_ERROR_RATE,
+    MISTRAL_FAKE_RATE_LIMIT_RATE, MISTRAL_FAKE_RATE_LIMIT_BURST_SECONDS
+)
+
+_WORDS = (
+    "✅ the solution looks correct and handles edge cases 💡 consider a clearer "
+    "variable name ⚡ complexity is linear in the input size 🎯 follows common "
+    "conventions 📝 add a check for empty input and keep going"
+).split()
+
+# Tokens sent per streamed chunk
+_TOKENS_PER_CHUNK = 4
+
+
+def _fake_text(prompt: str, tokens: int) -> str:
+    """Build a deterministic response of roughly `tokens` tokens for a prompt."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    text = " ".join(rng.choice(_WORDS) for _ in range(tokens))
+    
+    # Review prompts ask for a JSON verdict before the text
+    if '"verdict"' in prompt:
+        verdict = {"verdict": rng.choice(("pass", "fail")), "score": rng.randint(0, 10), "issues": []}
+        text = f"```json\n{json.dumps(verdict)}\n```\n{text}"
+    return text
+
+
+class FakeMistralTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering chat completion and model list requests locally.
+    
+    Each request gets its own random generator seeded with the seed and the
+    request number, so a run with the same arrival order is reproducible.
+    Responses depend only on the prompt.
+    """
+    
+    def __init__(self, seed: int = MISTRAL_FAKE_SEED,
+                 ttft_ms: float = MISTRAL_FAKE_TTFT_MS,
+                 latency_sigma: float = MISTRAL_FAKE_LATENCY_SIGMA,
+                 tokens_per_second: float = MISTRAL_FAKE_TOKENS_PER_SECOND,
+                 error_rate: float = MISTRAL_FAKE_ERROR_RATE,
+                 rate_limit_rate: float = MISTRAL_FAKE_RATE_LIMIT_RATE,
+                 rate_limit_burst_seconds: float = MISTRAL_FAKE_RATE_LIMIT_BURST_SECONDS):
+        self.seed = seed
+        self.ttft_ms = ttft_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rate_limit_burst_seconds = rate_limit_burst_seconds
+        self.requests = 0
+        self.responses: Counter = Counter()
+        self._burst_until = 0.0
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.rstrip("/")
+        if request.method == "GET" and path.endswith("/models"):
+            return self._json(200, {"object": "list", "data": []})
+        if request.method == "POST" and path.endswith("/chat/completions"):
+            body = json.loads(await request.aread())
+            return await self._chat(request, body)
+        return self._json(404, {"message": f"Not found: {path}"})
+    
+    def _json(self, status: int, data: Dict, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        self.responses[status] += 1
+        return httpx.Response(status, json=data, headers=headers)
+    
+    @staticmethod
+    def _read_timeout(request: httpx.Request) -> Optional[float]:
+        return request.extensions.get("timeout", {}).get("read")
+    
+    async def _wait(self, request: httpx.Request, seconds: float) -> None:
+        """Sleep, failing like a real connection if the read timeout is shorter."""
+        timeout = self._read_timeout(request)
+        if timeout is not None and seconds > timeout:
+            await asyncio.sleep(timeout)
+            raise httpx.ReadTimeout("Fake Mistral read timed out", request=request)
+        await asyncio.sleep(seconds)
+    
+    async def _chat(self, request: httpx.Request, body: Dict) -> httpx.Response:
+        rng = random.Random(f"{self.seed}:{self.requests}")
+        self.requests += 1
+        
+        # 429s come in bursts, like a provider-side rate limit window
+        now = time.monotonic()
+        if now >= self._burst_until and rng.random() < self.rate_limit_rate:
+            self._burst_until = now + self.rate_limit_burst_seconds
+        if now < self._burst_until:
+            retry_after = str(math.ceil(self._burst_until - now))
+            return self._json(429, {"message": "Requests rate limit exceeded"}, {"Retry-After": retry_after})
+        
+        if rng.random() < self.error_rate:
+            await self._wait(request, rng.uniform(0.05, 0.5))
+            return self._json(rng.choice((500, 503)), {"message": "Internal server error"})
+        
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        max_tokens = body.get("max_tokens") or 1000
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": max(1, int(max_tokens * rng.uniform(0.3, 0.9)))
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        text = _fake_text(prompt, usage["completion_tokens"])
+        ttft = rng.lognormvariate(math.log(self.ttft_ms / 1000), self.latency_sigma)
+        model = body.get("model", "fake")
+        
+        if body.get("stream"):
+            self.responses[200] += 1
+            return httpx.Response(
+                200,
+                headers={"Content-Type": "text/event-stream"},
+                content=self._events(request, model, text, usage, ttft)
+            )
+        
+        await self._wait(request, ttft + usage["completion_tokens"] / self.tokens_per_second)
+        return self._json(200, {
+            "id": f"fake-{self.requests}",
+            "object": "chat.completion",
+            "model": model,
+            "created": int(time.time()),
+            "usage": usage,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }]
+        })
+    
+    async def _events(self, request: httpx.Request, model: str, text: str,
+                      usage: Dict[str, int], ttft: float) -> AsyncIterator[bytes]:
+        """Stream the response as server-sent events at the configured token rate."""
+        words = text.split(" ")
+        chunk_id = f"fake-{self.requests}"
+        await self._wait(request, ttft)
+        for start in range(0, len(words), _TOKENS_PER_CHUNK):
+            if start:
+                await self._wait(request, _TOKENS_PER_CHUNK / self.tokens_per_second)
+            content = " ".join(words[start:start + _TOKENS_PER_CHUNK])
+            last = start + _TOKENS_PER_CHUNK >= len(words)
+            chunk = {
+                "id": chunk_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "created": int(time.time()),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": content if not start else " " + content},
+                    "finish_reason": "stop" if last else None
+                }]
+            }
+            if last:
+                chunk["usage"] = usage
+            yield f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+
+async def _benchmark(requests: int, concurrency: int, transport: FakeMistralTransport) -> None:
+    """Send review requests through MistralAIClient and print latency stats."""
+    from database.db import Database
+    from bot.ai.metrics import ai_metrics
+    from bot.ai.mistral_client import MistralAIClient
+    from bot.ai.quota import ai_quota
+    
+    # Keep benchmark metrics and quota usage out of the bot's database
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    await db.init_db()
+    ai_metrics.db = ai_quota.db = db
+    
+    client = MistralAIClient(transport=transport)
+    semaphore = asyncio.Semaphore(concurrency)
+    code = "def two_sum(nums, target):\n    seen = {}\n    for i, n in enumerate(nums):\n" \
+           "        if target - n in seen:\n            return [seen[target - n], i]\n        seen[n] = i\n"
+    
+    async def one(index: int) -> None:
+        queued = time.perf_counter()
+        async with semaphore:
+            wait_ms = (time.perf_counter() - queued) * 1000
+            await client.review_code(code + f"# {index}\n", "python", "Two Sum", queue_wait_ms=wait_ms)
+    
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i) for i in range(requests)))
+    finally:
+        await client.close()
+    elapsed = time.perf_counter() - started
+    
+    print(f"{requests} requests, concurrency {concurrency}: {elapsed:.1f} s ({requests / elapsed:.1f} req/s)")
+    print(f"HTTP responses: {dict(transport.responses)}")
+    for row in ai_metrics.summary():
+        print(
+            f"{row['method']}: ok={row['ok']} error={row['error']} timeout={row['timeout']} "
+            f"rate_limited={row['rate_limited']} | total p50/p95/p99 = "
+            f"{row['p50']:.0f}/{row['p95']:.0f}/{row['p99']:.0f} ms | "
+            f"ttft p50/p95 = {row['ttft_p50']:.0f}/{row['ttft_p95']:.0f} ms | "
+            f"wait p95 = {row['wait_p95']:.0f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the AI client against a local Mistral stand-in")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=MISTRAL_FAKE_SEED)
+    parser.add_argument("--ttft-ms", type=float, default=MISTRAL_FAKE_TTFT_MS)
+    parser.add_argument("--tokens-per-second", type=float, default=MISTRAL_FAKE_TOKENS_PER_SECOND)
+    parser.add_argument("--error-rate", type=float, default=MISTRAL_FAKE_ERROR_RATE)
+    parser.add_argument("--rate-limit-rate", type=float, default=MISTRAL_FAKE_RATE_LIMIT_RATE)
+    args = parser.parse_args()
+    
+    transport = FakeMistralTransport(
+        seed=args.seed,
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    )
+    asyncio.run(_benchmark(args.requests, args.concurrency, transport))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Tiered challenge hints generated ahead of time."""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional
+from database.db import Database
+from bot.ai.mistral_client import ai_client
+from bot.ai.prompts import HINT_LEVELS
+from bot.config import HINT_PREGENERATION_ENABLED, HINT_PREGENERATION_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+
+class HintGenerator:
+    """Generates and stores nudge -> approach -> near-solution hints per challenge."""
+    
+    def __init__(self, db: Optional[Database] = None,
+                 concurrency: int = HINT_PREGENERATION_CONCURRENCY):
+        self.db = db or Database()
+        self.levels = len(HINT_LEVELS)
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+    
+    def _lock(self, challenge_id: int) -> asyncio.Lock:
+        if challenge_id not in self._locks:
+            self._locks[challenge_id] = asyncio.Lock()
+        return self._locks[challenge_id]
+    
+    async def generate_level(self, challenge: Dict[str, Any], level: int,
+                             user_id: Optional[int] = None) -> str:
+        """
+        Get a hint of the given level, generating and storing it if missing.
+        
+        Later tiers build on earlier ones, so missing lower tiers are
+        generated (and stored) first.
+        
+        Args:
+            challenge: Challenge row
+            level: Hint tier (1..len(HINT_LEVELS))
+            user_id: User waiting for the hint, None for pre-generation
+        
+        Returns:
+            Hint text, or an error message starting with "❌"
+        """
+        # Concurrent callers for the same challenge wait for one generation
+        async with self._lock(challenge['id']):
+            hints = await self.db.get_challenge_hints(challenge['id'])
+            while len(hints) < level:
+                hint = await ai_client.generate_hint(
+                    challenge['description'], challenge['language'], level=len(hints) + 1,
+                    previous_hints=hints, user_id=user_id
+                )
+                if hint.startswith("❌"):
+                    return hint
+                await self.db.save_challenge_hint(challenge['id'], len(hints) + 1, hint)
+                hints.append(hint)
+            return hints[level - 1]
+    
+    async def generate(self, challenge_id: int) -> int:
+        """
+        Generate all missing hint levels for a challenge.
+        
+        Args:
+            challenge_id: Challenge ID
+        
+        Returns:
+            Number of stored hint levels
+        """
+        async with self._semaphore:
+            challenge = await self.db.get_challenge(challenge_id)
+            if not challenge:
+                return 0
+            
+            for level in range(1, self.levels + 1):
+                hint = await self.generate_level(challenge, level)
+                if hint.startswith("❌"):
+                    logger.warning("Hint %d for challenge %s failed: %s", level, challenge_id, hint)
+                    return level - 1
+            return self.levels
+    
+    def schedule(self, challenge_ids: Iterable[int]) -> None:
+        """Generate hints for challenges in the background."""
+        if not HINT_PREGENERATION_ENABLED:
+            return
+        for challenge_id in challenge_ids:
+            task = asyncio.create_task(self.generate(challenge_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def start(self) -> None:
+        """Schedule generation for challenges that don't have a full set of hints yet."""
+        missing = await self.db.get_challenges_missing_hints(self.levels)
+        if missing and HINT_PREGENERATION_ENABLED:
+            logger.info("Pre-generating hints for %d challenges", len(missing))
+        self.schedule(missing)
+    
+    async def stop(self) -> None:
+        """Cancel pending generation; it resumes on next start."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+hint_generator = HintGenerator()
@@ -0,0 +1,129 @@
+"""Latency and token accounting for AI calls."""
+import bisect
+import logging
+from typing import Dict, List, Optional, Tuple
+from database.db import Database
+from bot.config import AI_METRICS_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in ms: 10 ms .. ~3 min, growing by 25% per bucket
+_BUCKET_BOUNDS = [10 * 1.25 ** i for i in range(45)]
+
+# Prune old rows from SQLite once per this many recorded calls
+_PRUNE_EVERY = 500
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations in milliseconds."""
+    
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.total = 0
+        self.max = 0.0
+    
+    def observe(self, value_ms: float) -> None:
+        """Add a single observation."""
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, value_ms)] += 1
+        self.total += 1
+        self.max = max(self.max, value_ms)
+    
+    def percentile(self, p: float) -> float:
+        """
+        Estimate a percentile from the buckets.
+        
+        Args:
+            p: Percentile between 0 and 100
+        
+        Returns:
+            Upper bound of the bucket holding the percentile, in ms
+        """
+        if not self.total:
+            return 0.0
+        rank = max(1, int(round(self.total * p / 100)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = _BUCKET_BOUNDS[index] if index < len(_BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+
+class AIMetrics:
+    """In-memory registry of AI call metrics, mirrored to SQLite."""
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.calls: Dict[str, Dict[str, int]] = {}
+        self._recorded = 0
+    
+    def _histogram(self, method: str, metric: str) -> LatencyHistogram:
+        key = (method, metric)
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        return self.histograms[key]
+    
+    async def record(self, method: str, model: str, outcome: str, queue_wait_ms: float,
+                     ttft_ms: Optional[float], total_ms: float,
+                     prompt_tokens: int, completion_tokens: int) -> None:
+        """
+        Record a finished AI call.
+        
+        Args:
+            method: Client method (review_code, evaluate_interview_answer, generate_hint)
+            model: Model name
+            outcome: "ok", "timeout", "rate_limited" or "error"
+            queue_wait_ms: Time the request waited before the call started
+            ttft_ms: Time to first streamed token, None if nothing arrived
+            total_ms: Total call latency
+            prompt_tokens: Prompt tokens reported by the API
+            completion_tokens: Completion tokens reported by the API
+        """
+        self._histogram(method, "total").observe(total_ms)
+        self._histogram(method, "queue_wait").observe(queue_wait_ms)
+        if ttft_ms is not None:
+            self._histogram(method, "ttft").observe(ttft_ms)
+        
+        counters = self.calls.setdefault(method, {
+            "ok": 0, "error": 0, "timeout": 0, "rate_limited": 0,
+            "prompt_tokens": 0, "completion_tokens": 0
+        })
+        counters[outcome] = counters.get(outcome, 0) + 1
+        counters["prompt_tokens"] += prompt_tokens
+        counters["completion_tokens"] += completion_tokens
+        
+        # Metrics must never break the AI call itself
+        try:
+            await self.db.add_ai_call(
+                method, model, outcome, queue_wait_ms, ttft_ms, total_ms,
+                prompt_tokens, completion_tokens
+            )
+            self._recorded += 1
+            if self._recorded % _PRUNE_EVERY == 0:
+                await self.db.prune_ai_calls(AI_METRICS_RETENTION_DAYS)
+        except Exception:
+            logger.exception("Failed to store AI call metrics")
+    
+    def summary(self) -> List[Dict[str, float]]:
+        """Get per-method call counts and latency percentiles since startup."""
+        rows = []
+        for method, counters in sorted(self.calls.items()):
+            total = self._histogram(method, "total")
+            ttft = self._histogram(method, "ttft")
+            wait = self._histogram(method, "queue_wait")
+            rows.append({
+                "method": method,
+                **counters,
+                "p50": total.percentile(50),
+                "p95": total.percentile(95),
+                "p99": total.percentile(99),
+                "ttft_p50": ttft.percentile(50),
+                "ttft_p95": ttft.percentile(95),
+                "wait_p95": wait.percentile(95)
+            })
+        return rows
+
+
+ai_metrics = AIMetrics()
@@ -1,17 +1,169 @@
 """Mistral AI client for code review and feedback."""
+import importlib.util
+import logging
+import time
+from typing import Any, Dict, List, Optional
+import httpx
 from mistralai import Mistral
-from bot.config import MISTRAL_API_KEY, MISTRAL_MODEL, MISTRAL_MAX_TOKENS, MISTRAL_TEMPERATURE
-from bot.ai.prompts import CODE_REVIEW_PROMPT, INTERVIEW_EVALUATION_PROMPT
+from mistralai.models import SDKError
+from bot.config import (
+    MISTRAL_API_KEY, MISTRAL_MODEL, MISTRAL_MAX_TOKENS, MISTRAL_TEMPERATURE,
+    AI_CODE_TOKEN_BUDGET, AI_DESCRIPTION_TOKEN_BUDGET, AI_ANSWER_TOKEN_BUDGET,
+    AI_PREVIOUS_FEEDBACK_TOKEN_BUDGET,
+    MISTRAL_POOL_SIZE, MISTRAL_KEEPALIVE_SECONDS, MISTRAL_CONNECT_TIMEOUT,
+    MISTRAL_READ_TIMEOUT, MISTRAL_HTTP2, MISTRAL_FAKE
+)
+from bot.ai.fake_mistral import FakeMistralTransport
+from bot.ai.metrics import ai_metrics
+from bot.ai.quota import ai_quota
+from bot.ai.verdict import parse_review
+from bot.ai.prompts import (
+    CODE_REVIEW_PROMPT, INCREMENTAL_REVIEW_PROMPT, INTERVIEW_EVALUATION_PROMPT,
+    HINT_PROMPT, HINT_LEVELS
+)
+from bot.ai.token_budget import (
+    estimate_tokens, fit_code, truncate_head_tail, response_token_budget
+)
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional "h2" package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class _PooledAsyncClient(httpx.AsyncClient):
+    """AsyncClient that keeps its configured timeouts.
+    
+    The SDK passes timeout=None on every request when no SDK-level timeout
+    is set, which httpx reads as "no timeout at all".
+    """
+    
+    def build_request(self, *args, timeout=httpx.USE_CLIENT_DEFAULT, **kwargs) -> httpx.Request:
+        if timeout is None:
+            timeout = httpx.USE_CLIENT_DEFAULT
+        return super().build_request(*args, timeout=timeout, **kwargs)
+
+
+def _create_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """Create the pooled HTTP client shared by all AI requests."""
+    return _PooledAsyncClient(
+        transport=transport,
+        http2=MISTRAL_HTTP2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=MISTRAL_POOL_SIZE,
+            max_keepalive_connections=MISTRAL_POOL_SIZE,
+            keepalive_expiry=MISTRAL_KEEPALIVE_SECONDS
+        ),
+        timeout=httpx.Timeout(
+            MISTRAL_READ_TIMEOUT,
+            connect=MISTRAL_CONNECT_TIMEOUT,
+            pool=MISTRAL_CONNECT_TIMEOUT
+        )
+    )
 
 
 class MistralAIClient:
     """Client for interacting with Mistral AI API."""
     
-    def __init__(self):
-        self.client = Mistral(api_key=MISTRAL_API_KEY)
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        if transport is None and MISTRAL_FAKE:
+            logger.warning("MISTRAL_FAKE is set: AI requests are answered by a local stand-in")
+            transport = FakeMistralTransport()
+        self.http_client = _create_http_client(transport)
+        self.client = Mistral(api_key=MISTRAL_API_KEY, async_client=self.http_client)
         self.model = MISTRAL_MODEL
     
-    async def review_code(self, code: str, language: str, challenge_description: str) -> str:
+    async def warm_up(self) -> None:
+        """Open a connection to the API ahead of the first user request."""
+        try:
+            await self.client.models.list_async()
+            logger.info("Mistral connection ready (http2=%s)", MISTRAL_HTTP2 and HTTP2_AVAILABLE)
+        except Exception as e:
+            logger.warning("Mistral warm-up failed: %s", e)
+    
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self.http_client.aclose()
+        self.client.sdk_configuration.client.close()
+    
+    async def _complete(self, method: str, prompt: str, raw_tokens: int,
+                        max_tokens: int, temperature: float, queue_wait_ms: float = 0.0,
+                        user_id: Optional[int] = None) -> str:
+        """
+        Send a single-message chat request with a sized response budget.
+        
+        The response is streamed so time to first token can be measured;
+        latency and token usage are recorded in ai_metrics and counted
+        against the user's quota in ai_quota.
+        
+        Args:
+            method: Name of the calling method (for logging and metrics)
+            prompt: Compacted prompt
+            raw_tokens: Estimated prompt size before compaction
+            max_tokens: Desired response size
+            temperature: Sampling temperature
+            queue_wait_ms: Time the request spent queued before this call
+            user_id: User the request is made for, None for system calls
+        
+        Returns:
+            Response text
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        response_tokens = response_token_budget(prompt_tokens, max_tokens)
+        logger.info(
+            "%s: prompt ~%d tokens (~%d before compaction), max_tokens=%d",
+            method, prompt_tokens, raw_tokens, response_tokens
+        )
+        
+        await ai_quota.add_request(user_id)
+        started = time.perf_counter()
+        ttft_ms = None
+        usage = None
+        outcome = "error"
+        parts = []
+        try:
+            stream = await self.client.chat.stream_async(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=response_tokens,
+                temperature=temperature
+            )
+            async with stream as events:
+                async for event in events:
+                    chunk = event.data
+                    if chunk.usage:
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if isinstance(content, list):
+                        content = "".join(getattr(part, "text", "") for part in content)
+                    if content:
+                        if ttft_ms is None:
+                            ttft_ms = (time.perf_counter() - started) * 1000
+                        parts.append(content)
+            outcome = "ok"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        except SDKError as e:
+            if e.status_code == 429:
+                outcome = "rate_limited"
+            raise
+        finally:
+            if usage:
+                await ai_quota.add_tokens(user_id, usage.prompt_tokens + usage.completion_tokens)
+            await ai_metrics.record(
+                method, self.model, outcome, queue_wait_ms, ttft_ms,
+                (time.perf_counter() - started) * 1000,
+                usage.prompt_tokens if usage else 0,
+                usage.completion_tokens if usage else 0
+            )
+        
+        return "".join(parts)
+    
+    async def review_code(self, code: str, language: str, challenge_description: str,
+                          queue_wait_ms: float = 0.0, user_id: Optional[int] = None) -> Dict[str, Any]:
         """
         Review submitted code and provide feedback.
         
@@ -19,84 +171,146 @@ class MistralAIClient:
             code: The code to review
             language: Programming language
             challenge_description: Description of the challenge
-            
+            queue_wait_ms: Time the submission waited in the review queue
+            user_id: Submitting user (for quota accounting)
+        
         Returns:
-            AI-generated feedback
+            Dict with 'feedback' (review text) and 'verdict' (see
+            bot.ai.verdict.validate_verdict; None if missing or invalid)
         """
         try:
+            raw_tokens = estimate_tokens(CODE_REVIEW_PROMPT) + estimate_tokens(code) \
+                + estimate_tokens(challenge_description)
             prompt = CODE_REVIEW_PROMPT.format(
                 language=language,
-                challenge=challenge_description,
-                code=code
+                challenge=truncate_head_tail(challenge_description, AI_DESCRIPTION_TOKEN_BUDGET),
+                code=fit_code(code, language, AI_CODE_TOKEN_BUDGET)
             )
             
-            response = await self.client.chat.complete_async(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=MISTRAL_MAX_TOKENS,
-                temperature=MISTRAL_TEMPERATURE
+            response = await self._complete(
+                "review_code", prompt, raw_tokens, MISTRAL_MAX_TOKENS, MISTRAL_TEMPERATURE,
+                queue_wait_ms, user_id
+            )
+        
+        except Exception as e:
+            return {"feedback": f"❌ Error during code review: {str(e)}", "verdict": None}
+        
+        verdict, feedback = parse_review(response)
+        if verdict is None:
+            logger.warning("review_code: response had no valid verdict")
+        return {"feedback": feedback, "verdict": verdict}
+    
+    async def review_changes(self, diff: str, language: str, challenge_description: str,
+                             previous_feedback: str, queue_wait_ms: float = 0.0,
+                             user_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Review a resubmission as a diff against the previously reviewed attempt.
+        
+        Args:
+            diff: Unified diff from the previous attempt to the new code
+            language: Programming language
+            challenge_description: Description of the challenge
+            previous_feedback: Review of the previous attempt
+            queue_wait_ms: Time the submission waited in the review queue
+            user_id: Submitting user (for quota accounting)
+        
+        Returns:
+            Dict with 'feedback' and 'verdict', as returned by review_code
+        """
+        try:
+            raw_tokens = estimate_tokens(INCREMENTAL_REVIEW_PROMPT) + estimate_tokens(diff) \
+                + estimate_tokens(challenge_description) + estimate_tokens(previous_feedback)
+            prompt = INCREMENTAL_REVIEW_PROMPT.format(
+                language=language,
+                challenge=truncate_head_tail(challenge_description, AI_DESCRIPTION_TOKEN_BUDGET),
+                previous_feedback=truncate_head_tail(previous_feedback, AI_PREVIOUS_FEEDBACK_TOKEN_BUDGET),
+                diff=diff
             )
             
-            return response.choices[0].message.content
+            # A review of the changes needs far less room than a full one
+            response = await self._complete(
+                "review_changes", prompt, raw_tokens, MISTRAL_MAX_TOKENS // 2, MISTRAL_TEMPERATURE,
+                queue_wait_ms, user_id
+            )
         
         except Exception as e:
-            return f"❌ Error during code review: {str(e)}"
+            return {"feedback": f"❌ Error during code review: {str(e)}", "verdict": None}
+        
+        verdict, feedback = parse_review(response)
+        if verdict is None:
+            logger.warning("review_changes: response had no valid verdict")
+        return {"feedback": feedback, "verdict": verdict}
     
-    async def evaluate_interview_answer(self, question: str, user_answer: str) -> str:
+    async def evaluate_interview_answer(self, question: str, user_answer: str,
+                                        user_id: Optional[int] = None, reference_answer: str = "",
+                                        precheck: str = "") -> str:
         """
         Evaluate user's answer to an interview question.
         
         Args:
             question: The interview question
             user_answer: User's answer
-            
+            user_id: Answering user (for quota accounting)
+            reference_answer: Model answer from the question bank
+            precheck: Summary of the local answer score
+        
         Returns:
             AI-generated evaluation
         """
         try:
+            raw_tokens = estimate_tokens(INTERVIEW_EVALUATION_PROMPT) + estimate_tokens(question) \
+                + estimate_tokens(user_answer) + estimate_tokens(reference_answer) + estimate_tokens(precheck)
             prompt = INTERVIEW_EVALUATION_PROMPT.format(
                 question=question,
-                answer=user_answer
+                reference=truncate_head_tail(reference_answer, AI_ANSWER_TOKEN_BUDGET) or "Not available",
+                answer=truncate_head_tail(user_answer, AI_ANSWER_TOKEN_BUDGET),
+                precheck=precheck or "Not available"
             )
             
-            response = await self.client.chat.complete_async(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=MISTRAL_MAX_TOKENS,
-                temperature=MISTRAL_TEMPERATURE
+            return await self._complete(
+                "evaluate_interview_answer", prompt, raw_tokens, MISTRAL_MAX_TOKENS, MISTRAL_TEMPERATURE,
+                user_id=user_id
             )
-            
-            return response.choices[0].message.content
         
         except Exception as e:
             return f"❌ Error during evaluation: {str(e)}"
     
-    async def generate_hint(self, challenge_description: str, language: str) -> str:
+    async def generate_hint(self, challenge_description: str, language: str, level: int = 1,
+                            previous_hints: Optional[List[str]] = None,
+                            user_id: Optional[int] = None) -> str:
         """
         Generate a hint for a coding challenge.
         
         Args:
             challenge_description: Description of the challenge
             language: Programming language
-            
+            level: Hint tier, 1-based index into HINT_LEVELS
+            previous_hints: Lower-tier hints the new one should build on
+            user_id: Requesting user (for quota accounting), None for pre-generation
+        
         Returns:
             AI-generated hint
         """
         try:
-            prompt = f"""Generate a helpful hint for this coding challenge in {language}:
-
-Challenge: {challenge_description}
-
-Provide a hint that guides the user without giving away the complete solution. Focus on the approach or key concepts."""
-            
-            response = await self.client.chat.complete_async(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
-                temperature=0.8
+            title, guidance = HINT_LEVELS[level - 1]
+            previous = "\n".join(f"{i}. {hint}" for i, hint in enumerate(previous_hints or [], 1)) or "None"
+            raw_tokens = estimate_tokens(HINT_PROMPT) + estimate_tokens(challenge_description) \
+                + estimate_tokens(previous)
+            prompt = HINT_PROMPT.format(
+                level=level,
+                levels=len(HINT_LEVELS),
+                challenge=truncate_head_tail(challenge_description, AI_DESCRIPTION_TOKEN_BUDGET),
+                language=language,
+                title=title,
+                guidance=guidance,
+                previous_hints=previous
             )
             
-            return response.choices[0].message.content
+            return await self._complete("generate_hint", prompt, raw_tokens, 300, 0.8, user_id=user_id)
         
         except Exception as e:
             return f"❌ Error generating hint: {str(e)}"
+
+
+# Shared by all handlers so they use one connection pool
+ai_client = MistralAIClient()
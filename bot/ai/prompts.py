@@ -17,16 +17,49 @@ Provide a detailed review covering:
 4. 🎯 Best Practices: Does it follow language conventions?
 5. 📝 Suggestions: What could be improved?
 
-Keep your feedback constructive, encouraging, and educational. Use emojis to make it engaging.
+Start your response with a verdict in a ```json block, in exactly this shape:
+{{"verdict": "pass" or "fail", "score": 0-10, "issues": ["short issue", ...]}}
+"pass" means the code correctly solves the challenge. List at most 5 issues, each under 15 words.
+
+Then write the review. Keep your feedback constructive, encouraging, and educational. Use emojis to make it engaging.
 Format your response in a clear, structured way."""
 
+INCREMENTAL_REVIEW_PROMPT = """You are an expert code reviewer and programming mentor. The student already received a review for a previous attempt at this challenge and has now changed their code.
+
+Programming Language: {language}
+Challenge: {challenge}
+
+Summary of your previous review:
+{previous_feedback}
+
+Changes since the previous attempt (unified diff):
+```diff
+{diff}
+```
+
+Review only what changed:
+1. ✅ Correctness: Do the changes fix the issues from the previous review? Does the code now solve the problem?
+2. 🐛 New Issues: Did the changes introduce any bugs?
+3. 📝 Remaining: What from the previous review still needs attention?
+
+Start your response with a verdict in a ```json block, in exactly this shape:
+{{"verdict": "pass" or "fail", "score": 0-10, "issues": ["short issue", ...]}}
+"pass" means the changed code correctly solves the challenge. List at most 5 issues, each under 15 words.
+
+Then write the review. Don't repeat points that are no longer relevant. Keep it short, constructive, and encouraging. Use emojis to make it engaging."""
+
 INTERVIEW_EVALUATION_PROMPT = """You are a technical interviewer evaluating a candidate's answer.
 
 Question: {question}
 
+Reference Answer:
+{reference}
+
 Candidate's Answer:
 {answer}
 
+Automatic pre-check (keyword-based, use only as a hint): {precheck}
+
 Evaluate the answer based on:
 1. ✅ Correctness: Is the answer technically accurate?
 2. 💡 Completeness: Does it cover all important aspects?
@@ -36,15 +69,26 @@ Evaluate the answer based on:
 Provide constructive feedback with a score out of 10. Be encouraging but honest.
 Use emojis to make the feedback engaging."""
 
-HINT_PROMPT = """Generate a helpful hint for this coding challenge without revealing the complete solution.
+HINT_PROMPT = """Generate hint {level} of {levels} for this coding challenge without revealing the complete solution.
 
 Challenge: {challenge}
 Language: {language}
 
+This hint should be a {title}: {guidance}
+
+Hints the user has already seen:
+{previous_hints}
+
 Provide a hint that:
-- Guides the user toward the right approach
-- Mentions key concepts or algorithms
+- Builds on the earlier hints instead of repeating them
 - Doesn't give away the implementation
 - Encourages problem-solving
 
 Keep it concise and motivating."""
+
+# Hint tiers, from the gentlest to the most revealing: (title, guidance)
+HINT_LEVELS = [
+    ("nudge", "point out what to notice about the input or the goal, without naming an algorithm or data structure."),
+    ("approach", "name the technique or data structure that fits and describe the approach in plain words, without code."),
+    ("near-solution", "walk through the algorithm step by step and mention edge cases; short pseudocode is fine, working code is not.")
+]
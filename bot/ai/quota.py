@@ -0,0 +1,150 @@
+"""Per-user and global AI usage quotas with rolling windows."""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from database.db import Database
+from bot.config import (
+    AI_USER_REQUESTS_PER_HOUR, AI_USER_REQUESTS_PER_DAY, AI_USER_TOKENS_PER_DAY,
+    AI_GLOBAL_REQUESTS_PER_HOUR, AI_GLOBAL_TOKENS_PER_DAY, AI_QUOTA_CLEANUP_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_SCOPE = "global"
+
+# Window name -> (length in seconds, number of buckets)
+WINDOWS = {
+    "hour": (3600, 12),    # 5-minute buckets
+    "day": (86400, 24)     # 1-hour buckets
+}
+
+COUNTERS = [f"{metric}_{name}" for metric in ("requests", "tokens") for name in WINDOWS]
+
+
+def _bucket_seconds(counter: str) -> int:
+    length, size = WINDOWS[counter.rsplit("_", 1)[1]]
+    return length // size
+
+
+def bucket_of(counter: str, now: float) -> int:
+    """Get the bucket number of a counter ("requests_hour", ...) for `now`."""
+    return int(now // _bucket_seconds(counter))
+
+
+def oldest_bucket(counter: str, now: float) -> int:
+    """Get the first bucket number of a counter still inside its window."""
+    return bucket_of(counter, now) - WINDOWS[counter.rsplit("_", 1)[1]][1] + 1
+
+
+class AIQuota:
+    """Rolling request and token counters checked before AI calls.
+    
+    Counters are buckets in the ai_quota_buckets table, shared by every
+    process (see bot.workers): each request adds to the user's and the
+    global buckets with one atomic upsert, and checks sum the buckets
+    still inside each window, so the limits hold however many processes
+    count usage. Expired buckets are deleted every AI_QUOTA_CLEANUP_SECONDS.
+    """
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _add(self, user_id: Optional[int], metric: str, amount: int) -> None:
+        now = time.time()
+        scopes = [GLOBAL_SCOPE] if user_id is None else [GLOBAL_SCOPE, str(user_id)]
+        rows = [
+            (scope, counter, bucket_of(counter, now), amount)
+            for scope in scopes for counter in COUNTERS if counter.startswith(metric)
+        ]
+        try:
+            await self.db.add_ai_quota_buckets(rows)
+        except Exception:
+            logger.exception("Failed to count AI usage")
+    
+    async def _usage(self, scopes: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Get scope -> current rolling usage, for the given scopes or all."""
+        now = time.time()
+        oldest = {counter: oldest_bucket(counter, now) for counter in COUNTERS}
+        usage: Dict[str, Dict[str, int]] = {}
+        for scope, counter, total in await self.db.get_ai_quota_totals(oldest, scopes):
+            usage.setdefault(scope, dict.fromkeys(COUNTERS, 0))[counter] = total
+        for scope in scopes or ():
+            usage.setdefault(scope, dict.fromkeys(COUNTERS, 0))
+        return usage
+    
+    async def usage(self, user_id: Optional[int] = None) -> Dict[str, int]:
+        """Get current rolling usage for a user (or globally if user_id is None)."""
+        scope = GLOBAL_SCOPE if user_id is None else str(user_id)
+        return (await self._usage([scope]))[scope]
+    
+    async def check(self, user_id: int) -> Optional[str]:
+        """
+        Check whether a user may make another AI request.
+        
+        Args:
+            user_id: Telegram user ID
+        
+        Returns:
+            None if allowed, otherwise a message explaining which limit was hit
+        """
+        usage = await self._usage([GLOBAL_SCOPE, str(user_id)])
+        total, user = usage[GLOBAL_SCOPE], usage[str(user_id)]
+        
+        if total['requests_hour'] >= AI_GLOBAL_REQUESTS_PER_HOUR or total['tokens_day'] >= AI_GLOBAL_TOKENS_PER_DAY:
+            return "🚦 The AI mentor is very busy right now. Please try again later."
+        if user['requests_hour'] >= AI_USER_REQUESTS_PER_HOUR:
+            return f"⏳ You've used all {AI_USER_REQUESTS_PER_HOUR} AI requests for this hour. Try again a bit later!"
+        if user['requests_day'] >= AI_USER_REQUESTS_PER_DAY:
+            return f"⏳ You've used all {AI_USER_REQUESTS_PER_DAY} AI requests for today. See you tomorrow!"
+        if user['tokens_day'] >= AI_USER_TOKENS_PER_DAY:
+            return "⏳ You've reached today's AI usage limit. See you tomorrow!"
+        return None
+    
+    async def add_request(self, user_id: Optional[int]) -> None:
+        """Count one AI request for a user and globally."""
+        await self._add(user_id, "requests", 1)
+    
+    async def add_tokens(self, user_id: Optional[int], tokens: int) -> None:
+        """Count tokens used by a finished AI request."""
+        if tokens:
+            await self._add(user_id, "tokens", tokens)
+    
+    async def top_users(self, limit: int = 10) -> List[Tuple[int, Dict[str, int]]]:
+        """Get users with the highest token usage over the last day."""
+        users = [
+            (int(scope), usage) for scope, usage in (await self._usage()).items()
+            if scope != GLOBAL_SCOPE and usage['requests_day']
+        ]
+        users.sort(key=lambda item: item[1]['tokens_day'], reverse=True)
+        return users[:limit]
+    
+    async def delete_expired(self) -> None:
+        """Delete buckets that left their window."""
+        now = time.time()
+        await self.db.delete_expired_ai_quota_buckets(
+            {counter: oldest_bucket(counter, now) for counter in COUNTERS}
+        )
+    
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(AI_QUOTA_CLEANUP_SECONDS)
+            try:
+                await self.delete_expired()
+            except Exception:
+                logger.exception("Failed to delete expired AI quota counters")
+    
+    async def start(self) -> None:
+        """Start deleting expired counters periodically."""
+        self._task = asyncio.create_task(self._cleanup_loop())
+    
+    async def stop(self) -> None:
+        """Stop deleting expired counters."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+ai_quota = AIQuota()
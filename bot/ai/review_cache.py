@@ -0,0 +1,122 @@
+"""Cache of AI code reviews keyed on normalized submission code."""
+import ast
+import hashlib
+import re
+from typing import Optional, Dict, Any
+from database.db import Database
+from bot.config import REVIEW_CACHE_ENABLED, REVIEW_CACHE_MAX_AGE_DAYS
+from bot.ai.token_budget import strip_comments
+from bot.ai.verdict import verdict_from_row
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _strip_docstrings(tree: ast.AST) -> None:
+    """Remove docstrings from modules, classes and functions in place."""
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        body = node.body
+        if (body and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)):
+            node.body = body[1:] or [ast.Pass()]
+
+
+def normalize_code(code: str, language: str) -> str:
+    """
+    Normalize code so formatting-only changes map to the same text.
+    
+    Args:
+        code: Submitted source code
+        language: Programming language
+    
+    Returns:
+        Canonical form of the code
+    """
+    if language == "python":
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            # Fall back to comment/blank-line cleanup for code that does not parse
+            return strip_comments(code, language)
+        _strip_docstrings(tree)
+        return ast.dump(tree, annotate_fields=False)
+    
+    return _WHITESPACE.sub(" ", strip_comments(code, language)).strip()
+
+
+def code_hash(code: str, language: str) -> str:
+    """Get a stable hash of the normalized code."""
+    normalized = normalize_code(code, language)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ReviewCache:
+    """Lookup and storage of review results with hit-rate tracking."""
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        self.hits = 0
+        self.misses = 0
+    
+    async def get(self, challenge_id: int, language: str, code: str,
+                  count: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached review for the submission.
+        
+        Args:
+            challenge_id: Challenge the code was submitted for
+            language: Programming language
+            code: Submitted source code
+            count: Count the lookup in the hit-rate metrics (False for
+                speculative probes, e.g. of near-duplicates)
+        
+        Returns:
+            Dict with 'status', 'feedback' and 'verdict', or None on a miss
+        """
+        if not REVIEW_CACHE_ENABLED:
+            return None
+        
+        cached = await self.db.get_cached_review(
+            challenge_id, language, code_hash(code, language), REVIEW_CACHE_MAX_AGE_DAYS, count_hit=count
+        )
+        if not cached:
+            if count:
+                self.misses += 1
+            return None
+        
+        if count:
+            self.hits += 1
+        return {
+            'status': cached['status'],
+            'feedback': cached['feedback'],
+            'verdict': verdict_from_row(cached)
+        }
+    
+    async def put(self, challenge_id: int, language: str, code: str, status: str, feedback: str,
+                  verdict: Optional[Dict[str, Any]] = None) -> None:
+        """Store a review result for the submission."""
+        if not REVIEW_CACHE_ENABLED:
+            return
+        
+        await self.db.save_cached_review(
+            challenge_id, language, code_hash(code, language), status, feedback, verdict
+        )
+    
+    async def purge(self, challenge_id: Optional[int] = None) -> int:
+        """Purge cached reviews and reset hit-rate counters."""
+        removed = await self.db.purge_review_cache(challenge_id)
+        if challenge_id is None:
+            self.hits = 0
+            self.misses = 0
+        return removed
+    
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups served from the cache since startup."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+review_cache = ReviewCache()
@@ -0,0 +1,140 @@
+"""Token estimation and prompt compaction for AI requests."""
+import io
+import re
+import tokenize
+from bot.config import (
+    MISTRAL_MAX_TOKENS, MISTRAL_MIN_RESPONSE_TOKENS, MISTRAL_CONTEXT_WINDOW
+)
+
+# Rough average for code and English text with Mistral's tokenizer
+CHARS_PER_TOKEN = 3.5
+
+# Matches string literals first so comment markers inside strings are kept
+_C_STYLE_COMMENTS = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`)|(//[^\n]*|/\*.*?\*/)',
+    re.DOTALL
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+    
+    Args:
+        text: Prompt or prompt fragment
+    
+    Returns:
+        Approximate token count
+    """
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def _strip_python_comments(code: str) -> str:
+    """Remove # comments from Python code using the tokenizer."""
+    lines = code.splitlines()
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.COMMENT:
+                row, col = tok.start
+                lines[row - 1] = lines[row - 1][:col].rstrip()
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Broken code: only drop whole-line comments
+        lines = [line for line in lines if not line.lstrip().startswith("#")]
+    return "\n".join(lines)
+
+
+def strip_comments(code: str, language: str) -> str:
+    """
+    Remove comments and blank lines from code.
+    
+    Args:
+        code: Source code
+        language: Programming language
+    
+    Returns:
+        Code without comments and blank lines
+    """
+    if language == "python":
+        code = _strip_python_comments(code)
+    else:
+        code = _C_STYLE_COMMENTS.sub(lambda m: m.group(1) or " ", code)
+    return "\n".join(line.rstrip() for line in code.splitlines() if line.strip())
+
+
+def truncate_head_tail(text: str, max_tokens: int) -> str:
+    """
+    Keep the beginning and end of a text within a token budget.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget for the result
+    
+    Returns:
+        Text with the middle lines replaced by an omission marker
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    lines = text.splitlines()
+    budget_chars = int(max_tokens * CHARS_PER_TOKEN)
+    head_chars = budget_chars * 2 // 3
+    tail_chars = budget_chars - head_chars
+    
+    head, used = [], 0
+    for line in lines:
+        if used + len(line) + 1 > head_chars:
+            break
+        head.append(line)
+        used += len(line) + 1
+    
+    tail, used = [], 0
+    for line in reversed(lines[len(head):]):
+        if used + len(line) + 1 > tail_chars:
+            break
+        tail.append(line)
+        used += len(line) + 1
+    tail.reverse()
+    
+    # A single huge line: fall back to character slicing
+    if not head and not tail:
+        return f"{text[:head_chars]}\n... [truncated] ...\n{text[-tail_chars:]}"
+    
+    omitted = len(lines) - len(head) - len(tail)
+    return "\n".join(head + [f"... [{omitted} lines omitted] ..."] + tail)
+
+
+def fit_code(code: str, language: str, max_tokens: int) -> str:
+    """
+    Fit submitted code into a token budget.
+    
+    Comments and blank lines are removed first; if the code is still too
+    large, the middle part is cut out.
+    
+    Args:
+        code: Source code
+        language: Programming language
+        max_tokens: Token budget for the code
+    
+    Returns:
+        Code that fits into the budget
+    """
+    if estimate_tokens(code) <= max_tokens:
+        return code
+    return truncate_head_tail(strip_comments(code, language), max_tokens)
+
+
+def response_token_budget(prompt_tokens: int, max_tokens: int = MISTRAL_MAX_TOKENS) -> int:
+    """
+    Size max_tokens for a request so prompt and response fit the context window.
+    
+    Args:
+        prompt_tokens: Estimated prompt size
+        max_tokens: Desired response size
+    
+    Returns:
+        Number of tokens to request for the response
+    """
+    available = MISTRAL_CONTEXT_WINDOW - prompt_tokens
+    return max(MISTRAL_MIN_RESPONSE_TOKENS, min(max_tokens, available))
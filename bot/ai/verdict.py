@@ -0,0 +1,116 @@
+"""Structured verdicts parsed from AI code reviews."""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# The review starts with a JSON object, usually in a ```json fenced block
+_OPENING_FENCE = re.compile(r'```(?:json)?\s*')
+_CLOSING_FENCE = re.compile(r'\s*```')
+_decoder = json.JSONDecoder()
+
+MAX_SCORE = 10
+MAX_ISSUES = 5
+MAX_ISSUE_LENGTH = 200
+
+
+def validate_verdict(data: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate and normalize a verdict object.
+    
+    Args:
+        data: Decoded JSON from the model
+    
+    Returns:
+        Dict with 'verdict' ("pass" or "fail"), 'score' (0-10 or None)
+        and 'issues' (list of short strings), or None if invalid
+    """
+    if not isinstance(data, dict):
+        return None
+    
+    verdict = data.get("verdict")
+    if isinstance(verdict, bool):
+        verdict = "pass" if verdict else "fail"
+    if not isinstance(verdict, str) or verdict.strip().lower() not in ("pass", "fail"):
+        return None
+    
+    score = data.get("score")
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        score = None
+    else:
+        score = max(0, min(MAX_SCORE, int(round(score))))
+    
+    issues = data.get("issues")
+    if not isinstance(issues, list):
+        issues = []
+    issues = [str(issue).strip()[:MAX_ISSUE_LENGTH] for issue in issues if str(issue).strip()]
+    
+    return {
+        "verdict": verdict.strip().lower(),
+        "score": score,
+        "issues": issues[:MAX_ISSUES]
+    }
+
+
+def parse_review(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Split a review response into its verdict and the free-text feedback.
+    
+    Args:
+        text: Raw model response
+    
+    Returns:
+        (verdict or None if missing/invalid, feedback without the verdict block)
+    """
+    stripped = (text or "").lstrip()
+    fence = _OPENING_FENCE.match(stripped)
+    start = fence.end() if fence else 0
+    if not stripped.startswith("{", start):
+        return None, text
+    
+    try:
+        data, end = _decoder.raw_decode(stripped, start)
+    except ValueError:
+        return None, text
+    
+    verdict = validate_verdict(data)
+    if verdict is None:
+        return None, text
+    
+    rest = stripped[end:]
+    if fence:
+        closing = _CLOSING_FENCE.match(rest)
+        if closing:
+            rest = rest[closing.end():]
+    return verdict, rest.strip()
+
+
+def verdict_columns(verdict: Optional[Dict[str, Any]]) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """Get (verdict, review_score, review_issues) column values for storage."""
+    if not verdict:
+        return None, None, None
+    return verdict["verdict"], verdict["score"], json.dumps(verdict["issues"], ensure_ascii=False)
+
+
+def verdict_from_row(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Rebuild a verdict from stored (verdict, review_score, review_issues) columns."""
+    if not row.get("verdict"):
+        return None
+    try:
+        issues: List[str] = json.loads(row.get("review_issues") or "[]")
+    except json.JSONDecodeError:
+        issues = []
+    return {"verdict": row["verdict"], "score": row.get("review_score"), "issues": issues}
+
+
+def format_verdict(verdict: Optional[Dict[str, Any]]) -> str:
+    """Render a verdict as a short summary for the user."""
+    if not verdict:
+        return ""
+    
+    text = "✅ Pass" if verdict["verdict"] == "pass" else "❌ Not yet"
+    if verdict["score"] is not None:
+        text += f" ({verdict['score']}/{MAX_SCORE})"
+    text = f"🏁 AI Verdict: {text}"
+    if verdict["issues"]:
+        text += "\n" + "\n".join(f"• {issue}" for issue in verdict["issues"])
+    return text
@@ -9,9 +9,35 @@ TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 ADMIN_USER_IDS = [int(id.strip()) for id in os.getenv("ADMIN_USER_IDS", "").split(",") if id.strip()]
 
+# Update intake: "polling" or "webhook" (Telegram posts updates to an aiohttp server)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")  # Public HTTPS URL of the server, e.g. https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Checked on every request; derived from the bot token if unset
+# Disable when several workers share the webhook, so one stopping doesn't cut off the others
+WEBHOOK_REMOVE_ON_SHUTDOWN = os.getenv("WEBHOOK_REMOVE_ON_SHUTDOWN", "true").lower() in ("1", "true", "yes")
+
+# Multi-process mode: a front process receives updates (polling or webhook) and
+# shards them by chat across worker processes; 0 handles everything in one process
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "0"))
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "8100"))  # Worker i listens on 127.0.0.1:WORKER_BASE_PORT + i
+WORKER_FORWARD_BATCH_SIZE = 100  # Updates sent to a worker per request
+WORKER_QUEUE_SIZE = 1000  # Updates waiting for one worker before receiving pauses
+WORKER_REPORT_INTERVAL_SECONDS = 60  # How often each worker's health and throughput are logged
+WORKER_CACHE_REFRESH_SECONDS = 300  # How often workers reload caches other processes may have changed
+
 # Database
 DATABASE_PATH = "data/bot.db"
 
+# Conversation (FSM) state storage
+FSM_CACHE_SIZE = 10000  # Recently used conversations kept in memory
+FSM_STATE_TTL_SECONDS = 24 * 3600  # Conversations idle this long are dropped
+FSM_FLUSH_INTERVAL_SECONDS = 1.0  # Changes are written to SQLite in batches this often...
+FSM_FLUSH_BATCH_SIZE = 500  # ...or as soon as this many conversations changed
+FSM_CLEANUP_INTERVAL_SECONDS = 3600  # How often expired conversations are deleted
+
 # Rating system constants
 RATING_EASY_POINTS = 10
 RATING_MEDIUM_POINTS = 25
@@ -20,7 +46,18 @@ STREAK_BONUS_MULTIPLIER = 1.1
 LEVEL_UP_THRESHOLD = 100  # Points needed per level
 
 # Challenge settings
-DAILY_CHALLENGE_TIME = "09:00"  # 9 AM
+DAILY_CHALLENGE_SALT = os.getenv("DAILY_CHALLENGE_SALT", "daily-challenge")  # Change to reshuffle future picks
+DAILY_CHALLENGE_TIME = "09:00"  # 9 AM in each user's time zone
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "UTC")  # For users who haven't set one
+DAILY_SCHEDULER_INTERVAL_MINUTES = 5  # Users whose local DAILY_CHALLENGE_TIME fell in the last window are processed
+DAILY_SCHEDULER_BATCH_SIZE = 500  # Users read per query
+DAILY_CHALLENGE_CATCH_UP_HOURS = 3  # Pushes missed while the bot was down are still sent this late
+SCHEDULER_MISFIRE_GRACE_SECONDS = 24 * 3600  # Jobs missed while the bot was down run once on startup if this recent
+
+# Leader election: one instance runs scheduled jobs; another takes over within
+# LEADER_LEASE_SECONDS + LEADER_RENEW_SECONDS if it dies
+LEADER_LEASE_SECONDS = 10
+LEADER_RENEW_SECONDS = 3
 
 # Supported languages
 SUPPORTED_LANGUAGES = ["python", "javascript", "cpp"]
@@ -28,4 +65,102 @@ SUPPORTED_LANGUAGES = ["python", "javascript", "cpp"]
 # Mistral AI settings
 MISTRAL_MODEL = "mistral-large-latest"  # or "codestral-latest" for code-specific tasks
 MISTRAL_MAX_TOKENS = 1000
-MISTRAL_TEMPERATURE = 0.7
\ No newline at end of file
+MISTRAL_TEMPERATURE = 0.7
+MISTRAL_CONTEXT_WINDOW = 32000  # Model context size in tokens
+MISTRAL_MIN_RESPONSE_TOKENS = 300
+MISTRAL_POOL_SIZE = 10  # Max open connections to the API
+MISTRAL_KEEPALIVE_SECONDS = 60
+MISTRAL_CONNECT_TIMEOUT = 10.0
+MISTRAL_READ_TIMEOUT = 60.0
+MISTRAL_HTTP2 = True  # Used only if the "h2" package is installed
+AI_METRICS_RETENTION_DAYS = 30  # How long per-call AI metrics are kept in the database
+
+# Local Mistral stand-in for load testing (set MISTRAL_FAKE=1; no API calls are made)
+MISTRAL_FAKE = os.getenv("MISTRAL_FAKE", "").lower() in ("1", "true", "yes")
+MISTRAL_FAKE_SEED = 42
+MISTRAL_FAKE_TTFT_MS = 400  # Median time to first token
+MISTRAL_FAKE_LATENCY_SIGMA = 0.5  # Log-normal spread of time to first token
+MISTRAL_FAKE_TOKENS_PER_SECOND = 60
+MISTRAL_FAKE_ERROR_RATE = 0.01  # Share of requests failing with a 5xx error
+MISTRAL_FAKE_RATE_LIMIT_RATE = 0.01  # Chance that a request starts a burst of 429s
+MISTRAL_FAKE_RATE_LIMIT_BURST_SECONDS = 5
+
+# AI quotas (rolling windows)
+AI_USER_REQUESTS_PER_HOUR = 20
+AI_USER_REQUESTS_PER_DAY = 100
+AI_USER_TOKENS_PER_DAY = 100000
+AI_GLOBAL_REQUESTS_PER_HOUR = 2000
+AI_GLOBAL_TOKENS_PER_DAY = 5000000
+AI_QUOTA_CLEANUP_SECONDS = 60  # How often expired counters are deleted from the database
+
+# Hints are generated in the background when a challenge is added
+HINT_PREGENERATION_ENABLED = True
+HINT_PREGENERATION_CONCURRENCY = 2  # Challenges generated at the same time
+
+# Prompt budgets (estimated tokens)
+AI_CODE_TOKEN_BUDGET = 4000
+AI_DESCRIPTION_TOKEN_BUDGET = 1000
+AI_ANSWER_TOKEN_BUDGET = 1500
+AI_DIFF_TOKEN_BUDGET = 1500  # Larger diffs get a full review instead
+AI_PREVIOUS_FEEDBACK_TOKEN_BUDGET = 500
+
+# Resubmissions are reviewed as a diff against the previous attempt
+INCREMENTAL_REVIEW_ENABLED = True
+INCREMENTAL_REVIEW_MAX_CHANGED_RATIO = 0.4  # Share of changed lines above which a full review is done
+
+# Review cache settings
+REVIEW_CACHE_ENABLED = True
+REVIEW_CACHE_MAX_AGE_DAYS = 30  # Cached reviews older than this are ignored
+
+# Interview answer pre-scoring (local TF-IDF model over the question bank)
+INTERVIEW_MIN_ANSWER_WORDS = 3  # Shorter answers get a local reply without an AI call
+INTERVIEW_COPY_SIMILARITY = 0.9  # Answers this similar to the model answer count as copied
+INTERVIEW_KEY_TERMS = 8  # Highest-weighted terms of a model answer checked for coverage
+INTERVIEW_SCORING_CACHE_SIZE = 1024  # Model answer vectors kept in memory
+INTERVIEW_DUE_LOOKAHEAD = 20  # Due questions checked when practicing a single category
+INTERVIEW_NEW_QUESTION_ATTEMPTS = 5  # Random picks tried to find a question the user hasn't seen
+
+# Near-duplicate submission detection (MinHash/LSH)
+SIMILARITY_ENABLED = True
+SIMILARITY_NUM_PERM = 64
+SIMILARITY_BANDS = 16  # 4 rows per band: pairs above ~50% similarity become candidates
+SIMILARITY_SHINGLE_SIZE = 5  # Tokens per shingle
+SIMILARITY_FLAG_THRESHOLD = 0.9  # Flag submissions this similar to another user's
+SIMILARITY_REUSE_THRESHOLD = 0.95  # Reuse the AI review of a submission this similar, once the tests passed
+
+# Sandbox settings (local test runs before AI review)
+SANDBOX_ENABLED = True
+SANDBOX_POOL_SIZE = 4  # Pre-started workers per language
+SANDBOX_TIMEOUT_SECONDS = 5
+SANDBOX_COMPILE_TIMEOUT_SECONDS = 15
+SANDBOX_MEMORY_LIMIT_MB = 256
+SANDBOX_UID = int(os.getenv("SANDBOX_UID", "65534"))  # Unprivileged user for submissions when the bot runs as root
+SANDBOX_GID = int(os.getenv("SANDBOX_GID", "65534"))
+SANDBOX_MAX_PROCESSES = 64  # RLIMIT_NPROC: counts all processes of the submissions' uid
+SANDBOX_MESSAGE_MAX_CHARS = 200  # Error text from a submission shown to the user
+SANDBOX_NODE_PATH = "node"
+SANDBOX_CPP_COMPILER = "g++"
+
+# Outbound message settings (bulk sends: broadcasts, daily challenge pushes)
+OUTBOX_RATE_PER_SECOND = 30  # Telegram's limit per bot
+OUTBOX_CHAT_INTERVAL_SECONDS = 1.0  # Telegram's limit per chat
+OUTBOX_WORKERS = 30  # Messages in flight at once
+OUTBOX_MAX_QUEUE = 1000  # Senders wait while this many messages are queued
+OUTBOX_MAX_RETRIES = 3  # Attempts per message after a retry_after response
+
+# Broadcast settings
+BROADCAST_RATE_PER_SECOND = 25  # Share of OUTBOX_RATE_PER_SECOND; leaves room for daily challenge pushes
+BROADCAST_CONCURRENCY = 25  # Messages in flight at once
+BROADCAST_BATCH_SIZE = 500  # Recipients read and checkpointed per batch
+BROADCAST_PROGRESS_INTERVAL_SECONDS = 5  # How often the admin's progress message is edited
+BROADCAST_LEASE_SECONDS = 60  # A broadcast whose sender stopped renewing this long is resumed by another instance
+BROADCAST_RENEW_SECONDS = 15  # How often the sending instance renews its broadcasts
+
+# Review queue settings
+REVIEW_QUEUE_WORKERS = 2  # Concurrent review jobs
+REVIEW_QUEUE_MAX_DEPTH = 50  # New submissions are rejected above this many queued jobs
+REVIEW_QUEUE_MAX_ATTEMPTS = 3
+REVIEW_QUEUE_RETRY_DELAY_SECONDS = 30  # Multiplied by the attempt number
+REVIEW_QUEUE_POLL_SECONDS = 5
+REVIEW_QUEUE_HEARTBEAT_SECONDS = 30  # How often a worker marks its running job as alive
+REVIEW_QUEUE_STALE_SECONDS = 120  # Running jobs without a heartbeat this long are taken over
\ No newline at end of file
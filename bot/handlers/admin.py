@@ -1,10 +1,24 @@
 """Admin panel handlers."""
 import json
+from datetime import date
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from database.db import Database
+from bot.ai.review_cache import review_cache
+from bot.ai.metrics import ai_metrics
+from bot.ai.quota import ai_quota
+from bot.ai.hints import hint_generator
+from bot.utils.question_store import question_store
+from bot.utils.broadcast import broadcast_engine
+from bot.utils.daily_challenge import daily_challenges
+from bot.utils.segments import Segment, parse_segment, SEGMENT_SYNTAX
+from bot.utils.similarity import similarity_index
+from bot.config import (
+    AI_USER_REQUESTS_PER_HOUR, AI_USER_REQUESTS_PER_DAY, AI_USER_TOKENS_PER_DAY,
+    AI_GLOBAL_REQUESTS_PER_HOUR, AI_GLOBAL_TOKENS_PER_DAY, SIMILARITY_FLAG_THRESHOLD
+)
 from bot.keyboards import (
     get_admin_menu, get_admin_stats_keyboard, get_admin_users_keyboard,
     get_user_actions_keyboard, get_admin_challenges_keyboard,
@@ -13,8 +27,8 @@ from bot.keyboards import (
     get_confirm_keyboard, get_main_menu
 )
 from bot.utils.admin_utils import (
-    is_admin, format_user_info, format_challenge_info,
-    format_interview_question_info, broadcast_message, validate_challenge_data
+    is_admin, escape_markdown, format_user_info, format_challenge_info,
+    format_interview_question_info, validate_challenge_data
 )
 
 router = Router()
@@ -33,6 +47,7 @@ class AdminStates(StatesGroup):
     waiting_for_challenge_solution = State()
     waiting_for_challenge_points = State()
     waiting_for_broadcast_message = State()
+    waiting_for_broadcast_segment = State()
     waiting_for_interview_category = State()
     waiting_for_interview_question = State()
     waiting_for_interview_answer = State()
@@ -95,6 +110,10 @@ async def show_statistics(callback: CallbackQuery):
     total_submissions = await db.get_total_submissions()
     submissions_by_status = await db.get_submissions_by_status()
     total_questions = await db.get_interview_question_count()
+    cache_stats = await db.get_review_cache_stats()
+    verdict_stats = await db.get_review_verdict_stats()
+    deliveries = await db.get_daily_challenge_delivery_stats(date.today().isoformat())
+    avg_score = f"{verdict_stats['avg_score']:.1f}/10" if verdict_stats['avg_score'] is not None else "—"
     
     # Calculate success rate
     success = submissions_by_status.get('success', 0)
@@ -120,8 +139,19 @@ async def show_statistics(callback: CallbackQuery):
 • Success Rate: {success_rate:.1f}%
 • ✅ Successful: {submissions_by_status.get('success', 0)}
 • ❌ Failed: {submissions_by_status.get('failed', 0)}
+• 🤖 AI Verdicts: {verdict_stats['pass']} pass / {verdict_stats['fail']} fail (avg score {avg_score})
 
 🎯 **Interview Questions:** {total_questions}
+
+📬 **Daily Challenge Pushes (today):**
+• Sent: {deliveries.get('sent', 0)}
+• Blocked the bot: {deliveries.get('blocked', 0)}
+• Failed: {deliveries.get('failed', 0)}
+
+🗃️ **Review Cache:**
+• Entries: {cache_stats['entries']}
+• Stored Hits: {cache_stats['hits']}
+• Hit Rate (since start): {review_cache.hit_rate * 100:.1f}% ({review_cache.hits}/{review_cache.hits + review_cache.misses})
 """
     
     await callback.message.edit_text(
@@ -158,6 +188,134 @@ async def show_recent_activity(callback: CallbackQuery):
     await callback.answer()
 
 
+@router.callback_query(F.data == "admin_ai_metrics")
+async def show_ai_metrics(callback: CallbackQuery):
+    """Show AI latency percentiles and token spend."""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Access denied.", show_alert=True)
+        return
+    
+    text = "🤖 **AI Metrics**\n\n⏱️ **Latency since restart (ms):**\n"
+    summary = ai_metrics.summary()
+    if not summary:
+        text += "No AI calls yet.\n"
+    for row in summary:
+        failed = row['error'] + row['timeout'] + row['rate_limited']
+        text += f"""
+`{row['method']}` — {row['ok'] + failed} calls ({failed} failed, {row['rate_limited']} rate-limited)
+• Total p50/p95/p99: {row['p50']:.0f} / {row['p95']:.0f} / {row['p99']:.0f}
+• First token p50/p95: {row['ttft_p50']:.0f} / {row['ttft_p95']:.0f}
+• Queue wait p95: {row['wait_p95']:.0f}
+"""
+    
+    usage = await db.get_daily_token_usage(days=7)
+    text += "\n🪙 **Daily Token Spend:**\n"
+    if not usage:
+        text += "No data for the last 7 days.\n"
+    for day in usage:
+        text += f"• {day['day']}: {day['prompt_tokens'] + day['completion_tokens']} tokens "
+        text += f"({day['prompt_tokens']} in / {day['completion_tokens']} out, {day['calls']} calls)\n"
+    
+    await callback.message.edit_text(
+        text.strip(),
+        reply_markup=get_admin_stats_keyboard(),
+        parse_mode='Markdown'
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "admin_ai_quotas")
+async def show_ai_quotas(callback: CallbackQuery):
+    """Show rolling AI usage against the configured quotas."""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Access denied.", show_alert=True)
+        return
+    
+    total = await ai_quota.usage()
+    text = f"""🚦 **AI Quotas**
+
+🌐 **Global:**
+• Requests (last hour): {total['requests_hour']} / {AI_GLOBAL_REQUESTS_PER_HOUR}
+• Tokens (last 24h): {total['tokens_day']} / {AI_GLOBAL_TOKENS_PER_DAY}
+
+👤 **Per-user limits:** {AI_USER_REQUESTS_PER_HOUR} req/hour, {AI_USER_REQUESTS_PER_DAY} req/day, {AI_USER_TOKENS_PER_DAY} tokens/day
+
+🔝 **Top users (last 24h):**
+"""
+    top = await ai_quota.top_users(10)
+    if not top:
+        text += "No AI usage yet.\n"
+    for user_id, usage in top:
+        text += f"• `{user_id}`: {usage['tokens_day']} tokens, {usage['requests_day']} requests "
+        text += f"({usage['requests_hour']} this hour)\n"
+    
+    await callback.message.edit_text(
+        text.strip(),
+        reply_markup=get_admin_stats_keyboard(),
+        parse_mode='Markdown'
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "admin_similar_submissions")
+async def show_similar_submissions(callback: CallbackQuery):
+    """Show recent submissions that closely match another user's code."""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Access denied.", show_alert=True)
+        return
+    
+    flags = await db.get_similar_submission_flags(SIMILARITY_FLAG_THRESHOLD, limit=15)
+    text = f"🧬 **Similar Submissions** (≥ {SIMILARITY_FLAG_THRESHOLD * 100:.0f}% similar)\n\n"
+    if not flags:
+        text += "No near-duplicates found."
+    for flag in flags:
+        user = f"@{escape_markdown(flag['username'])}" if flag['username'] else str(flag['user_id'])
+        match_user = (f"@{escape_markdown(flag['match_username'])}" if flag['match_username']
+                      else str(flag['match_user_id']))
+        text += f"• `{flag['challenge_title']}`: #{flag['submission_id']} ({user}) ≈ "
+        text += f"#{flag['best_match_id']} ({match_user}) — {flag['best_match_score'] * 100:.0f}%\n"
+    
+    await callback.message.edit_text(
+        text.strip(),
+        reply_markup=get_admin_stats_keyboard(),
+        parse_mode='Markdown'
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "admin_purge_review_cache")
+async def confirm_purge_review_cache(callback: CallbackQuery):
+    """Confirm purging the review cache."""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Access denied.", show_alert=True)
+        return
+    
+    stats = await db.get_review_cache_stats()
+    text = (f"⚠️ **Confirm Purge**\n\nAre you sure you want to delete all {stats['entries']} cached reviews?\n"
+            "Reviews of the same code will need new AI requests. This action cannot be undone!")
+    
+    await callback.message.edit_text(
+        text,
+        reply_markup=get_confirm_keyboard("purge_review_cache", 0),
+        parse_mode='Markdown'
+    )
+    await callback.answer()
+
+
+@router.callback_query(F.data == "admin_confirm_purge_review_cache_0")
+async def purge_review_cache(callback: CallbackQuery):
+    """Purge all cached AI reviews."""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Access denied.", show_alert=True)
+        return
+    
+    removed = await review_cache.purge()
+    await callback.answer(f"✅ Removed {removed} cached reviews.", show_alert=True)
+    
+    # Refresh statistics
+    await show_statistics(callback)
+
+
 # User Management
 @router.callback_query(F.data.startswith("admin_users"))
 async def show_users(callback: CallbackQuery):
@@ -322,6 +480,7 @@ async def execute_delete_user(callback: CallbackQuery):
     user_id = int(callback.data.split("_")[-1])
     
     await db.delete_user(user_id)
+    similarity_index.remove(user_id=user_id)
     await callback.answer("✅ User deleted successfully.", show_alert=True)
     
     # Return to user list
@@ -493,6 +652,10 @@ async def process_challenge_points(message: Message, state: FSMContext):
         points=points
     )
     
+    # Prepare hints in the background so the first request is instant
+    hint_generator.schedule([challenge_id])
+    daily_challenges.invalidate()
+    
     await message.answer(
         f"✅ Challenge created successfully!\nChallenge ID: {challenge_id}",
         reply_markup=get_admin_challenges_keyboard()
@@ -529,6 +692,8 @@ async def execute_delete_challenge(callback: CallbackQuery):
     challenge_id = int(callback.data.split("_")[-1])
     
     await db.delete_challenge(challenge_id)
+    similarity_index.remove(challenge_id=challenge_id)
+    daily_challenges.invalidate()
     await callback.answer("✅ Challenge deleted successfully.", show_alert=True)
     
     # Return to challenge list
@@ -559,10 +724,36 @@ async def process_broadcast_message(message: Message, state: FSMContext):
     
     broadcast_text = message.text.strip()
     
+    await state.update_data(broadcast_text=broadcast_text)
+    await message.answer(
+        f"👥 **Audience**\n\nWho should receive it? Send filters separated by spaces:\n\n{SEGMENT_SYNTAX}",
+        parse_mode='Markdown'
+    )
+    await state.set_state(AdminStates.waiting_for_broadcast_segment)
+
+
+@router.message(AdminStates.waiting_for_broadcast_segment)
+async def process_broadcast_segment(message: Message, state: FSMContext):
+    """Process broadcast audience and show a preview."""
+    if not is_admin(message.from_user.id):
+        return
+    
+    try:
+        segment = parse_segment(message.text or "")
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        return
+    
+    audience = await db.count_segment_users(*segment.compile())
+    data = await state.get_data()
+    
     # Preview
-    preview_text = f"📢 **Broadcast Preview:**\n\n{broadcast_text}\n\n---\nSend to all users?"
+    preview_text = (
+        f"📢 **Broadcast Preview:**\n\n{data['broadcast_text']}\n\n---\n"
+        f"👥 Audience: {segment.describe()} - **{audience}** users\nSend?"
+    )
     
-    await state.update_data(broadcast_text=broadcast_text)
+    await state.update_data(broadcast_segment=segment.to_dict())
     await message.answer(preview_text, reply_markup=get_broadcast_keyboard(), parse_mode='Markdown')
 
 
@@ -580,22 +771,30 @@ async def execute_broadcast(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ No message to broadcast.", show_alert=True)
         return
     
-    await callback.message.edit_text("📤 Broadcasting message... Please wait.")
+    await callback.message.edit_text("📤 Broadcast starting...")
     
-    # Send broadcast
-    result = await broadcast_message(callback.bot, db, broadcast_text, exclude_banned=True)
-    
-    result_text = f"""
-✅ **Broadcast Complete**
+    # Sent in the background; the engine keeps this message updated with progress
+    await broadcast_engine.create(
+        callback.bot, callback.from_user.id, broadcast_text,
+        Segment.from_dict(data.get('broadcast_segment')),
+        callback.message.chat.id, callback.message.message_id
+    )
+    await state.clear()
+    await callback.answer("📤 Broadcast started")
 
-📊 Results:
-• Sent: {result['success']}
-• Failed: {result['failed']}
-"""
+
+@router.callback_query(F.data.startswith("admin_broadcast_stop_"))
+async def stop_broadcast(callback: CallbackQuery):
+    """Stop a running broadcast."""
+    if not is_admin(callback.from_user.id):
+        await callback.answer("❌ Access denied.", show_alert=True)
+        return
     
-    await callback.message.edit_text(result_text.strip(), reply_markup=get_admin_menu(), parse_mode='Markdown')
-    await state.clear()
-    await callback.answer()
+    broadcast_id = int(callback.data.split("_")[-1])
+    if broadcast_engine.cancel(broadcast_id):
+        await callback.answer("⏹ Stopping broadcast...")
+    else:
+        await callback.answer("❌ Broadcast is not running.", show_alert=True)
 
 
 # Interview Questions Management
@@ -703,6 +902,7 @@ async def process_interview_difficulty(message: Message, state: FSMContext):
         answer=data['answer'],
         difficulty=difficulty
     )
+    question_store.invalidate()
     
     await message.answer(
         f"✅ Interview question created successfully!\nQuestion ID: {question_id}",
@@ -740,6 +940,7 @@ async def execute_delete_interview_question(callback: CallbackQuery):
     question_id = int(callback.data.split("_")[-1])
     
     await db.delete_interview_question(question_id)
+    question_store.invalidate()
     await callback.answer("✅ Interview question deleted successfully.", show_alert=True)
     
     # Return to question list
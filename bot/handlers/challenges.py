@@ -3,13 +3,14 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from database.db import Database
 from bot.keyboards import get_challenge_actions_keyboard, get_difficulty_keyboard, get_back_to_menu_keyboard
-from bot.ai.mistral_client import MistralAIClient
-import random
+from bot.ai.hints import hint_generator
+from bot.ai.prompts import HINT_LEVELS
+from bot.ai.quota import ai_quota
+from bot.utils.daily_challenge import daily_challenges
 import json
 
 router = Router()
 db = Database()
-ai_client = MistralAIClient()
 
 
 @router.callback_query(F.data == "daily_challenge")
@@ -17,57 +18,19 @@ async def show_daily_challenge(callback: CallbackQuery):
     """Show today's daily challenge."""
     user_id = callback.from_user.id
     
-    # Get or assign daily challenge
-    challenge = await db.get_daily_challenge(user_id)
+    user = await db.get_user(user_id)
+    if not user:
+        await callback.answer("❌ Please use /start first", show_alert=True)
+        return
     
+    # Today's pick is computed on demand; opening it pins it for the day
+    challenge = await daily_challenges.today(user)
     if not challenge:
-        # Assign new challenge based on user level
-        user = await db.get_user(user_id)
-        if not user:
-            await callback.answer("❌ Please use /start first", show_alert=True)
-            return
-        
-        # Select difficulty based on level
-        if user['level'] <= 3:
-            difficulty = "easy"
-        elif user['level'] <= 7:
-            difficulty = "medium"
-        else:
-            difficulty = "hard"
-        
-        # Get random challenge
-        challenges = await db.get_challenges_by_difficulty(difficulty)
-        if not challenges:
-            await callback.answer("❌ No challenges available", show_alert=True)
-            return
-        
-        challenge = random.choice(challenges)
-        await db.assign_daily_challenge(user_id, challenge['id'])
-    
-    # Format challenge text
-    difficulty_emoji = {
-        "easy": "🟢",
-        "medium": "🟡",
-        "hard": "🔴"
-    }.get(challenge['difficulty'].lower(), "⚪")
-    
-    text = f"""📝 Daily Challenge
-
-{difficulty_emoji} {challenge['title']}
-Difficulty: {challenge['difficulty'].capitalize()}
-Language: {challenge['language'].upper()}
-Points: {challenge['points']} ⭐
-
-📋 Description:
-{challenge['description']}
-
-🧪 Test Cases:
-{challenge['test_cases']}
-
-Good luck! 🚀"""
+        await callback.answer("❌ No challenges available", show_alert=True)
+        return
     
     await callback.message.edit_text(
-        text,
+        daily_challenges.render(challenge['id']),
         reply_markup=get_challenge_actions_keyboard(challenge['id'])
     )
     await callback.answer()
@@ -75,24 +38,46 @@ Good luck! 🚀"""
 
 @router.callback_query(F.data.startswith("hint_"))
 async def get_hint(callback: CallbackQuery):
-    """Generate a hint for the challenge."""
+    """Send the next hint tier for the challenge."""
     challenge_id = int(callback.data.split("_")[1])
+    user_id = callback.from_user.id
     
     challenge = await db.get_challenge(challenge_id)
     if not challenge:
         await callback.answer("❌ Challenge not found", show_alert=True)
         return
     
-    await callback.answer("💡 Generating hint...", show_alert=False)
+    # Each request reveals one more tier; the last one is repeated
+    received = await db.get_hints_received(user_id, challenge_id)
+    level = min(received + 1, hint_generator.levels)
+    
+    hint = await db.get_challenge_hint(challenge_id, level)
+    if hint:
+        await callback.answer()
+    else:
+        # Not pre-generated yet: generate this tier now
+        quota_message = await ai_quota.check(user_id)
+        if quota_message:
+            await callback.answer(quota_message, show_alert=True)
+            return
+        
+        await callback.answer("💡 Generating hint...", show_alert=False)
+        hint = await hint_generator.generate_level(challenge, level, user_id=user_id)
+        if hint.startswith("❌"):
+            await callback.message.answer(hint)
+            return
+    
+    await db.set_hints_received(user_id, challenge_id, level)
     
-    # Generate hint using AI
-    hint = await ai_client.generate_hint(challenge['description'], challenge['language'])
+    title, _ = HINT_LEVELS[level - 1]
+    footer = "That's the last hint — you got this! 💪" if level == hint_generator.levels \
+        else "Need more help? Ask for the next hint. Good luck! 💪"
     
-    hint_text = f"""💡 Hint for: {challenge['title']}
+    hint_text = f"""💡 Hint {level}/{hint_generator.levels} ({title}) for: {challenge['title']}
 
 {hint}
 
-Good luck! You got this! 💪"""
+{footer}"""
     
     await callback.message.answer(hint_text)
 
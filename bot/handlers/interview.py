@@ -4,12 +4,29 @@ from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from database.db import Database
-from bot.ai.mistral_client import MistralAIClient
+from bot.ai.mistral_client import ai_client
+from bot.ai.quota import ai_quota
+from bot.ai.answer_scoring import answer_scorer, evaluation_score, format_precheck
+from bot.utils.question_store import question_store
+from bot.utils.spaced_repetition import interview_scheduler
+from bot.config import INTERVIEW_MIN_ANSWER_WORDS
 from bot.keyboards import get_interview_categories_keyboard, get_back_to_menu_keyboard
 
 router = Router()
 db = Database()
-ai_client = MistralAIClient()
+
+# Replies for answers scored locally without an AI evaluation
+TRIVIAL_ANSWER_MESSAGES = {
+    "empty": "✍️ Your answer has nothing to evaluate yet. Explain the concept in a few sentences.",
+    "too_short": (
+        f"✍️ That answer is too short to evaluate. "
+        f"Explain your reasoning in at least {INTERVIEW_MIN_ANSWER_WORDS} words."
+    ),
+    "copied": (
+        "📋 Your answer closely matches the model answer. "
+        "Try explaining it in your own words - that's what interviewers look for!"
+    )
+}
 
 
 class InterviewStates(StatesGroup):
@@ -44,8 +61,8 @@ async def show_interview_question(callback: CallbackQuery, state: FSMContext):
     
     category = category_map.get(category_data)
     
-    # Get random question
-    question_data = await db.get_random_interview_question(category)
+    # Due reviews first, then a question the user hasn't seen
+    question_data = await interview_scheduler.next_question(callback.from_user.id, category)
     
     if not question_data:
         await callback.answer("❌ No questions available in this category", show_alert=True)
@@ -60,8 +77,10 @@ async def show_interview_question(callback: CallbackQuery, state: FSMContext):
         "hard": "🔴"
     }.get(question_data['difficulty'].lower(), "⚪")
     
+    review_note = "🔁 Due for review\n" if question_data['due'] else ""
+    
     text = f"""🎯 Interview Question
-
+{review_note}
 Category: {question_data['category']}
 Difficulty: {difficulty_emoji} {question_data['difficulty']}
 
@@ -90,15 +109,22 @@ async def show_model_answer(message: Message, state: FSMContext):
         await message.answer("❌ No active question. Please select a question first.")
         return
     
-    question_data = await db.get_random_interview_question()
-    # Note: We need to modify db.py to get question by ID
-    # For now, we'll fetch from state or show a generic message
+    question_data = await question_store.get(question_id)
+    if not question_data:
+        await message.answer("❌ This question is no longer available.")
+        await state.clear()
+        return
     
-    text = """📖 Model Answer
+    text = f"""📖 Model Answer
+
+❓ {question_data['question']}
 
-The model answer would be displayed here. This feature requires storing the question in the state or fetching by ID.
+{question_data['answer']}
 
-Try answering the question yourself first for better learning! 💪"""
+Try answering the next question yourself first for better learning! 💪"""
+    
+    # Looking up the answer counts as not knowing it: the question comes back tomorrow
+    await interview_scheduler.record(message.from_user.id, question_id, 0)
     
     await message.answer(text)
     await state.clear()
@@ -122,26 +148,54 @@ async def evaluate_answer(message: Message, state: FSMContext):
         await state.clear()
         return
     
+    question_data = await question_store.get(question_id)
+    if not question_data:
+        await message.answer("❌ This question is no longer available.", reply_markup=get_back_to_menu_keyboard())
+        await state.clear()
+        return
+    
     user_answer = message.text
     
-    # For now, we'll use a generic question text
-    # In production, fetch the actual question from database by ID
+    # Score locally first; trivial answers never reach the AI
+    await answer_scorer.load()
+    local_score = answer_scorer.score(question_data, user_answer)
+    if local_score['trivial']:
+        # Keep the state so the user can answer again
+        await message.answer(TRIVIAL_ANSWER_MESSAGES[local_score['trivial']])
+        return
+    
+    quota_message = await ai_quota.check(message.from_user.id)
+    if quota_message:
+        # Keep the state so the user can answer again later
+        await message.answer(quota_message)
+        return
+    
     processing_msg = await message.answer("🤖 Evaluating your answer with AI...")
     
     # Get AI evaluation
-    # Note: We need the actual question text here
     evaluation = await ai_client.evaluate_interview_answer(
-        "The interview question",  # Should fetch from DB
-        user_answer
+        question_data['question'],
+        user_answer,
+        user_id=message.from_user.id,
+        reference_answer=question_data['answer'],
+        precheck=format_precheck(local_score)
     )
     
     await processing_msg.delete()
     
+    # Schedule the next review from the AI score, or the local one if it gave none
+    score = evaluation_score(evaluation)
+    if score is None:
+        score = local_score['score']
+    due_at = await interview_scheduler.record(message.from_user.id, question_id, score)
+    
     result_text = f"""✅ Answer Evaluated!
 
 🤖 AI Feedback:
 {evaluation}
 
+📅 Next review of this question: {due_at.strftime('%Y-%m-%d')}
+
 Great job practicing! Keep it up! 💪"""
     
     await message.answer(result_text, reply_markup=get_back_to_menu_keyboard())
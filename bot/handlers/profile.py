@@ -1,10 +1,13 @@
 """Profile handler - user statistics and achievements."""
 from aiogram import Router, F
-from aiogram.types import CallbackQuery
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, Message
 from database.db import Database
 from database.models import ACHIEVEMENTS
 from bot.keyboards import get_back_to_menu_keyboard
 from bot.utils.rating import points_to_next_level, get_rank_emoji
+from bot.utils.timezones import parse_timezone
+from bot.config import DEFAULT_TIMEZONE, DAILY_CHALLENGE_TIME
 
 router = Router()
 db = Database()
@@ -39,6 +42,7 @@ async def show_profile(callback: CallbackQuery):
 🎯 Level: {user['level']}
 🔥 Streak: {user['streak']} days
 ✅ Completed: {user['completed_challenges']}/{user['total_challenges']} ({completion_rate:.1f}%)
+🌍 Time zone: {user['timezone'] or DEFAULT_TIMEZONE} (change with /timezone)
 
 🏆 Achievements ({len(user_achievements)}):
 """
@@ -57,3 +61,27 @@ async def show_profile(callback: CallbackQuery):
     
     await callback.message.edit_text(profile_text, reply_markup=get_back_to_menu_keyboard())
     await callback.answer()
+
+
+@router.message(Command("timezone"))
+async def set_timezone(message: Message, command: CommandObject):
+    """Set the time zone daily challenges are scheduled in."""
+    user = await db.get_user(message.from_user.id)
+    if not user:
+        await message.answer("❌ User not found. Please use /start")
+        return
+    
+    timezone = parse_timezone(command.args) if command.args else None
+    if not timezone:
+        await message.answer(
+            f"""🌍 Your time zone: {user['timezone'] or DEFAULT_TIMEZONE}
+
+Daily challenges arrive at {DAILY_CHALLENGE_TIME} your time. To change it, send e.g.:
+/timezone Europe/Moscow
+/timezone +3
+/timezone UTC-05:30"""
+        )
+        return
+    
+    await db.set_user_timezone(user['user_id'], timezone)
+    await message.answer(f"✅ Time zone set to {timezone}. Daily challenges arrive at {DAILY_CHALLENGE_TIME} your time.")
@@ -1,18 +1,38 @@
 """Submission handler - code submission and AI review."""
-from aiogram import Router, F
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from aiogram import Bot, Router, F
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from database.db import Database
 from database.models import ACHIEVEMENTS
-from bot.ai.mistral_client import MistralAIClient
+from bot.ai.mistral_client import ai_client
+from bot.ai.review_cache import review_cache
+from bot.ai.quota import ai_quota
+from bot.ai.code_diff import review_diff
+from bot.ai.verdict import verdict_from_row, format_verdict
+from bot.sandbox.pool import sandbox
+from bot.utils import minhash
+from bot.utils.similarity import similarity_index
+from bot.utils.review_queue import review_queue, QueueFullError, UnknownUserError
+from bot.utils.daily_challenge import daily_challenges
+from bot.config import (
+    REVIEW_QUEUE_MAX_ATTEMPTS, INCREMENTAL_REVIEW_ENABLED, SIMILARITY_ENABLED,
+    SIMILARITY_FLAG_THRESHOLD, SIMILARITY_REUSE_THRESHOLD, OUTBOX_MAX_RETRIES
+)
 from bot.utils.rating import calculate_points, calculate_level
 from bot.keyboards import get_back_to_menu_keyboard
 import re
 
+logger = logging.getLogger(__name__)
 router = Router()
 db = Database()
-ai_client = MistralAIClient()
+
+# Telegram's limit on message length
+MAX_MESSAGE_LENGTH = 4096
 
 
 class SubmissionStates(StatesGroup):
@@ -75,13 +95,17 @@ async def receive_code_submission(message: Message, state: FSMContext):
     
     # Try to extract challenge ID
     challenge_id_match = re.search(r'Challenge ID:\s*(\d+)', code, re.IGNORECASE)
+    user = await db.get_user(user_id)
     
     if challenge_id_match:
         challenge_id = int(challenge_id_match.group(1))
         challenge = await db.get_challenge(challenge_id)
+        if challenge and user:
+            # Submitting today's pick without opening it first still pins it
+            await daily_challenges.record_submission(user, challenge_id)
     else:
         # Try to get daily challenge
-        challenge = await db.get_daily_challenge(user_id)
+        challenge = await daily_challenges.today(user) if user else None
     
     if not challenge:
         await message.answer("❌ Please specify a valid Challenge ID or complete your daily challenge first.")
@@ -93,52 +117,251 @@ async def receive_code_submission(message: Message, state: FSMContext):
     code = re.sub(r'Language:.*?\n', '', code, flags=re.IGNORECASE)
     code = code.strip()
     
+    # Queue the review; a background worker sends the result
+    try:
+        queued = await review_queue.enqueue(user_id, message.chat.id, challenge['id'], code, language)
+    except UnknownUserError:
+        await message.answer("❌ User not found. Please use /start")
+        await state.clear()
+        return
+    except QueueFullError:
+        await message.answer(
+            "⏳ Too many submissions are being reviewed right now.\nPlease try again in a few minutes!",
+            reply_markup=get_back_to_menu_keyboard()
+        )
+        await state.clear()
+        return
+    
     # Show processing message
-    processing_msg = await message.answer("🤖 Reviewing your code with AI...\nThis may take a moment...")
+    if queued['position'] > 1:
+        text = f"📥 Your code is queued for review (position {queued['position']}).\nI'll send the feedback as soon as it's ready!"
+    else:
+        text = "🤖 Reviewing your code with AI...\nThis may take a moment..."
+    processing_msg = await message.answer(text)
+    await db.set_review_job_message(queued['job_id'], processing_msg.message_id)
+    await state.clear()
+
+
+def _has_ai_review(feedback: str) -> bool:
+    """Check that stored feedback is an AI review, not an error or quota notice."""
+    return bool(feedback) and not feedback.startswith(("❌", "⏳", "🚦"))
+
+
+def _review_summary(submission: Dict[str, Any]) -> str:
+    """Summarize a previous review for an incremental review prompt."""
+    verdict = verdict_from_row(submission)
+    if not verdict or not verdict['issues']:
+        return submission['feedback']
+    issues = "\n".join(f"- {issue}" for issue in verdict['issues'])
+    return f"Verdict: {verdict['verdict']} (score {verdict['score']}/10)\nIssues:\n{issues}"
+
+
+async def _near_duplicate_review(challenge_id: int, language: str,
+                                 matches: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Find a cached full review of a near-identical earlier submission.
     
-    # Get AI review
-    feedback = await ai_client.review_code(code, language, challenge['description'])
+    Signatures erase names and literals, so code that behaves differently
+    can still match: only use this once the submission's own tests passed.
+    """
+    for match in matches:
+        if match['score'] < SIMILARITY_REUSE_THRESHOLD:
+            break
+        prior = await db.get_submission(match['submission_id'])
+        if prior and prior['language'] == language:
+            # Probes of other submissions' entries don't count as cache lookups
+            cached = await review_cache.get(challenge_id, language, prior['code'], count=False)
+            if cached:
+                return cached
+    return None
+
+
+def _fit_feedback(text: str, feedback: str) -> str:
+    """Shorten the feedback inside a message text to Telegram's length limit."""
+    excess = len(text) - MAX_MESSAGE_LENGTH
+    if excess <= 0:
+        return text
+    if excess >= len(feedback):
+        return text[:MAX_MESSAGE_LENGTH]
+    shortened = feedback[:max(0, len(feedback) - excess - 1)].rstrip() + "…"
+    return text.replace(feedback, shortened, 1)
+
+
+async def _send_result(bot: Bot, chat_id: int, text: str) -> None:
+    """Send a review result; failures are logged, as the result is already saved."""
+    for _ in range(OUTBOX_MAX_RETRIES):
+        try:
+            await bot.send_message(chat_id, text, reply_markup=get_back_to_menu_keyboard())
+            return
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except TelegramForbiddenError:
+            # User blocked the bot
+            return
+        except (TelegramAPIError, OSError) as e:
+            logger.warning("Failed to send review result to %s: %s", chat_id, e)
+            return
+    logger.warning("Gave up sending review result to %s after flood control", chat_id)
+
+
+async def process_review_job(bot: Bot, job: Dict[str, Any]):
+    """
+    Review a queued submission, record it and send the result to the user.
     
-    # Determine status based on feedback (simple heuristic)
-    status = "completed" if "correct" in feedback.lower() or "good" in feedback.lower() else "attempted"
+    Everything up to recording the submission may fail and be retried by
+    the queue. Recording updates the user's stats and marks the job in
+    the same transaction, and a retry stops there; nothing after it
+    raises (achievement and sending errors are logged), so a submission
+    and its points are counted exactly once and the result is sent.
+    """
+    user_id = job['user_id']
+    code = job['code']
+    language = job['language']
     
-    # Calculate points
+    if job['submission_id']:
+        logger.warning("Review job %s was already recorded as submission #%s", job['id'], job['submission_id'])
+        return
+    
+    challenge = await db.get_challenge(job['challenge_id'])
     user = await db.get_user(user_id)
-    streak = await db.update_streak(user_id)
+    if not challenge or not user:
+        return
+    
+    # Run the test cases locally first
+    tests = await sandbox.grade(code, language, challenge)
+    incremental = False
+    reused = False
+    verdict = None
+    
+    # Fingerprint the code to find near-duplicates of earlier submissions
+    signature = minhash.signature(code, language) if SIMILARITY_ENABLED else None
+    matches = similarity_index.query(challenge['id'], signature)
+    best_match = next((match for match in matches if match['user_id'] != user_id), None)
+    if best_match and best_match['score'] >= SIMILARITY_FLAG_THRESHOLD:
+        logger.info("Submission by %s is %.0f%% similar to submission #%s by %s",
+                    user_id, best_match['score'] * 100, best_match['submission_id'], best_match['user_id'])
+    
+    if tests['verdict'] == "error":
+        # Code doesn't even run: no need to ask the AI
+        feedback = f"""❌ Your code failed before any test could pass:
+{tests['message']}
+
+Fix the error and submit again."""
+        status = "attempted"
+    else:
+        # Reuse a previous review of the same (normalized) code if we have one
+        cached = await review_cache.get(challenge['id'], language, code)
+        if not cached and tests['verdict'] == "passed":
+            cached = await _near_duplicate_review(challenge['id'], language, matches)
+            reused = cached is not None
+        quota_message = None if cached else await ai_quota.check(user_id)
+        if cached:
+            feedback = cached['feedback']
+            status = cached['status']
+            verdict = cached['verdict']
+        elif quota_message:
+            # Over the AI quota: the test results are all we can give
+            feedback = quota_message
+            status = "attempted"
+        else:
+            # A small fix to a reviewed attempt only needs the changes reviewed
+            diff = None
+            if INCREMENTAL_REVIEW_ENABLED:
+                previous = await db.get_latest_submission(user_id, challenge['id'], language)
+                if previous and _has_ai_review(previous['feedback']):
+                    diff = review_diff(previous['code'], code)
+            
+            if diff:
+                incremental = True
+                review = await ai_client.review_changes(
+                    diff, language, challenge['description'], _review_summary(previous),
+                    queue_wait_ms=job['queue_wait_ms'], user_id=user_id
+                )
+            else:
+                # Get AI review
+                review = await ai_client.review_code(
+                    code, language, challenge['description'],
+                    queue_wait_ms=job['queue_wait_ms'], user_id=user_id
+                )
+            
+            feedback = review['feedback']
+            verdict = review['verdict']
+            
+            # Let the queue retry failed API calls before giving up
+            if feedback.startswith("❌") and job['attempts'] < REVIEW_QUEUE_MAX_ATTEMPTS:
+                raise RuntimeError(feedback)
+            
+            # Without a parseable verdict the attempt is not counted as solved
+            status = "completed" if verdict and verdict['verdict'] == "pass" else "attempted"
+        
+        # Test results, when available, decide the status
+        if tests['verdict'] in ("passed", "failed"):
+            status = "completed" if tests['verdict'] == "passed" else "attempted"
+        
+        # Don't cache failed API calls, quota notices or reviews relative to another attempt
+        if not cached and not quota_message and not incremental and not feedback.startswith("❌"):
+            await review_cache.put(challenge['id'], language, code, status, feedback, verdict)
+    
+    if tests['total']:
+        tests_line = f"🧪 Tests: {tests['passed']}/{tests['total']} passed ({tests['elapsed_ms']} ms)"
+        if tests['verdict'] == "failed":
+            tests_line += f"\n{tests['message']}"
+    else:
+        tests_line = "🧪 Tests: not run"
+    
+    # Calculate points
+    streak = db.next_streak(user)
     points_earned = calculate_points(challenge['difficulty'], streak) if status == "completed" else 0
+    new_rating = user['rating'] + points_earned
+    new_total = user['total_challenges'] + 1
+    new_completed = user['completed_challenges'] + (1 if status == "completed" else 0)
+    new_level = calculate_level(new_rating)
     
-    # Save submission
-    await db.add_submission(
+    # Save the submission and update the user's stats at once
+    submission_id = await db.add_submission(
         user_id=user_id,
         challenge_id=challenge['id'],
         code=code,
         language=language,
         status=status,
         feedback=feedback,
-        points_earned=points_earned
-    )
-    
-    # Update user stats
-    new_rating = user['rating'] + points_earned
-    new_total = user['total_challenges'] + 1
-    new_completed = user['completed_challenges'] + (1 if status == "completed" else 0)
-    new_level = calculate_level(new_rating)
-    
-    await db.update_user_stats(
-        user_id,
-        rating=new_rating,
-        level=new_level,
-        total_challenges=new_total,
-        completed_challenges=new_completed
+        points_earned=points_earned,
+        verdict=verdict,
+        signature=signature,
+        best_match=best_match,
+        review_job_id=job['id'],
+        user_stats={
+            'rating': new_rating,
+            'level': new_level,
+            'total_challenges': new_total,
+            'completed_challenges': new_completed,
+            'streak': streak
+        }
     )
+    similarity_index.add(submission_id, challenge['id'], user_id, signature)
     
-    # Check for achievements
-    await check_and_award_achievements(user_id, new_completed, streak)
+    # Check for achievements; the submission is recorded, so a failure
+    # here must not fail the job (a retry would stop before the result)
+    try:
+        await check_and_award_achievements(user_id, new_completed, streak)
+    except Exception:
+        logger.exception("Failed to award achievements to %s", user_id)
     
     # Delete processing message
-    await processing_msg.delete()
+    if job['status_message_id']:
+        try:
+            await bot.delete_message(job['chat_id'], job['status_message_id'])
+        except (TelegramAPIError, OSError):
+            pass
     
     # Send feedback
+    if incremental:
+        feedback_note = " (changes since your last attempt)"
+    elif reused:
+        feedback_note = " (from a review of a near-identical solution)"
+    else:
+        feedback_note = ""
+    verdict_line = f"{format_verdict(verdict)}\n" if verdict else ""
     result_text = f"""✅ Code Review Complete!
 
 📊 Challenge: {challenge['title']}
@@ -147,14 +370,14 @@ Points Earned: +{points_earned} ⭐
 New Rating: {new_rating}
 Level: {new_level} 🎯
 Streak: {streak} 🔥
-
-🤖 AI Feedback:
+{tests_line}
+{verdict_line}
+🤖 AI Feedback{feedback_note}:
 {feedback}
 
 Keep coding! 💪"""
     
-    await message.answer(result_text, reply_markup=get_back_to_menu_keyboard())
-    await state.clear()
+    await _send_result(bot, job['chat_id'], _fit_feedback(result_text, feedback))
 
 
 async def check_and_award_achievements(user_id: int, completed_challenges: int, streak: int):
@@ -119,6 +119,10 @@ def get_admin_stats_keyboard() -> InlineKeyboardMarkup:
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🔄 Refresh", callback_data="admin_stats")],
         [InlineKeyboardButton(text="📈 Recent Activity", callback_data="admin_recent_activity")],
+        [InlineKeyboardButton(text="🤖 AI Metrics", callback_data="admin_ai_metrics")],
+        [InlineKeyboardButton(text="🚦 AI Quotas", callback_data="admin_ai_quotas")],
+        [InlineKeyboardButton(text="🧬 Similar Submissions", callback_data="admin_similar_submissions")],
+        [InlineKeyboardButton(text="🗑️ Purge Review Cache", callback_data="admin_purge_review_cache")],
         [InlineKeyboardButton(text="🔙 Back", callback_data="admin_panel")]
     ])
     return keyboard
@@ -233,12 +237,20 @@ def get_interview_question_actions_keyboard(question_id: int) -> InlineKeyboardM
 def get_broadcast_keyboard() -> InlineKeyboardMarkup:
     """Get broadcast options keyboard."""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📤 Send to All Users", callback_data="admin_broadcast_confirm")],
+        [InlineKeyboardButton(text="📤 Send Broadcast", callback_data="admin_broadcast_confirm")],
         [InlineKeyboardButton(text="❌ Cancel", callback_data="admin_panel")]
     ])
     return keyboard
 
 
+def get_broadcast_progress_keyboard(broadcast_id: int) -> InlineKeyboardMarkup:
+    """Get keyboard for a running broadcast."""
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="⏹ Stop Broadcast", callback_data=f"admin_broadcast_stop_{broadcast_id}")]
+    ])
+    return keyboard
+
+
 def get_confirm_keyboard(action: str, item_id: int) -> InlineKeyboardMarkup:
     """Get confirmation keyboard for destructive actions."""
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -1,11 +1,28 @@
 """Main bot entry point."""
 import asyncio
+import hashlib
 import logging
+import signal
+from aiohttp import web
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from bot.config import TELEGRAM_BOT_TOKEN
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from bot.config import (
+    TELEGRAM_BOT_TOKEN, BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_HOST, WEBHOOK_PORT,
+    WEBHOOK_SECRET, WEBHOOK_REMOVE_ON_SHUTDOWN, BOT_WORKERS
+)
 from database.db import Database
-from bot.utils.scheduler import BotScheduler
+from bot.utils.scheduler import bot_scheduler
+from bot.sandbox.pool import sandbox
+from bot.ai.mistral_client import ai_client
+from bot.ai.quota import ai_quota
+from bot.ai.hints import hint_generator
+from bot.ai.answer_scoring import answer_scorer
+from bot.utils.question_store import question_store
+from bot.utils.review_queue import review_queue
+from bot.utils.similarity import similarity_index
+from bot.utils.broadcast import broadcast_engine
+from bot.utils.outbox import outbox
+from bot.utils.fsm_storage import fsm_storage
 
 # Import handlers
 from bot.handlers import start, challenges, submissions, interview, profile, leaderboard, admin
@@ -18,17 +35,60 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    """Main bot function."""
-    # Initialize bot and dispatcher
-    bot = Bot(token=TELEGRAM_BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
+def get_webhook_secret() -> str:
+    """Get the webhook secret token; the same in every worker without extra config."""
+    if WEBHOOK_SECRET:
+        return WEBHOOK_SECRET
+    return hashlib.sha256(f"webhook:{TELEGRAM_BOT_TOKEN}".encode("utf-8")).hexdigest()
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher) -> None:
+    """
+    Receive updates on an aiohttp server until SIGINT/SIGTERM.
     
-    # Initialize database
-    db = Database()
-    await db.init_db()
-    logger.info("Database initialized")
+    Updates are acknowledged right away and handled in the background.
+    Requests without the secret token header are rejected.
+    """
+    if not WEBHOOK_BASE_URL:
+        raise RuntimeError("WEBHOOK_BASE_URL must be set in webhook mode")
+    
+    app = web.Application()
+    secret = get_webhook_secret()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    try:
+        # Set only once the server is listening, so no update is refused
+        await bot.set_webhook(
+            f"{WEBHOOK_BASE_URL.rstrip('/')}{WEBHOOK_PATH}",
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types()
+        )
+        logger.info("Bot started (webhook on %s:%s%s)", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH)
+        await stop.wait()
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        if WEBHOOK_REMOVE_ON_SHUTDOWN:
+            await bot.delete_webhook()
+        # Finishes requests in flight before closing
+        await runner.cleanup()
+
+
+def create_dispatcher() -> Dispatcher:
+    """Create the dispatcher with every handler registered."""
+    # Conversation states survive restarts (written back on shutdown by the dispatcher)
+    dp = Dispatcher(storage=fsm_storage)
     
     # Register routers
     dp.include_router(start.router)
@@ -39,19 +99,100 @@ async def main():
     dp.include_router(profile.router)
     dp.include_router(leaderboard.router)
     logger.info("Handlers registered")
+    return dp
+
+
+async def start_services(bot: Bot, primary: bool = True) -> None:
+    """
+    Start the background services.
+    
+    Args:
+        bot: Bot instance
+        primary: Also start the services that must run once per deployment
+            (scheduler, bulk sending, hint generation); False in all
+            worker processes but one
+    """
+    # Open the AI connection pool before the first request
+    await ai_client.warm_up()
+    
+    # Delete expired AI usage counters periodically
+    await ai_quota.start()
     
-    # Initialize and start scheduler
-    scheduler = BotScheduler(db)
-    scheduler.start()
+    # Pre-start sandbox workers for local test runs
+    await sandbox.start()
+    
+    # Load the near-duplicate index before reviews need it
+    await similarity_index.load()
+    
+    # Load the interview question bank and build the answer scoring model over it
+    await question_store.load()
+    await answer_scorer.load()
+    
+    # Start review workers
+    await review_queue.start(bot, submissions.process_review_job)
+    logger.info("Review queue started")
+    
+    if not primary:
+        return
+    
+    # Generate hints for challenges that don't have them yet
+    await hint_generator.start()
+    
+    # Start the rate-limited sender used by broadcasts and daily challenge pushes
+    await outbox.start(bot)
+    
+    # Resume broadcasts interrupted by a restart
+    await broadcast_engine.start(bot)
+    
+    # Start the scheduler (runs jobs missed while the bot was down)
+    await bot_scheduler.start()
     logger.info("Scheduler started")
+
+
+async def stop_services(bot: Bot, primary: bool = True) -> None:
+    """Stop the background services started by start_services."""
+    if primary:
+        await bot_scheduler.shutdown()
+    await review_queue.stop()
+    if primary:
+        await broadcast_engine.stop()
+        await outbox.stop()
+        await hint_generator.stop()
+    await ai_quota.stop()
+    await sandbox.close()
+    await ai_client.close()
+    await bot.session.close()
+
+
+async def main():
+    """Main bot function."""
+    # Initialize database
+    db = Database()
+    await db.init_db()
+    logger.info("Database initialized")
+    
+    if BOT_WORKERS:
+        # Updates are handled by worker processes started by the front process
+        from bot.workers import run_front
+        await run_front()
+        return
+    
+    # Initialize bot and dispatcher
+    bot = Bot(token=TELEGRAM_BOT_TOKEN)
+    dp = create_dispatcher()
+    await start_services(bot)
     
-    # Start polling
+    # Start receiving updates
     try:
-        logger.info("Bot started")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if BOT_MODE == "webhook":
+            await run_webhook(bot, dp)
+        else:
+            logger.info("Bot started")
+            # Polling ignores updates while a webhook is set
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
-        scheduler.shutdown()
-        await bot.session.close()
+        await stop_services(bot)
 
 
 if __name__ == "__main__":
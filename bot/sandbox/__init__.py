@@ -0,0 +1 @@
+"""Package initialization for sandbox module."""
\ No newline at end of file
@@ -0,0 +1,86 @@
+// Sandbox harness: runs one submission against test cases and exits.
+//
+// Started by the sandbox supervisor (harness.py) inside its jail and fed a
+// single JSON job line on stdin. Once the submission has run it prints
+// "ready", and the JSON result after the nonce the supervisor then sends.
+'use strict';
+const vm = require('vm');
+
+function camelCase(name) {
+    return name.replace(/_([a-z])/g, (_, c) => c.toUpperCase());
+}
+
+function findFunction(context, code, candidates) {
+    const names = [];
+    for (const name of candidates) {
+        names.push(name, camelCase(name));
+    }
+    // Fall back to the first declared function
+    const declared = code.match(/(?:function\s+([A-Za-z_$][\w$]*))|(?:(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:function|\(|[A-Za-z_$][\w$]*\s*=>))/);
+    if (declared) {
+        names.push(declared[1] || declared[2]);
+    }
+    for (const name of names) {
+        const found = vm.runInContext(`typeof ${name} === 'function' ? ${name} : undefined`, context);
+        if (found) {
+            return found;
+        }
+    }
+    return null;
+}
+
+function run(job) {
+    const context = vm.createContext({ console: { log() {}, error() {}, warn() {}, info() {} } });
+    try {
+        vm.runInContext(job.code, context, { filename: 'submission.js', timeout: job.timeout_ms });
+    } catch (e) {
+        const kind = e instanceof SyntaxError || (e && e.name === 'SyntaxError') ? 'syntax' : 'runtime';
+        return { error: kind, message: String(e && e.message || e) };
+    }
+
+    let func;
+    try {
+        func = findFunction(context, job.code, job.functions);
+    } catch (e) {
+        func = null;
+    }
+    if (!func) {
+        return { error: 'no_function', message: 'No function found in the submission' };
+    }
+
+    const results = [];
+    for (const args of job.cases) {
+        const copy = JSON.parse(JSON.stringify(args));
+        try {
+            let value = func(...copy);
+            // In-place solutions return undefined and mutate their first argument
+            if (value === undefined && copy.length) {
+                value = copy[0];
+            }
+            results.push({ value: value === undefined ? null : JSON.parse(JSON.stringify(value)) });
+        } catch (e) {
+            results.push({ exception: String(e && e.message || e) });
+        }
+    }
+    return { results };
+}
+
+let input = '';
+let result = null;
+process.stdin.setEncoding('utf8');
+process.stdin.on('data', (chunk) => {
+    input += chunk;
+    let newline;
+    while ((newline = input.indexOf('\n')) !== -1) {
+        const line = input.slice(0, newline);
+        input = input.slice(newline + 1);
+        if (result === null) {
+            // The job; results are handed over in answer to the nonce that follows
+            result = JSON.stringify(run(JSON.parse(line)));
+            process.stdout.write('ready\n');
+        } else {
+            process.stdout.write(`${line} ${result}\n`);
+            process.stdin.pause();
+        }
+    }
+});
@@ -0,0 +1,420 @@
+"""Sandbox supervisor: jails itself, runs one submission in a child and exits.
+
+Started ahead of time by the sandbox pool as
+``python -I -S harness.py <language> <settings JSON>``. Before reading
+its job it moves into new mount, PID, network, IPC and UTS namespaces
+(plus a user namespace when not started as root), replaces the root
+with a read-only one holding only the system directories, switches to
+an unprivileged uid and drops every capability. If any step fails it
+reports a "sandbox" error and runs nothing.
+
+The job is then read from stdin and run by a child process, which
+cannot reach the stdout this process prints its single JSON result line
+to. The child hands its results over only in answer to a nonce made up
+after the submission has finished, and they are checked before they
+are passed on.
+"""
+import copy
+import ctypes
+import io
+import json
+import os
+import resource
+import secrets
+import select
+import signal
+import sys
+import time
+import types
+
+_HARNESS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_CLONE_NEWNS = 0x00020000
+_CLONE_NEWUTS = 0x04000000
+_CLONE_NEWIPC = 0x08000000
+_CLONE_NEWUSER = 0x10000000
+_CLONE_NEWPID = 0x20000000
+_CLONE_NEWNET = 0x40000000
+
+_MS_RDONLY = 0x1
+_MS_NOSUID = 0x2
+_MS_NODEV = 0x4
+_MS_NOEXEC = 0x8
+_MS_REMOUNT = 0x20
+_MS_NOATIME = 0x400
+_MS_NODIRATIME = 0x800
+_MS_BIND = 0x1000
+_MS_REC = 0x4000
+_MS_PRIVATE = 0x40000
+_MS_RELATIME = 0x200000
+
+_PR_SET_DUMPABLE = 4
+_PR_CAPBSET_DROP = 24
+_PR_SET_NO_NEW_PRIVS = 38
+_CAP_VERSION_3 = 0x20080522
+
+# Directories the jail sees, read-only; anything else (the bot, its
+# database and .env included) does not exist inside
+_SYSTEM_PATHS = ("/usr", "/bin", "/sbin", "/lib", "/lib32", "/lib64", "/libx32")
+_DEVICES = ("null", "zero", "urandom")
+_MAX_OUTPUT = 1024 * 1024
+
+_libc = ctypes.CDLL(None, use_errno=True)
+
+
+class _CapHeader(ctypes.Structure):
+    _fields_ = [("version", ctypes.c_uint32), ("pid", ctypes.c_int)]
+
+
+class _CapData(ctypes.Structure):
+    _fields_ = [("effective", ctypes.c_uint32), ("permitted", ctypes.c_uint32),
+                ("inheritable", ctypes.c_uint32)]
+
+
+def _check(result, what):
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{what}: {os.strerror(errno)}")
+
+
+def _mount(source, target, fstype, flags, data=None):
+    encode = lambda value: value.encode() if value is not None else None
+    _check(_libc.mount(encode(source), encode(target), encode(fstype), ctypes.c_ulong(flags), encode(data)),
+           f"mount {target}")
+
+
+def _write_file(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _mount_flags(path):
+    """Flags of the mount holding a path, which a read-only remount has to keep."""
+    flags = os.statvfs(path).f_flag
+    mapping = (
+        (os.ST_NOSUID, _MS_NOSUID), (os.ST_NODEV, _MS_NODEV), (os.ST_NOEXEC, _MS_NOEXEC),
+        (os.ST_NOATIME, _MS_NOATIME), (os.ST_NODIRATIME, _MS_NODIRATIME), (os.ST_RELATIME, _MS_RELATIME)
+    )
+    return sum(ms for st, ms in mapping if flags & st)
+
+
+def _jail_paths(settings):
+    """Directories to expose: system ones, the runtimes' prefixes and this one."""
+    paths = [path for path in _SYSTEM_PATHS if os.path.lexists(path)]
+    prefixes = [sys.base_prefix, _HARNESS_DIR]
+    for executable in (settings.get("node"), settings.get("cpp")):
+        if executable:
+            prefixes.append(os.path.dirname(os.path.dirname(os.path.realpath(executable))))
+    
+    for prefix in sorted(set(os.path.realpath(p) for p in prefixes)):
+        covered = any(prefix == path or prefix.startswith(path.rstrip("/") + "/")
+                      for path in paths if not os.path.islink(path))
+        if not covered and prefix != "/":
+            paths.append(prefix)
+    return paths
+
+
+def _jail(settings):
+    """Confine this process; raises OSError if any step fails."""
+    uid, gid = os.getuid(), os.getgid()
+    flags = _CLONE_NEWNS | _CLONE_NEWNET | _CLONE_NEWIPC | _CLONE_NEWUTS | _CLONE_NEWPID
+    if uid != 0:
+        flags |= _CLONE_NEWUSER
+    _check(_libc.unshare(flags), "unshare")
+    if uid != 0:
+        _write_file("/proc/self/setgroups", "deny")
+        _write_file("/proc/self/uid_map", f"{uid} {uid} 1")
+        _write_file("/proc/self/gid_map", f"{gid} {gid} 1")
+    
+    # New root on a tmpfs over the work directory, private to this namespace
+    root = os.getcwd()
+    _mount(None, "/", None, _MS_REC | _MS_PRIVATE)
+    _mount("tmpfs", root, "tmpfs", _MS_NOSUID | _MS_NODEV, "size=1m,mode=755")
+    os.makedirs(root + "/dev")
+    for device in _DEVICES:
+        _write_file(f"{root}/dev/{device}", "")
+        _mount(f"/dev/{device}", f"{root}/dev/{device}", None, _MS_BIND)
+    os.makedirs(root + "/tmp")
+    _mount("tmpfs", root + "/tmp", "tmpfs", _MS_NOSUID | _MS_NODEV, "size=16m,mode=1777")
+    for path in _jail_paths(settings):
+        target = root + path
+        if os.path.islink(path):
+            os.symlink(os.readlink(path), target)
+            continue
+        os.makedirs(target, exist_ok=True)
+        _mount(path, target, None, _MS_BIND | _MS_REC)
+        _mount(None, target, None, _MS_BIND | _MS_REMOUNT | _MS_RDONLY | _MS_NOSUID | _MS_NODEV
+               | _mount_flags(path))
+    os.chroot(root)
+    os.chdir("/")
+    _mount(None, "/", None, _MS_REMOUNT | _MS_RDONLY | _MS_NOSUID | _MS_NODEV)
+    
+    # Drop privileges for good
+    for capability in range(64):
+        _libc.prctl(_PR_CAPBSET_DROP, capability, 0, 0, 0)
+    if uid == 0:
+        os.setgroups([])
+        os.setresgid(settings["gid"], settings["gid"], settings["gid"])
+        os.setresuid(settings["uid"], settings["uid"], settings["uid"])
+    else:
+        data = (_CapData * 2)()
+        _check(_libc.capset(ctypes.byref(_CapHeader(_CAP_VERSION_3, 0)), data), "capset")
+    _check(_libc.prctl(_PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "prctl")
+    # The child runs as the same uid: keep it from tracing this process
+    _check(_libc.prctl(_PR_SET_DUMPABLE, 0, 0, 0, 0), "prctl")
+    
+    processes = settings["max_processes"]
+    resource.setrlimit(resource.RLIMIT_NPROC, (processes, processes))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (1024 * 1024, 1024 * 1024))
+
+
+def _camel_case(name):
+    head, *rest = name.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+def _find_function(namespace, candidates):
+    names = []
+    for name in candidates:
+        names.extend([name, _camel_case(name)])
+    
+    for name in names:
+        func = namespace.get(name)
+        if callable(func) and not isinstance(func, type):
+            return func
+    
+    # LeetCode-style "class Solution"
+    solution_cls = namespace.get("Solution")
+    if isinstance(solution_cls, type):
+        instance = solution_cls()
+        for name in names:
+            if callable(getattr(instance, name, None)):
+                return getattr(instance, name)
+    
+    # Fall back to the first function defined by the submission
+    for value in namespace.values():
+        if isinstance(value, types.FunctionType) and value.__code__.co_filename == "<submission>":
+            return value
+    return None
+
+
+def _run(job):
+    try:
+        compiled = compile(job["code"], "<submission>", "exec")
+    except SyntaxError as e:
+        return {"error": "syntax", "message": f"line {e.lineno}: {e.msg}"}
+    
+    namespace = {"__name__": "__submission__"}
+    try:
+        exec(compiled, namespace)
+    except BaseException as e:
+        return {"error": "runtime", "message": f"{type(e).__name__}: {e}"}
+    
+    func = _find_function(namespace, job["functions"])
+    if func is None:
+        return {"error": "no_function", "message": "No function found in the submission"}
+    
+    results = []
+    for args in job["cases"]:
+        args = copy.deepcopy(args)
+        try:
+            value = func(*args)
+            # In-place solutions return None and mutate their first argument
+            if value is None and args:
+                value = args[0]
+            results.append({"value": json.loads(json.dumps(value, default=repr))})
+        except RecursionError:
+            results.append({"exception": "RecursionError: maximum recursion depth exceeded"})
+        except BaseException as e:
+            results.append({"exception": f"{type(e).__name__}: {e}"})
+    return {"results": results}
+
+
+def _write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read_line(fd):
+    line = b""
+    while not line.endswith(b"\n"):
+        chunk = os.read(fd, 1)
+        if not chunk:
+            break
+        line += chunk
+    return line.strip()
+
+
+def _python_child(job, settings, results_fd, control_fd):
+    """Run the submission in this (forked) process and hand over its results."""
+    memory = settings["memory_mb"] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    cpu_seconds = settings["cpu_seconds"]
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    
+    # The submission's own prints go nowhere
+    sys.stdout = sys.stderr = io.StringIO()
+    result = json.dumps(_run(job))
+    
+    _write_all(results_fd, b"ready\n")
+    nonce = _read_line(control_fd)
+    _write_all(results_fd, nonce + b" " + result.encode() + b"\n")
+
+
+def _start_child(language, job, settings):
+    """Fork the process running the submission; returns (pid, results fd, control fd)."""
+    results_r, results_w = os.pipe()
+    control_r, control_w = os.pipe()
+    pid = os.fork()
+    if pid:
+        os.close(results_w)
+        os.close(control_r)
+        return pid, results_r, control_w
+    
+    try:
+        devnull = os.open(os.devnull, os.O_RDWR)
+        # Only the pipes to this process stay open: stdout to the pool is gone
+        if language == "python":
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            os.dup2(results_w, 3)
+            os.dup2(control_r, 4)
+            os.closerange(5, os.sysconf("SC_OPEN_MAX"))
+            _python_child(job, settings, 3, 4)
+        elif language == "javascript":
+            os.dup2(control_r, 0)
+            os.dup2(results_w, 1)
+            os.dup2(devnull, 2)
+            os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+            node = settings["node"]
+            os.execv(node, [node, f"--max-old-space-size={settings['memory_mb']}",
+                            os.path.join(_HARNESS_DIR, "harness.js")])
+        else:
+            os.dup2(control_r, 0)
+            os.dup2(devnull, 1)
+            os.dup2(results_w, 2)
+            os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+            compiler = settings["cpp"]
+            os.execv(compiler, [compiler, "-std=c++17", "-fsyntax-only", "-x", "c++", "-"])
+    finally:
+        os._exit(1)
+
+
+class _Reader:
+    """Line reader for a child's pipe with a deadline and a size cap."""
+    
+    def __init__(self, fd, deadline):
+        self.fd = fd
+        self.deadline = deadline
+        self.buffer = b""
+        self.eof = False
+    
+    def _fill(self):
+        timeout = self.deadline - time.monotonic()
+        if timeout <= 0 or not select.select([self.fd], [], [], timeout)[0]:
+            raise TimeoutError
+        chunk = os.read(self.fd, 65536)
+        self.eof = not chunk
+        self.buffer += chunk
+    
+    def line(self):
+        """Next line, or None at the end of output."""
+        while b"\n" not in self.buffer and not self.eof and len(self.buffer) <= _MAX_OUTPUT:
+            self._fill()
+        if b"\n" not in self.buffer:
+            return None
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return line
+    
+    def rest(self):
+        """All remaining output."""
+        while not self.eof and len(self.buffer) <= _MAX_OUTPUT:
+            self._fill()
+        return self.buffer
+
+
+def _valid(result, cases):
+    """Whether a child's result has the shape of a harness result."""
+    if not isinstance(result, dict):
+        return False
+    if "error" in result:
+        return isinstance(result["error"], str) and isinstance(result.get("message"), str)
+    results = result.get("results")
+    return isinstance(results, list) and len(results) == len(cases) and all(
+        isinstance(item, dict) and ("value" in item or isinstance(item.get("exception"), str))
+        for item in results
+    )
+
+
+def _collect(language, job, reader, control_fd):
+    """Read the child's result; None if it broke the protocol."""
+    if language == "cpp":
+        _write_all(control_fd, job["code"].encode("utf-8"))
+        os.close(control_fd)
+        errors = [line for line in reader.rest().decode("utf-8", "replace").splitlines() if "error" in line]
+        return {"compile_errors": errors}
+    
+    if language == "javascript":
+        _write_all(control_fd, json.dumps(job).encode("utf-8") + b"\n")
+    if reader.line() != b"ready":
+        return None
+    nonce = secrets.token_hex(16).encode()
+    _write_all(control_fd, nonce + b"\n")
+    tag, _, payload = (reader.line() or b"").partition(b" ")
+    if tag != nonce:
+        return None
+    try:
+        result = json.loads(payload)
+    except ValueError:
+        return None
+    return result if _valid(result, job.get("cases", [])) else None
+
+
+def _supervise(language, job, settings):
+    """Run a job in a child process and return the checked result."""
+    deadline = time.monotonic() + job["timeout_ms"] / 1000
+    pid, results_fd, control_fd = _start_child(language, job, settings)
+    reader = _Reader(results_fd, deadline)
+    try:
+        result = _collect(language, job, reader, control_fd)
+    except TimeoutError:
+        result = {"error": "timeout", "message": f"Time limit exceeded ({job['timeout_ms'] // 1000}s)"}
+    except BrokenPipeError:
+        result = None
+    finally:
+        # The child is PID 1 of its namespace: this takes anything it started too
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        _, status = os.waitpid(pid, 0)
+    
+    if language == "cpp" and result and "compile_errors" in result:
+        if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+            return {}
+        errors = result["compile_errors"]
+        return {"error": "compile", "message": errors[0] if errors else "Compilation failed"}
+    if result is None:
+        if os.WIFEXITED(status):
+            return {"error": "crash", "message": "Exited without reporting results"}
+        if os.WTERMSIG(status) == signal.SIGXCPU:
+            return {"error": "timeout", "message": "CPU time limit exceeded"}
+        return {"error": "crash", "message": "Process crashed (memory limit?)"}
+    return result
+
+
+def main():
+    language, settings = sys.argv[1], json.loads(sys.argv[2])
+    try:
+        _jail(settings)
+    except OSError as e:
+        print(json.dumps({"error": "sandbox", "message": f"Sandbox setup failed: {e}"}), flush=True)
+        return
+    
+    job = json.loads(sys.stdin.read())
+    print(json.dumps(_supervise(language, job, settings)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
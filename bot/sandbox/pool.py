@@ -0,0 +1,252 @@
+"""Sandboxed execution of submissions with a pool of pre-started workers."""
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from bot.config import (
+    SANDBOX_ENABLED, SANDBOX_POOL_SIZE, SANDBOX_TIMEOUT_SECONDS,
+    SANDBOX_COMPILE_TIMEOUT_SECONDS, SANDBOX_MEMORY_LIMIT_MB, SANDBOX_UID, SANDBOX_GID,
+    SANDBOX_MAX_PROCESSES, SANDBOX_MESSAGE_MAX_CHARS, SANDBOX_NODE_PATH, SANDBOX_CPP_COMPILER
+)
+from bot.sandbox.test_cases import parse_test_cases, function_names, values_match
+
+logger = logging.getLogger(__name__)
+
+_HARNESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "harness.py")
+# Extra time for the supervisor to kill a child that hit the time limit
+_GRACE_SECONDS = 2
+
+
+def clean_message(text: Any, limit: int = SANDBOX_MESSAGE_MAX_CHARS) -> str:
+    """Make text from a submission safe to show: one line, no control characters, bounded."""
+    text = re.sub(r"[\x00-\x1f\x7f]+", " ", str(text)).strip()
+    if len(text) > limit:
+        text = text[:limit - 1].rstrip() + "…"
+    return text
+
+
+class SandboxPool:
+    """Runs submissions against test cases in isolated subprocesses."""
+    
+    def __init__(self, size: int = SANDBOX_POOL_SIZE):
+        self.size = size
+        self._workdir = None
+        self._warm: Dict[str, asyncio.Queue] = {}
+        self._refills = set()
+        self._semaphore = asyncio.Semaphore(size)
+        # Why submissions can't be run here, if they can't
+        self.unavailable: Optional[str] = None
+    
+    def _command(self, language: str) -> Optional[List[str]]:
+        """Get the supervisor command for a language, or None if its runtime is missing."""
+        settings = {
+            "uid": SANDBOX_UID,
+            "gid": SANDBOX_GID,
+            "max_processes": SANDBOX_MAX_PROCESSES,
+            "memory_mb": SANDBOX_MEMORY_LIMIT_MB,
+            "cpu_seconds": SANDBOX_TIMEOUT_SECONDS,
+            "node": shutil.which(SANDBOX_NODE_PATH),
+            "cpp": shutil.which(SANDBOX_CPP_COMPILER)
+        }
+        if language == "javascript" and not settings["node"]:
+            return None
+        if language == "cpp" and not settings["cpp"]:
+            return None
+        return [sys.executable, "-I", "-S", _HARNESS, language, json.dumps(settings)]
+    
+    async def _spawn_worker(self, language: str) -> asyncio.subprocess.Process:
+        """Start a supervisor for a language; it jails itself and waits for its job on stdin."""
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix="sandbox-")
+        return await asyncio.create_subprocess_exec(
+            *self._command(language),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=self._workdir,
+            env={"PATH": "/usr/local/bin:/usr/bin:/bin", "LANG": "C.UTF-8"},
+            start_new_session=True
+        )
+    
+    async def _refill(self, language: str) -> None:
+        """Put a fresh worker into the warm queue."""
+        try:
+            process = await self._spawn_worker(language)
+        except OSError as e:
+            logger.warning("Failed to start %s sandbox worker: %s", language, e)
+            return
+        queue = self._warm[language]
+        if queue.full():
+            process.kill()
+            await process.wait()
+        else:
+            queue.put_nowait(process)
+    
+    def _schedule_refill(self, language: str) -> None:
+        """Replace a consumed worker in the background."""
+        task = asyncio.create_task(self._refill(language))
+        self._refills.add(task)
+        task.add_done_callback(self._refills.discard)
+    
+    async def start(self) -> None:
+        """Pre-start workers for every available language."""
+        if not SANDBOX_ENABLED:
+            return
+        for language in ("python", "javascript"):
+            if self._command(language) is None:
+                logger.info("Sandbox runtime for %s not found, skipping", language)
+                continue
+            self._warm[language] = asyncio.Queue(maxsize=self.size)
+            await asyncio.gather(*(self._refill(language) for _ in range(self.size)))
+        
+        # Fail closed: without the jail nothing is run
+        outcome = await self._run(
+            "python", {"code": "def f():\n    return 1", "functions": ["f"], "cases": [[]]},
+            SANDBOX_TIMEOUT_SECONDS
+        )
+        if outcome.get("results") != [{"value": 1}]:
+            self.unavailable = outcome.get("message") or "self-test failed"
+            logger.error("Sandbox unavailable, submissions won't be run: %s", self.unavailable)
+        logger.info("Sandbox pool started: %s", {k: q.qsize() for k, q in self._warm.items()})
+    
+    async def close(self) -> None:
+        """Stop all idle workers."""
+        for task in list(self._refills):
+            task.cancel()
+        for queue in self._warm.values():
+            while not queue.empty():
+                process = queue.get_nowait()
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+        self._warm.clear()
+        if self._workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+    
+    async def _acquire(self, language: str) -> asyncio.subprocess.Process:
+        """Take a warm worker or start one on demand."""
+        queue = self._warm.setdefault(language, asyncio.Queue(maxsize=self.size))
+        self._schedule_refill(language)
+        while not queue.empty():
+            process = queue.get_nowait()
+            if process.returncode is None:
+                return process
+        return await self._spawn_worker(language)
+    
+    async def _communicate(self, process: asyncio.subprocess.Process, data: bytes,
+                           timeout: float) -> Optional[tuple]:
+        """Send input and wait for output, killing the process group on timeout."""
+        try:
+            return await asyncio.wait_for(process.communicate(data), timeout)
+        except asyncio.TimeoutError:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            return None
+    
+    async def _run(self, language: str, job: Dict[str, Any], timeout: int) -> Dict[str, Any]:
+        """Run a job through a supervisor and return its result line."""
+        job = json.dumps({**job, "timeout_ms": timeout * 1000}).encode("utf-8")
+        # C++ is only compiled, rarely enough not to keep workers warm
+        process = await (self._acquire(language) if language in self._warm else self._spawn_worker(language))
+        output = await self._communicate(process, job, timeout + _GRACE_SECONDS)
+        if output is None:
+            return {"error": "timeout", "message": f"Time limit exceeded ({timeout}s)"}
+        
+        lines = output[0].decode("utf-8", "replace").strip().splitlines()
+        try:
+            result = json.loads(lines[-1])
+        except (IndexError, json.JSONDecodeError):
+            result = None
+        if not isinstance(result, dict):
+            return {"error": "sandbox", "message": "Supervisor exited without a result"}
+        return result
+    
+    async def _run_tests(self, language: str, code: str, functions: List[str],
+                         cases: List[List[Any]]) -> Dict[str, Any]:
+        """Run a submission's function on test case arguments."""
+        job = {"code": code, "functions": functions, "cases": cases}
+        return await self._run(language, job, SANDBOX_TIMEOUT_SECONDS)
+    
+    async def _compile_cpp(self, code: str) -> Dict[str, Any]:
+        """Check that C++ code compiles; empty dict if it does."""
+        return await self._run("cpp", {"code": code}, SANDBOX_COMPILE_TIMEOUT_SECONDS)
+    
+    async def grade(self, code: str, language: str, challenge: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a submission against the challenge test cases.
+        
+        Args:
+            code: Submitted source code
+            language: Programming language
+            challenge: Challenge row
+        
+        Returns:
+            Dict with 'verdict' ('passed', 'failed', 'error' or 'skipped'),
+            'passed', 'total', 'message' and 'elapsed_ms'
+        """
+        started = time.perf_counter()
+        result = {"verdict": "skipped", "passed": 0, "total": 0, "message": ""}
+        
+        if not SANDBOX_ENABLED or self.unavailable:
+            return {**result, "elapsed_ms": 0}
+        
+        async with self._semaphore:
+            if language == "cpp" and self._command(language) is not None:
+                # Only compile errors are detected for C++: test inputs carry no types
+                outcome = await self._compile_cpp(code)
+                if outcome.get("error") == "sandbox":
+                    logger.error("C++ sandbox failed: %s", outcome["message"])
+                elif outcome:
+                    result.update(verdict="error", message=clean_message(outcome["message"]))
+            elif self._command(language) is not None:
+                cases = parse_test_cases(challenge.get("test_cases"))
+                if cases:
+                    outcome = await self._run_tests(
+                        language, code, function_names(challenge.get("solution")),
+                        [args for args, _ in cases]
+                    )
+                    if outcome.get("error") == "sandbox":
+                        # Not the submission's fault, and nothing was run
+                        logger.error("%s sandbox failed: %s", language, outcome["message"])
+                    else:
+                        result.update(self._score(outcome, cases))
+        
+        result["elapsed_ms"] = int((time.perf_counter() - started) * 1000)
+        logger.info("Sandbox %s: %s (%d/%d) in %d ms", language, result["verdict"],
+                    result["passed"], result["total"], result["elapsed_ms"])
+        return result
+    
+    @staticmethod
+    def _score(outcome: Dict[str, Any], cases: List[tuple]) -> Dict[str, Any]:
+        """Compare harness output with the expected values."""
+        total = len(cases)
+        if "error" in outcome:
+            return {"verdict": "error", "passed": 0, "total": total, "message": clean_message(outcome["message"])}
+        
+        passed = 0
+        message = ""
+        for index, ((args, expected), actual) in enumerate(zip(cases, outcome["results"]), 1):
+            if "exception" in actual:
+                message = message or f"Test {index}: {actual['exception']}"
+            elif values_match(actual["value"], expected):
+                passed += 1
+            else:
+                message = message or f"Test {index}: expected {expected!r}, got {actual['value']!r}"
+        message = clean_message(message)
+        
+        verdict = "passed" if passed == total else "failed"
+        return {"verdict": verdict, "passed": passed, "total": total, "message": message}
+
+
+sandbox = SandboxPool()
@@ -0,0 +1,127 @@
+"""Parsing of challenge test cases and comparison of results."""
+import ast
+import json
+import math
+import re
+from typing import Any, List, Optional, Tuple
+
+_TEST_CASE_RE = re.compile(r'Input:\s*(.+?)\s*\n\s*Expected:\s*(.+?)\s*(?:\n|$)')
+_FUNCTION_RE = re.compile(r'^def\s+(\w+)\s*\(', re.MULTILINE)
+
+# JSON/JavaScript spellings accepted in test case literals
+_NAME_CONSTANTS = {
+    "true": True, "false": False, "null": None,
+    "True": True, "False": False, "None": None
+}
+
+
+class _NameToConstant(ast.NodeTransformer):
+    """Replace true/false/null names with constants for literal_eval."""
+    
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in _NAME_CONSTANTS:
+            return ast.copy_location(ast.Constant(_NAME_CONSTANTS[node.id]), node)
+        return node
+
+
+def _literal(node: ast.AST) -> Any:
+    """Evaluate a literal expression node."""
+    return ast.literal_eval(_NameToConstant().visit(node))
+
+
+def parse_value(text: str) -> Any:
+    """
+    Parse a single expected value.
+    
+    Args:
+        text: Literal in Python or JSON syntax
+    
+    Returns:
+        Parsed value
+    """
+    return _literal(ast.parse(text.strip(), mode="eval").body)
+
+
+def parse_arguments(text: str) -> List[Any]:
+    """
+    Parse a test case input line into positional arguments.
+    
+    Both "[1,2], 3" and "nums = [1,2], k = 3" forms are supported;
+    named arguments are passed in the order they are written.
+    
+    Args:
+        text: Input line from a test case
+    
+    Returns:
+        List of arguments
+    """
+    call = ast.parse(f"f({text.strip()})", mode="eval").body
+    return [_literal(arg) for arg in call.args] + [_literal(kw.value) for kw in call.keywords]
+
+
+def parse_test_cases(test_cases: str) -> List[Tuple[List[Any], Any]]:
+    """
+    Parse challenge test cases.
+    
+    Accepts the "Input: ... / Expected: ..." text format used in
+    data/challenges.json and a JSON list of {"input": ..., "expected": ...}
+    objects as entered in the admin panel.
+    
+    Args:
+        test_cases: Raw test_cases column
+    
+    Returns:
+        List of (arguments, expected) pairs; empty if nothing could be parsed
+    """
+    try:
+        data = json.loads(test_cases)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+    
+    cases = []
+    try:
+        if isinstance(data, list):
+            for item in data:
+                args = item["input"]
+                if isinstance(args, str):
+                    args = parse_arguments(args)
+                elif not isinstance(args, list):
+                    args = [args]
+                cases.append((args, item["expected"]))
+        else:
+            for args_text, expected_text in _TEST_CASE_RE.findall(test_cases or ""):
+                cases.append((parse_arguments(args_text), parse_value(expected_text)))
+    except (ValueError, SyntaxError, KeyError, TypeError):
+        return []
+    
+    return cases
+
+
+def function_names(challenge_solution: Optional[str]) -> List[str]:
+    """Get candidate entry point names from the reference solution."""
+    return _FUNCTION_RE.findall(challenge_solution or "")[:1]
+
+
+def values_match(actual: Any, expected: Any) -> bool:
+    """
+    Compare a result with the expected value.
+    
+    Tuples and lists are treated the same and floats are compared with a
+    small tolerance.
+    
+    Args:
+        actual: Value returned by the submission
+        expected: Expected value from the test case
+    
+    Returns:
+        True if the values match
+    """
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return actual == expected
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(actual, expected, rel_tol=1e-6, abs_tol=1e-9)
+    if isinstance(expected, (list, tuple)) and isinstance(actual, (list, tuple)):
+        return len(actual) == len(expected) and all(
+            values_match(a, e) for a, e in zip(actual, expected)
+        )
+    return actual == expected
@@ -1,9 +1,10 @@
 """Admin utility functions."""
+import re
 from typing import Dict, Any
-from aiogram import Bot
-from database.db import Database
 from bot.config import ADMIN_USER_IDS
-import asyncio
+
+# Characters with a meaning in Telegram's (legacy) Markdown
+_MARKDOWN_SPECIAL = re.compile(r'([_*`\[])')
 
 
 def is_admin(user_id: int) -> bool:
@@ -11,6 +12,11 @@ def is_admin(user_id: int) -> bool:
     return user_id in ADMIN_USER_IDS
 
 
+def escape_markdown(text: str) -> str:
+    """Escape user-provided text (e.g. usernames) for a parse_mode='Markdown' message."""
+    return _MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
 def format_user_info(user: Dict[str, Any], detailed: bool = False) -> str:
     """Format user data for display."""
     is_banned = user.get('is_banned', 0)
@@ -89,37 +95,6 @@ Created: {question['created_at'][:10]}
     return info.strip()
 
 
-async def broadcast_message(bot: Bot, db: Database, message_text: str, 
-                           exclude_banned: bool = True) -> Dict[str, int]:
-    """
-    Broadcast message to all users.
-    
-    Returns dict with 'success' and 'failed' counts.
-    """
-    users = await db.get_all_users(limit=10000)  # Get all users
-    
-    success_count = 0
-    failed_count = 0
-    
-    for user in users:
-        # Skip banned users if requested
-        if exclude_banned and user.get('is_banned'):
-            continue
-        
-        try:
-            await bot.send_message(user['user_id'], message_text, parse_mode='Markdown')
-            success_count += 1
-            # Small delay to avoid rate limiting
-            await asyncio.sleep(0.05)
-        except Exception:
-            failed_count += 1
-    
-    return {
-        'success': success_count,
-        'failed': failed_count
-    }
-
-
 def validate_challenge_data(data: Dict[str, Any]) -> tuple[bool, str]:
     """
     Validate challenge data.
@@ -0,0 +1,252 @@
+"""Background broadcasts with Telegram rate limiting and resumable progress."""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from database.db import Database
+from bot.utils.leader import instance_id
+from bot.utils.rate_limit import TokenBucket
+from bot.utils.outbox import outbox
+from bot.utils.segments import Segment, stream_user_id_batches
+from bot.keyboards import get_admin_menu, get_broadcast_progress_keyboard
+from bot.config import (
+    BROADCAST_RATE_PER_SECOND, BROADCAST_CONCURRENCY, BROADCAST_PROGRESS_INTERVAL_SECONDS,
+    BROADCAST_LEASE_SECONDS, BROADCAST_RENEW_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+def format_broadcast_progress(broadcast: Dict[str, Any], rate: Optional[float] = None) -> str:
+    """Render broadcast progress for the admin."""
+    done = broadcast['sent'] + broadcast['failed'] + broadcast['blocked']
+    total = max(broadcast['total'], done)
+    title = {
+        'running': "📤 **Broadcasting...**",
+        'completed': "✅ **Broadcast Complete**",
+        'cancelled': "⏹ **Broadcast Stopped**"
+    }.get(broadcast['status'], "📢 **Broadcast**")
+    
+    text = f"""{title}
+
+📊 Progress: {done}/{total} ({done / total:.0%})
+• Sent: {broadcast['sent']}
+• Failed: {broadcast['failed']}
+• Blocked the bot: {broadcast['blocked']}""" if total else f"{title}\n\n📊 No recipients."
+
+    if broadcast['status'] == 'running' and rate:
+        remaining = max(0, total - done)
+        text += f"\n\n⚡ {rate:.1f} msg/s, about {remaining / rate / 60:.0f} min left"
+    return text
+
+
+class BroadcastEngine:
+    """Sends broadcasts in the background, one task per broadcast.
+    
+    Recipients matching the broadcast's segment are streamed from the
+    database in batches of BROADCAST_BATCH_SIZE and sent concurrently through the
+    shared outbound queue, capped at BROADCAST_RATE_PER_SECOND for all broadcasts.
+    Progress is checkpointed after every batch, so running broadcasts
+    continue after a restart (a batch interrupted midway is sent again).
+    
+    The instance sending a broadcast holds a lease on it, renewed every
+    BROADCAST_RENEW_SECONDS. Other instances (e.g. the old one of a
+    blue/green deploy, still draining) resume only broadcasts whose
+    lease has expired, and a sender that lost its lease stops.
+    """
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        self.bucket = TokenBucket(BROADCAST_RATE_PER_SECOND)
+        self.holder = instance_id()
+        self._semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._broadcasts: Dict[int, Dict[str, Any]] = {}
+        self._cancelled = set()
+        self._bot: Optional[Bot] = None
+        self._watcher: Optional[asyncio.Task] = None
+    
+    async def start(self, bot: Bot) -> None:
+        """Resume broadcasts interrupted by a restart, and later ones whose sender stops."""
+        self._bot = bot
+        await self._resume()
+        self._watcher = asyncio.create_task(self._watch())
+    
+    async def stop(self) -> None:
+        """Stop sending; running broadcasts stay 'running' and another instance resumes them."""
+        if self._watcher:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        tasks = dict(self._tasks)
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        self._tasks = {}
+        for broadcast_id in tasks:
+            await self.db.release_broadcast(broadcast_id, self.holder)
+    
+    async def _claim(self, broadcast_id: int) -> bool:
+        """Take or renew the lease on a broadcast."""
+        now = time.time()
+        return await self.db.claim_broadcast(broadcast_id, self.holder, now, now + BROADCAST_LEASE_SECONDS)
+    
+    async def _resume(self) -> None:
+        """Start sending the running broadcasts nobody holds."""
+        for broadcast in await self.db.get_running_broadcasts():
+            if broadcast['id'] in self._tasks or not await self._claim(broadcast['id']):
+                continue
+            # Read again: the previous holder may have checkpointed meanwhile
+            broadcast = await self.db.get_broadcast(broadcast['id'])
+            logger.info("Resuming broadcast %s after user %s", broadcast['id'], broadcast['last_user_id'])
+            self._spawn(self._bot, broadcast)
+    
+    async def _watch(self) -> None:
+        """Renew the leases of our broadcasts and resume abandoned ones until cancelled."""
+        while True:
+            await asyncio.sleep(BROADCAST_RENEW_SECONDS)
+            try:
+                for broadcast_id, task in list(self._tasks.items()):
+                    if await self._claim(broadcast_id):
+                        continue
+                    if self._broadcasts.get(broadcast_id, {}).get('status') == 'running':
+                        logger.warning("Broadcast %s was taken over by another instance", broadcast_id)
+                        task.cancel()
+                await self._resume()
+            except Exception:
+                logger.exception("Failed to renew or resume broadcasts")
+    
+    async def create(self, bot: Bot, admin_id: int, text: str, segment: Segment,
+                     progress_chat_id: int, progress_message_id: int) -> int:
+        """
+        Start broadcasting a message to a segment of users.
+        
+        Args:
+            bot: Bot instance
+            admin_id: Admin who sent the broadcast
+            text: Message text (Markdown)
+            segment: Audience (banned users are always excluded)
+            progress_chat_id: Chat of the message to edit with progress
+            progress_message_id: Message to edit with progress
+        
+        Returns:
+            Broadcast ID
+        """
+        total = await self.db.count_segment_users(*segment.compile())
+        broadcast_id = await self.db.create_broadcast(
+            admin_id, text, segment.to_json(), total, progress_chat_id, progress_message_id,
+            self.holder, time.time() + BROADCAST_LEASE_SECONDS
+        )
+        self._spawn(bot, await self.db.get_broadcast(broadcast_id))
+        return broadcast_id
+    
+    def cancel(self, broadcast_id: int) -> bool:
+        """Ask a running broadcast to stop after the messages in flight."""
+        if broadcast_id not in self._tasks:
+            return False
+        self._cancelled.add(broadcast_id)
+        return True
+    
+    def _spawn(self, bot: Bot, broadcast: Dict[str, Any]) -> None:
+        task = asyncio.create_task(self._run(bot, broadcast))
+        self._tasks[broadcast['id']] = task
+        self._broadcasts[broadcast['id']] = broadcast
+        
+        def forget(_):
+            self._tasks.pop(broadcast['id'], None)
+            self._broadcasts.pop(broadcast['id'], None)
+        
+        task.add_done_callback(forget)
+    
+    async def _send(self, bot: Bot, broadcast_id: int, user_id: int, text: str) -> Optional[str]:
+        """
+        Send one message.
+        
+        Returns:
+            'sent', 'blocked' (user blocked the bot or deleted the account),
+            'failed', or None if the broadcast was cancelled first
+        """
+        async with self._semaphore:
+            if broadcast_id in self._cancelled:
+                return None
+            await self.bucket.acquire()
+            return await outbox.send(user_id, text, parse_mode='Markdown')
+    
+    async def _report(self, bot: Bot, broadcast: Dict[str, Any], rate: Optional[float] = None) -> None:
+        """Edit the admin's progress message."""
+        if not broadcast['progress_message_id']:
+            return
+        reply_markup = get_broadcast_progress_keyboard(broadcast['id']) \
+            if broadcast['status'] == 'running' else get_admin_menu()
+        try:
+            await bot.edit_message_text(
+                format_broadcast_progress(broadcast, rate),
+                chat_id=broadcast['progress_chat_id'],
+                message_id=broadcast['progress_message_id'],
+                reply_markup=reply_markup,
+                parse_mode='Markdown'
+            )
+        except TelegramBadRequest:
+            # Unchanged text or a deleted message
+            pass
+    
+    async def _report_periodically(self, bot: Bot, broadcast: Dict[str, Any]) -> None:
+        """Keep the progress message current while the broadcast runs."""
+        started = time.monotonic()
+        done_at_start = broadcast['sent'] + broadcast['failed'] + broadcast['blocked']
+        while True:
+            await asyncio.sleep(BROADCAST_PROGRESS_INTERVAL_SECONDS)
+            done = broadcast['sent'] + broadcast['failed'] + broadcast['blocked']
+            await self._report(bot, broadcast, (done - done_at_start) / (time.monotonic() - started))
+    
+    async def _checkpoint(self, broadcast: Dict[str, Any]) -> bool:
+        """Save progress; False if another instance took the broadcast over."""
+        if await self.db.checkpoint_broadcast(
+            broadcast['id'], self.holder, broadcast['last_user_id'],
+            broadcast['sent'], broadcast['failed'], broadcast['blocked']
+        ):
+            return True
+        logger.warning("Broadcast %s was taken over by another instance", broadcast['id'])
+        return False
+    
+    async def _run(self, bot: Bot, broadcast: Dict[str, Any]) -> None:
+        """Send a broadcast from its checkpoint to the end."""
+        broadcast_id = broadcast['id']
+        reporter = asyncio.create_task(self._report_periodically(bot, broadcast))
+        
+        async def send(user_id: int) -> None:
+            result = await self._send(bot, broadcast_id, user_id, broadcast['text'])
+            if result:
+                broadcast[result] += 1
+        
+        try:
+            segment = Segment.from_json(broadcast['segment'])
+            async for recipients in stream_user_id_batches(self.db, segment, broadcast['last_user_id']):
+                await asyncio.gather(*(send(user_id) for user_id in recipients))
+                if broadcast_id in self._cancelled:
+                    # Don't skip recipients whose messages were never sent
+                    break
+                
+                broadcast['last_user_id'] = recipients[-1]
+                if not await self._checkpoint(broadcast):
+                    return
+            
+            if not await self._checkpoint(broadcast):
+                return
+            broadcast['status'] = 'cancelled' if broadcast_id in self._cancelled else 'completed'
+            await self.db.finish_broadcast(broadcast_id, self.holder, broadcast['status'])
+            logger.info(
+                "Broadcast %s %s: %s sent, %s failed, %s blocked", broadcast_id, broadcast['status'],
+                broadcast['sent'], broadcast['failed'], broadcast['blocked']
+            )
+        except Exception:
+            logger.exception("Broadcast %s stopped with an error; it resumes once its lease expires", broadcast_id)
+        finally:
+            reporter.cancel()
+            self._cancelled.discard(broadcast_id)
+        await self._report(bot, broadcast)
+
+
+broadcast_engine = BroadcastEngine()
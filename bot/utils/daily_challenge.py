@@ -0,0 +1,201 @@
+"""Deterministic daily challenge selection over a cached challenge catalog."""
+import asyncio
+import hashlib
+import logging
+from array import array
+from datetime import date
+from typing import Any, Collection, Dict, List, Optional
+from database.db import Database
+from bot.utils.timezones import local_date
+from bot.config import DAILY_CHALLENGE_SALT
+
+logger = logging.getLogger(__name__)
+
+
+def difficulty_for_level(level: int) -> str:
+    """Get the daily challenge difficulty for a user level."""
+    if level <= 3:
+        return "easy"
+    elif level <= 7:
+        return "medium"
+    return "hard"
+
+
+def format_daily_challenge(challenge: Dict[str, Any]) -> str:
+    """Render a daily challenge message."""
+    difficulty_emoji = {
+        "easy": "🟢",
+        "medium": "🟡",
+        "hard": "🔴"
+    }.get(challenge['difficulty'].lower(), "⚪")
+    
+    return f"""📝 Daily Challenge
+
+{difficulty_emoji} {challenge['title']}
+Difficulty: {challenge['difficulty'].capitalize()}
+Language: {challenge['language'].upper()}
+Points: {challenge['points']} ⭐
+
+📋 Description:
+{challenge['description']}
+
+🧪 Test Cases:
+{challenge['test_cases']}
+
+Good luck! 🚀"""
+
+
+def _day_hash(user_id: int, day: date) -> int:
+    """Stable hash of a user and a day (unlike hash(), the same across restarts)."""
+    key = f"{DAILY_CHALLENGE_SALT}:{user_id}:{day.isoformat()}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+class DailyChallengeSelector:
+    """Picks each user's daily challenge without storing anything up front.
+    
+    The pick is a hash of the user ID, the date and a salt over the sorted
+    challenge IDs of the user's difficulty, skipping challenges the user
+    already solved, so it can be recomputed anywhere at any time. A row in
+    user_daily_challenges is only written when the user opens or submits
+    the challenge, which pins it for the rest of the day.
+    """
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        self.challenges: Dict[int, Dict[str, Any]] = {}
+        # difficulty -> sorted challenge IDs
+        self._ids: Dict[str, array] = {}
+        # challenge ID -> rendered message, filled on first use
+        self._texts: Dict[int, str] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+    
+    def invalidate(self) -> None:
+        """Mark the catalog as changed by an admin; it is reloaded on next use."""
+        self._loaded = False
+    
+    async def load(self) -> None:
+        """Load the challenge catalog (no-op while it is up to date)."""
+        async with self._lock:
+            if self._loaded:
+                return
+            challenges = await self.db.get_challenge_catalog()
+            ids: Dict[str, array] = {}
+            for challenge in challenges:
+                ids.setdefault(challenge['difficulty'].lower(), array("q")).append(challenge['id'])
+            self.challenges = {challenge['id']: challenge for challenge in challenges}
+            self._ids = ids
+            self._texts = {}
+            self._loaded = True
+            logger.info("Challenge catalog loaded: %d challenges", len(challenges))
+    
+    async def get_challenge(self, challenge_id: int) -> Optional[Dict[str, Any]]:
+        """Get a challenge from the catalog."""
+        if not self._loaded:
+            await self.load()
+        return self.challenges.get(challenge_id)
+    
+    def render(self, challenge_id: int) -> str:
+        """Get a challenge's daily challenge message, rendered once per catalog load."""
+        text = self._texts.get(challenge_id)
+        if text is None:
+            text = self._texts[challenge_id] = format_daily_challenge(self.challenges[challenge_id])
+        return text
+    
+    def select(self, user_id: int, level: int, day: date,
+               solved_ids: Collection[int] = ()) -> Optional[int]:
+        """
+        Compute a user's daily challenge ID.
+        
+        Call load() first. Starting from the hashed position, the first
+        unsolved challenge is taken; if every challenge of the difficulty is
+        solved, the hashed one is repeated.
+        
+        Args:
+            user_id: User ID
+            level: User level (decides the difficulty)
+            day: Day to pick for
+            solved_ids: Challenges the user already solved
+        
+        Returns:
+            Challenge ID, or None if there are no challenges of the difficulty
+        """
+        ids = self._ids.get(difficulty_for_level(level))
+        if not ids:
+            return None
+        start = _day_hash(user_id, day) % len(ids)
+        for offset in range(len(ids)):
+            challenge_id = ids[(start + offset) % len(ids)]
+            if challenge_id not in solved_ids:
+                return challenge_id
+        return ids[start]
+    
+    async def today(self, user: Dict[str, Any], day: Optional[date] = None,
+                    persist: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Get a user's daily challenge, pinning it when `persist` is set.
+        
+        Args:
+            user: User row
+            day: Day to pick for (defaults to today in the user's time zone)
+            persist: Store the pick (the user is opening it)
+        
+        Returns:
+            Challenge row, or None if there are no challenges
+        """
+        if not self._loaded:
+            await self.load()
+        day = day or local_date(user)
+        challenge_id = await self.db.get_daily_challenge_id(user['user_id'], day.isoformat())
+        if challenge_id is None:
+            solved = await self.db.get_solved_challenge_ids(user['user_id'])
+            challenge_id = self.select(user['user_id'], user['level'], day, solved)
+            if challenge_id is None:
+                return None
+            if persist:
+                await self.db.assign_daily_challenge(user['user_id'], challenge_id, day.isoformat())
+        return self.challenges.get(challenge_id)
+    
+    async def pick_batch(self, users: List[Dict[str, Any]], day: date) -> Dict[int, Dict[str, Any]]:
+        """
+        Get the daily challenges of many users for one day, without pinning them.
+        
+        Same picks as today(persist=False), with one query for the pinned
+        challenges and one for the solved ones instead of two per user.
+        
+        Args:
+            users: User rows
+            day: Day to pick for
+        
+        Returns:
+            Challenge rows by user ID; users without a challenge are left out
+        """
+        if not self._loaded:
+            await self.load()
+        user_ids = [user['user_id'] for user in users]
+        pinned = await self.db.get_daily_challenge_ids_for_users(user_ids, day.isoformat())
+        solved = await self.db.get_solved_challenge_ids_for_users(
+            [user_id for user_id in user_ids if user_id not in pinned]
+        )
+        
+        picks = {}
+        for user in users:
+            challenge_id = pinned.get(user['user_id'])
+            if challenge_id is None:
+                challenge_id = self.select(user['user_id'], user['level'], day, solved.get(user['user_id'], ()))
+            challenge = self.challenges.get(challenge_id)
+            if challenge:
+                picks[user['user_id']] = challenge
+        return picks
+    
+    async def record_submission(self, user: Dict[str, Any], challenge_id: int,
+                                day: Optional[date] = None) -> None:
+        """Pin today's challenge if the user is submitting it without having opened it."""
+        day = day or local_date(user)
+        challenge = await self.today(user, day, persist=False)
+        if challenge and challenge['id'] == challenge_id:
+            await self.db.assign_daily_challenge(user['user_id'], challenge_id, day.isoformat())
+
+
+daily_challenges = DailyChallengeSelector()
@@ -0,0 +1,173 @@
+"""Persistent FSM storage: SQLite with an in-memory LRU front and batched write-back."""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from copy import copy
+from typing import Any, Dict, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from database.db import Database
+from bot.config import (
+    FSM_CACHE_SIZE, FSM_STATE_TTL_SECONDS, FSM_FLUSH_INTERVAL_SECONDS, FSM_FLUSH_BATCH_SIZE,
+    FSM_CLEANUP_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Record:
+    """A conversation's state and data."""
+    __slots__ = ("state", "data", "updated_at")
+    
+    def __init__(self, state: Optional[str] = None, data: Optional[Dict[str, Any]] = None,
+                 updated_at: float = 0.0):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.updated_at = updated_at
+    
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+def _key(key: StorageKey) -> str:
+    return (f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or 0}:"
+            f"{key.business_connection_id or ''}:{key.destiny}")
+
+
+class SQLiteStorage(BaseStorage):
+    """aiogram FSM storage that survives restarts.
+    
+    Conversations are served from an LRU cache of FSM_CACHE_SIZE entries;
+    a miss reads one row from fsm_states. Changes are kept in memory and
+    written back in one transaction every FSM_FLUSH_INTERVAL_SECONDS, or
+    sooner once FSM_FLUSH_BATCH_SIZE conversations changed, so a crash
+    loses at most that much. Conversations idle for FSM_STATE_TTL_SECONDS
+    read as empty and are deleted periodically.
+    
+    The cache assumes one process owns each chat: with several processes,
+    route every chat's updates to the same one.
+    """
+    
+    def __init__(self, db: Optional[Database] = None, cache_size: int = FSM_CACHE_SIZE,
+                 ttl: float = FSM_STATE_TTL_SECONDS, flush_interval: float = FSM_FLUSH_INTERVAL_SECONDS,
+                 flush_batch_size: int = FSM_FLUSH_BATCH_SIZE):
+        self.db = db or Database()
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        # Changed since the last flush (kept here even when evicted from the cache)
+        self._dirty: Dict[str, _Record] = {}
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_cleanup = 0.0
+    
+    def _remember(self, key: str, record: _Record) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    async def _load(self, key: str) -> _Record:
+        """Get a conversation from the cache, pending writes or the database."""
+        record = self._cache.get(key)
+        if record is None:
+            record = self._dirty.get(key)
+        if record is None:
+            row = await self.db.get_fsm_record(key)
+            # Another update of the chat may have loaded or changed it meanwhile
+            record = self._cache.get(key) or self._dirty.get(key)
+            if record is None:
+                record = _Record(row[0], json.loads(row[1]), row[2]) if row else _Record()
+        
+        if not record.empty and record.updated_at < time.time() - self.ttl:
+            record = _Record()
+        self._remember(key, record)
+        return record
+    
+    def _write(self, key: str, record: _Record) -> None:
+        """Update a conversation and schedule its write-back."""
+        record.updated_at = time.time()
+        self._remember(key, record)
+        self._dirty[key] = record
+        
+        if self._flusher is None or self._flusher.done():
+            self._flush_requested = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_periodically())
+        if len(self._dirty) >= self.flush_batch_size:
+            self._flush_requested.set()
+    
+    async def flush(self) -> None:
+        """Write pending changes to the database."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        try:
+            # Serialized now: records may change again while the write runs
+            records = [
+                (key, record.state, json.dumps(record.data), record.updated_at)
+                for key, record in dirty.items() if not record.empty
+            ]
+            deleted_keys = [key for key, record in dirty.items() if record.empty]
+            await self.db.save_fsm_records(records, deleted_keys)
+        except BaseException:
+            # Keep them for the next flush, unless changed again since
+            for key, record in dirty.items():
+                self._dirty.setdefault(key, record)
+            raise
+    
+    async def _flush_periodically(self) -> None:
+        """Write back changes and delete expired conversations until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            
+            try:
+                await self.flush()
+                if time.time() - self._last_cleanup >= FSM_CLEANUP_INTERVAL_SECONDS:
+                    self._last_cleanup = time.time()
+                    expired = await self.db.delete_expired_fsm_records(self._last_cleanup - self.ttl)
+                    if expired:
+                        logger.info("Deleted %d expired conversations", expired)
+            except Exception:
+                logger.exception("FSM write-back failed; retrying")
+    
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = _key(key)
+        record = await self._load(k)
+        record.state = state.state if isinstance(state, State) else state
+        self._write(k, record)
+    
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(_key(key))).state
+    
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        k = _key(key)
+        record = await self._load(k)
+        record.data = data.copy()
+        self._write(k, record)
+    
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._load(_key(key))).data.copy()
+    
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Optional[Any] = None) -> Optional[Any]:
+        data = (await self._load(_key(storage_key))).data
+        return copy(data.get(dict_key, default))
+    
+    async def close(self) -> None:
+        """Stop the background writer and write back what is pending."""
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+
+fsm_storage = SQLiteStorage()
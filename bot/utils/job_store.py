@@ -0,0 +1,131 @@
+"""APScheduler job store in the bot's SQLite database."""
+import logging
+import pickle
+import queue
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Optional, Tuple
+from apscheduler.job import Job
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+from database.models import SCHEDULER_JOBS_TABLE, SCHEDULER_JOBS_INDEX
+from bot.config import DATABASE_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteJobStore(MemoryJobStore):
+    """Keeps scheduled jobs in the apscheduler_jobs table.
+    
+    Same layout as APScheduler's SQLAlchemyJobStore. Job stores are called
+    synchronously from the event loop, where waiting for an SQLite lock
+    held by an aiosqlite transaction of the same process would never end:
+    that transaction needs the loop to commit. So jobs are served from
+    memory, loaded on start (and on reload()), and every change is written
+    to SQLite by a background thread in order.
+    
+    Jobs must reference their callable textually ("module:attribute"),
+    since that is what is stored.
+    """
+    
+    def __init__(self, db_path: str = DATABASE_PATH, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.db_path = db_path
+        self.pickle_protocol = pickle_protocol
+        self._writes: "queue.Queue[Optional[Tuple[str, Tuple[Any, ...]]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+    
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        with closing(self._connect()) as connection:
+            connection.execute(SCHEDULER_JOBS_TABLE)
+            connection.execute(SCHEDULER_JOBS_INDEX)
+        self.reload()
+        self._writer = threading.Thread(target=self._write_changes, name="job-store-writer", daemon=True)
+        self._writer.start()
+    
+    def reload(self) -> None:
+        """Replace the jobs in memory with the stored ones, e.g. those another instance updated."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT id, job_state FROM apscheduler_jobs").fetchall()
+        
+        super().remove_all_jobs()
+        for job_id, job_state in rows:
+            try:
+                super().add_job(self._reconstitute_job(job_state))
+            except BaseException:
+                # E.g. its callable was renamed
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                self._write("DELETE FROM apscheduler_jobs WHERE id = ?", (job_id,))
+    
+    def shutdown(self):
+        """Stop the writer once it has written the queued changes (see wait_closed)."""
+        self._writes.put(None)
+        super().shutdown()
+    
+    def wait_closed(self, timeout: Optional[float] = None) -> None:
+        """Block until queued changes are written; call off the event loop."""
+        if self._writer:
+            self._writer.join(timeout)
+    
+    def add_job(self, job):
+        super().add_job(job)
+        # Another instance may have stored it meanwhile; its copy wins
+        self._write(
+            """INSERT INTO apscheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)
+               ON CONFLICT (id) DO NOTHING""",
+            (job.id, datetime_to_utc_timestamp(job.next_run_time), self._dump(job))
+        )
+    
+    def update_job(self, job):
+        super().update_job(job)
+        self._write(
+            "UPDATE apscheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+            (datetime_to_utc_timestamp(job.next_run_time), self._dump(job), job.id)
+        )
+    
+    def remove_job(self, job_id):
+        super().remove_job(job_id)
+        self._write("DELETE FROM apscheduler_jobs WHERE id = ?", (job_id,))
+    
+    def remove_all_jobs(self):
+        super().remove_all_jobs()
+        self._write("DELETE FROM apscheduler_jobs", ())
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit; waits for other writers instead of failing
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+    
+    def _write(self, sql: str, params: Tuple[Any, ...]) -> None:
+        self._writes.put((sql, params))
+    
+    def _write_changes(self) -> None:
+        """Writer thread: apply queued changes until shutdown."""
+        connection = self._connect()
+        try:
+            while True:
+                change = self._writes.get()
+                if change is None:
+                    return
+                try:
+                    connection.execute(*change)
+                except sqlite3.Error:
+                    logger.exception("Failed to store a scheduler job change")
+        finally:
+            connection.close()
+    
+    def _dump(self, job: Job) -> bytes:
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+    
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        state = pickle.loads(job_state)
+        state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+    
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (path={self.db_path})>"
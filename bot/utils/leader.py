@@ -0,0 +1,98 @@
+"""Lease-based leader election between bot instances sharing the database."""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+from database.db import Database
+from bot.config import LEADER_LEASE_SECONDS, LEADER_RENEW_SECONDS
+
+logger = logging.getLogger(__name__)
+
+Callback = Callable[[], Awaitable[None]]
+
+
+def instance_id() -> str:
+    """Get a new ID for a process taking leases ("host:pid:random")."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElection:
+    """Keeps one instance at a time in a role, via a lease row in SQLite.
+    
+    Every instance tries to take or renew the lease every
+    LEADER_RENEW_SECONDS. The holder extends it by LEADER_LEASE_SECONDS
+    each time; if it dies, the lease expires and the next instance to try
+    takes over. A leader that can't renew (database errors) steps down
+    once its lease has run out, before anyone else can take it. Expiry
+    uses wall-clock time, so instances must share a clock (one host).
+    """
+    
+    def __init__(self, name: str, db: Optional[Database] = None,
+                 lease_seconds: float = LEADER_LEASE_SECONDS, renew_seconds: float = LEADER_RENEW_SECONDS):
+        self.name = name
+        self.db = db or Database()
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.holder = instance_id()
+        self.is_leader = False
+        self._expires_at = 0.0
+        self._on_elected: Optional[Callback] = None
+        self._on_demoted: Optional[Callback] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _try_acquire(self) -> bool:
+        """Take or renew the lease; False on failure or a database error."""
+        now = time.time()
+        expires_at = now + self.lease_seconds
+        try:
+            acquired = await self.db.acquire_lease(self.name, self.holder, now, expires_at)
+        except Exception as e:
+            logger.warning("Could not renew the %s lease: %s", self.name, e)
+            # Keep leading only while the lease we already have is valid
+            return self.is_leader and time.time() < self._expires_at - self.renew_seconds
+        if acquired:
+            self._expires_at = expires_at
+        return acquired
+    
+    async def _set_leader(self, is_leader: bool) -> None:
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        logger.info("%s %s the %s lease", self.holder, "acquired" if is_leader else "lost", self.name)
+        callback = self._on_elected if is_leader else self._on_demoted
+        if callback:
+            try:
+                await callback()
+            except Exception:
+                logger.exception("%s callback for %s failed", "Election" if is_leader else "Demotion", self.name)
+    
+    async def _run(self) -> None:
+        """Try to take or renew the lease until cancelled."""
+        while True:
+            await self._set_leader(await self._try_acquire())
+            await asyncio.sleep(self.renew_seconds)
+    
+    async def start(self, on_elected: Optional[Callback] = None, on_demoted: Optional[Callback] = None) -> None:
+        """
+        Start competing for the lease.
+        
+        Args:
+            on_elected: Called when this instance becomes the leader
+            on_demoted: Called when it stops being the leader
+        """
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop competing and release the lease so another instance takes over right away."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            await self._set_leader(False)
+            await self.db.release_lease(self.name, self.holder)
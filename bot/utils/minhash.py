@@ -0,0 +1,137 @@
+"""MinHash signatures of submitted code for near-duplicate detection.
+
+Identifiers, numbers and strings are erased before hashing, so a high
+similarity means "copied and renamed", not "behaves the same".
+"""
+import hashlib
+import random
+import re
+from array import array
+from typing import List, Optional
+from bot.ai.token_budget import strip_comments
+from bot.config import SIMILARITY_NUM_PERM, SIMILARITY_BANDS, SIMILARITY_SHINGLE_SIZE
+
+# Mersenne prime for the (a * x + b) mod p permutations
+_PRIME = (1 << 61) - 1
+
+# Fixed seed: stored signatures must stay comparable across restarts
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(SIMILARITY_NUM_PERM)
+]
+
+_TOKEN = re.compile(
+    r'[A-Za-z_]\w*|\d+(?:\.\d+)?|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|\S'
+)
+
+# Names kept as-is; all other identifiers are treated alike so renaming
+# variables does not hide a copied solution
+_KEYWORDS = frozenset("""
+and as assert async await break class continue def del elif else except finally for from
+global if import in is lambda nonlocal not or pass raise return try while with yield
+None True False self len range enumerate zip sorted sum min max abs print append pop
+dict list set tuple int str float bool map filter
+function var let const new this typeof instanceof of null undefined true false do switch
+case default throw catch console log push length Math
+auto bool char double long void struct template typename using namespace std vector map
+unordered_map string size begin end include public private static const_cast nullptr
+""".split())
+
+ROWS_PER_BAND = SIMILARITY_NUM_PERM // SIMILARITY_BANDS
+
+
+def code_tokens(code: str, language: str) -> List[str]:
+    """
+    Split code into normalized tokens.
+    
+    Comments are removed, identifiers other than keywords and common
+    builtins become "$", numbers "0" and string literals '"'.
+    
+    Args:
+        code: Source code
+        language: Programming language
+    
+    Returns:
+        List of tokens
+    """
+    tokens = []
+    for token in _TOKEN.findall(strip_comments(code, language)):
+        first = token[0]
+        if first.isalpha() or first == "_":
+            tokens.append(token if token in _KEYWORDS else "$")
+        elif first.isdigit():
+            tokens.append("0")
+        elif first in "\"'`":
+            tokens.append('"')
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def _shingle_hashes(tokens: List[str]) -> set:
+    """Hash every run of SIMILARITY_SHINGLE_SIZE consecutive tokens."""
+    if not tokens:
+        return set()
+    size = min(SIMILARITY_SHINGLE_SIZE, len(tokens))
+    return {
+        int.from_bytes(
+            hashlib.blake2b(" ".join(tokens[i:i + size]).encode("utf-8"), digest_size=8).digest(), "big"
+        ) % _PRIME
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+def signature(code: str, language: str) -> Optional[array]:
+    """
+    Compute the MinHash signature of a submission.
+    
+    Args:
+        code: Source code
+        language: Programming language
+    
+    Returns:
+        Array of SIMILARITY_NUM_PERM minimum hashes, or None for empty code
+    """
+    shingles = _shingle_hashes(code_tokens(code, language))
+    if not shingles:
+        return None
+    return array("Q", (
+        min((a * x + b) % _PRIME for x in shingles) for a, b in _PERMUTATIONS
+    ))
+
+
+def band_hashes(sig: array) -> List[int]:
+    """
+    Hash each LSH band of a signature.
+    
+    Two signatures sharing any band hash are candidate near-duplicates.
+    
+    Args:
+        sig: MinHash signature
+    
+    Returns:
+        One signed 64-bit hash per band (fits an SQLite INTEGER)
+    """
+    return [
+        int.from_bytes(
+            hashlib.blake2b(sig[i:i + ROWS_PER_BAND].tobytes(), digest_size=8).digest(), "big", signed=True
+        )
+        for i in range(0, SIMILARITY_BANDS * ROWS_PER_BAND, ROWS_PER_BAND)
+    ]
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def to_blob(sig: array) -> bytes:
+    """Serialize a signature for storage."""
+    return sig.tobytes()
+
+
+def from_blob(blob: bytes) -> array:
+    """Deserialize a stored signature."""
+    sig = array("Q")
+    sig.frombytes(blob)
+    return sig
@@ -0,0 +1,121 @@
+"""Shared outbound message queue with Telegram's global and per-chat rate limits."""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from bot.utils.rate_limit import TokenBucket
+from bot.config import (
+    OUTBOX_RATE_PER_SECOND, OUTBOX_CHAT_INTERVAL_SECONDS, OUTBOX_WORKERS, OUTBOX_MAX_QUEUE, OUTBOX_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-chat send times are dropped once they are in the past and this many are tracked
+_MAX_TRACKED_CHATS = 10000
+
+
+class OutboundQueue:
+    """Bulk messages sent by a worker pool through shared rate limits.
+    
+    Every message takes a token from one bucket refilled at
+    OUTBOX_RATE_PER_SECOND, and messages to the same chat are spaced
+    OUTBOX_CHAT_INTERVAL_SECONDS apart. A retry_after response pauses all
+    workers. The queue is bounded, so producers streaming users from the
+    database wait instead of loading everyone into memory.
+    """
+    
+    def __init__(self, rate: float = OUTBOX_RATE_PER_SECOND,
+                 chat_interval: float = OUTBOX_CHAT_INTERVAL_SECONDS, workers: int = OUTBOX_WORKERS):
+        self.bucket = TokenBucket(rate)
+        self.chat_interval = chat_interval
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        # chat ID -> monotonic time the next message to it may be sent
+        self._next_send: Dict[int, float] = {}
+        self._tasks: List[asyncio.Task] = []
+    
+    async def send(self, chat_id: int, text: str, **kwargs: Any) -> str:
+        """
+        Queue a message and wait until it is delivered.
+        
+        Args:
+            chat_id: Recipient chat
+            text: Message text
+            **kwargs: Extra Bot.send_message arguments (parse_mode, reply_markup)
+        
+        Returns:
+            'sent', 'blocked' (user blocked the bot or deleted the account) or 'failed'
+        """
+        if self._queue is None:
+            raise RuntimeError("Outbound queue is not started")
+        result = asyncio.get_running_loop().create_future()
+        await self._queue.put((chat_id, text, kwargs, result))
+        return await result
+    
+    async def _wait_for_chat(self, chat_id: int) -> None:
+        """Reserve the chat's next send slot and sleep until it."""
+        now = time.monotonic()
+        slot = max(now, self._next_send.get(chat_id, 0.0))
+        self._next_send[chat_id] = slot + self.chat_interval
+        if len(self._next_send) > _MAX_TRACKED_CHATS:
+            self._next_send = {chat: at for chat, at in self._next_send.items() if at > now}
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    async def _deliver(self, bot: Bot, chat_id: int, text: str, kwargs: Dict[str, Any]) -> str:
+        """Send one message, retrying after flood control."""
+        for _ in range(OUTBOX_MAX_RETRIES):
+            await self._wait_for_chat(chat_id)
+            await self.bucket.acquire()
+            try:
+                await bot.send_message(chat_id, text, **kwargs)
+                return 'sent'
+            except TelegramRetryAfter as e:
+                # Flood control applies to the whole bot: pause every worker
+                logger.warning("Flood control, retrying in %s s", e.retry_after)
+                self.bucket.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return 'blocked'
+            except Exception as e:
+                logger.debug("Message to %s failed: %s", chat_id, e)
+                return 'failed'
+        return 'failed'
+    
+    async def _worker(self, bot: Bot) -> None:
+        """Send queued messages until cancelled."""
+        while True:
+            chat_id, text, kwargs, result = await self._queue.get()
+            try:
+                status = await self._deliver(bot, chat_id, text, kwargs)
+                # The sender may have been cancelled meanwhile
+                if not result.done():
+                    result.set_result(status)
+            except asyncio.CancelledError:
+                result.cancel()
+                raise
+            finally:
+                self._queue.task_done()
+    
+    async def start(self, bot: Bot) -> None:
+        """Start the workers."""
+        self._queue = asyncio.Queue(maxsize=OUTBOX_MAX_QUEUE)
+        self._tasks = [asyncio.create_task(self._worker(bot)) for _ in range(self.workers)]
+    
+    async def stop(self) -> None:
+        """Stop the workers; messages still queued are not sent."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        
+        # Don't leave senders waiting forever
+        while self._queue is not None and not self._queue.empty():
+            *_, result = self._queue.get_nowait()
+            if not result.done():
+                result.cancel()
+        self._queue = None
+
+
+outbox = OutboundQueue()
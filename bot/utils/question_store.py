@@ -0,0 +1,106 @@
+"""In-memory interview question bank keyed by ID and category."""
+import asyncio
+import logging
+import random
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+from database.db import Database
+
+logger = logging.getLogger(__name__)
+
+
+class InterviewQuestionStore:
+    """All interview questions held in memory so lookups never touch the disk.
+    
+    Rows are kept column-wise: IDs in a sorted array searched with bisect,
+    category and difficulty as small integer codes, and the texts in plain
+    lists, so a 100k-question bank costs little beyond the text itself.
+    """
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        # Bumped on every load so dependent models know to rebuild
+        self.version = 0
+        self.categories: List[str] = []
+        self._difficulties: List[str] = []
+        self._ids = array("q")
+        self._category_codes = array("H")
+        self._difficulty_codes = array("H")
+        self._questions: List[str] = []
+        self._answers: List[str] = []
+        # category -> positions of its questions
+        self._by_category: Dict[str, array] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+    
+    def invalidate(self) -> None:
+        """Mark the bank as changed by an admin; it is reloaded on next use."""
+        self._loaded = False
+    
+    async def load(self) -> None:
+        """Load all interview questions (no-op while the bank is up to date)."""
+        async with self._lock:
+            if self._loaded:
+                return
+            rows = await self.db.get_interview_question_bank()
+            
+            categories: Dict[str, int] = {}
+            difficulties: Dict[str, int] = {}
+            ids, category_codes, difficulty_codes = array("q"), array("H"), array("H")
+            questions, answers = [], []
+            by_category: Dict[str, array] = {}
+            for position, (question_id, category, question, answer, difficulty) in enumerate(rows):
+                ids.append(question_id)
+                category_codes.append(categories.setdefault(category, len(categories)))
+                difficulty_codes.append(difficulties.setdefault(difficulty, len(difficulties)))
+                questions.append(question)
+                answers.append(answer)
+                by_category.setdefault(category, array("I")).append(position)
+            
+            # Swap everything in at once so readers never see a half-loaded bank
+            self.categories = list(categories)
+            self._difficulties = list(difficulties)
+            self._ids, self._category_codes, self._difficulty_codes = ids, category_codes, difficulty_codes
+            self._questions, self._answers = questions, answers
+            self._by_category = by_category
+            self.version += 1
+            self._loaded = True
+            logger.info("Interview question store loaded: %d questions", len(ids))
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def _row(self, position: int) -> Dict[str, Any]:
+        return {
+            'id': self._ids[position],
+            'category': self.categories[self._category_codes[position]],
+            'question': self._questions[position],
+            'answer': self._answers[position],
+            'difficulty': self._difficulties[self._difficulty_codes[position]]
+        }
+    
+    async def get(self, question_id: int) -> Optional[Dict[str, Any]]:
+        """Get an interview question by ID."""
+        if not self._loaded:
+            await self.load()
+        position = bisect_left(self._ids, question_id)
+        if position < len(self._ids) and self._ids[position] == question_id:
+            return self._row(position)
+        return None
+    
+    async def get_random(self, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get a random interview question, optionally from one category."""
+        if not self._loaded:
+            await self.load()
+        if category:
+            positions = self._by_category.get(category)
+            return self._row(random.choice(positions)) if positions else None
+        return self._row(random.randrange(len(self._ids))) if self._ids else None
+    
+    def answers(self) -> List[str]:
+        """Get the model answers of all loaded questions."""
+        return self._answers
+
+
+question_store = InterviewQuestionStore()
@@ -0,0 +1,43 @@
+"""Rate limiting for outgoing Telegram messages."""
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Token bucket shared by concurrent senders.
+    
+    Tokens refill at `rate` per second up to `capacity`; each send takes one.
+    Waiters are served in arrival order.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Wait for a token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                
+                self._tokens = min(self.capacity, self._tokens + max(0.0, now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens, e.g. after Telegram answered with retry_after."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        # Start empty after the pause instead of with a burst
+        self._tokens = 0.0
+        self._updated = self._paused_until
@@ -0,0 +1,127 @@
+"""Persistent queue of code review jobs with an in-process worker pool."""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from aiogram import Bot
+from database.db import Database
+from bot.config import (
+    REVIEW_QUEUE_WORKERS, REVIEW_QUEUE_MAX_DEPTH, REVIEW_QUEUE_MAX_ATTEMPTS,
+    REVIEW_QUEUE_RETRY_DELAY_SECONDS, REVIEW_QUEUE_POLL_SECONDS,
+    REVIEW_QUEUE_HEARTBEAT_SECONDS, REVIEW_QUEUE_STALE_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Bot, Dict[str, Any]], Awaitable[None]]
+
+
+class QueueFullError(Exception):
+    """Raised when the review queue is over its configured depth."""
+
+
+class UnknownUserError(Exception):
+    """Raised when a submission comes from a user who hasn't started the bot."""
+
+
+class ReviewQueue:
+    """Review jobs stored in SQLite and processed by background workers."""
+    
+    def __init__(self, db: Optional[Database] = None, workers: int = REVIEW_QUEUE_WORKERS):
+        self.db = db or Database()
+        self.workers = workers
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+    
+    async def enqueue(self, user_id: int, chat_id: int, challenge_id: int,
+                      code: str, language: str) -> Dict[str, int]:
+        """
+        Add a submission to the review queue.
+        
+        Args:
+            user_id: Submitting user
+            chat_id: Chat to send the result to
+            challenge_id: Challenge the code was submitted for
+            code: Submitted source code
+            language: Programming language
+        
+        Returns:
+            Dict with 'job_id' and 'position'
+        
+        Raises:
+            UnknownUserError: If the user has no account
+            QueueFullError: If the queue is over REVIEW_QUEUE_MAX_DEPTH
+        """
+        if not await self.db.get_user(user_id):
+            raise UnknownUserError()
+        if await self.db.count_queued_review_jobs() >= REVIEW_QUEUE_MAX_DEPTH:
+            raise QueueFullError()
+        
+        job_id = await self.db.enqueue_review_job(user_id, chat_id, challenge_id, code, language)
+        position = await self.db.get_review_job_position(job_id)
+        self._wakeup.set()
+        return {'job_id': job_id, 'position': position}
+    
+    async def _process(self, bot: Bot, handler: JobHandler, job: Dict[str, Any]) -> None:
+        """Run one job, scheduling a retry on failure."""
+        # created_at is SQLite's CURRENT_TIMESTAMP, i.e. UTC
+        created_at = datetime.fromisoformat(job['created_at'])
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        job['queue_wait_ms'] = max(0.0, (now - created_at).total_seconds() * 1000)
+        
+        heartbeat = asyncio.create_task(self._heartbeat(job['id']))
+        try:
+            await handler(bot, job)
+        except Exception as e:
+            logger.exception("Review job %s failed (attempt %s)", job['id'], job['attempts'])
+            if job['attempts'] < REVIEW_QUEUE_MAX_ATTEMPTS:
+                retry_at = datetime.now() + timedelta(seconds=REVIEW_QUEUE_RETRY_DELAY_SECONDS * job['attempts'])
+                await self.db.fail_review_job(job['id'], str(e), retry_at)
+            else:
+                await self.db.fail_review_job(job['id'], str(e))
+            return
+        finally:
+            heartbeat.cancel()
+        
+        await self.db.complete_review_job(job['id'])
+    
+    async def _heartbeat(self, job_id: int) -> None:
+        """Keep a running job from being taken over by another worker."""
+        while True:
+            await asyncio.sleep(REVIEW_QUEUE_HEARTBEAT_SECONDS)
+            try:
+                await self.db.touch_review_job(job_id)
+            except Exception:
+                logger.exception("Failed to refresh review job %s", job_id)
+    
+    async def _worker(self, bot: Bot, handler: JobHandler) -> None:
+        """Take jobs from the queue until cancelled."""
+        while True:
+            stale_before = datetime.now() - timedelta(seconds=REVIEW_QUEUE_STALE_SECONDS)
+            job = await self.db.claim_review_job(stale_before)
+            if job:
+                await self._process(bot, handler, job)
+                continue
+            
+            # Sleep until a new job arrives or a retry becomes due
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), REVIEW_QUEUE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def start(self, bot: Bot, handler: JobHandler) -> None:
+        """Start the workers; jobs interrupted by a restart are taken over once their heartbeat is stale."""
+        self._tasks = [
+            asyncio.create_task(self._worker(bot, handler)) for _ in range(self.workers)
+        ]
+    
+    async def stop(self) -> None:
+        """Stop the workers; their running jobs are taken over once stale."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+review_queue = ReviewQueue()
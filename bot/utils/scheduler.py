@@ -1,41 +1,193 @@
 """Task scheduler for automated bot tasks."""
+import asyncio
+import logging
+import time as time_module
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+from apscheduler.jobstores.base import ConflictingIdError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.cron import CronTrigger
-from datetime import date
-import random
 from database.db import Database
-from bot.config import DAILY_CHALLENGE_TIME
+from bot.keyboards import get_challenge_actions_keyboard
+from bot.utils.daily_challenge import daily_challenges
+from bot.utils.job_store import SQLiteJobStore
+from bot.utils.leader import LeaderElection
+from bot.utils.outbox import outbox
+from bot.utils.timezones import get_zone, zones_reaching
+from bot.config import (
+    DAILY_CHALLENGE_TIME, DAILY_SCHEDULER_INTERVAL_MINUTES, DAILY_SCHEDULER_BATCH_SIZE,
+    DAILY_CHALLENGE_CATCH_UP_HOURS, SCHEDULER_MISFIRE_GRACE_SECONDS
+)
+
+logger = logging.getLogger(__name__)
 
 
 class BotScheduler:
-    """Scheduler for automated bot tasks."""
+    """Scheduler for automated bot tasks.
     
-    def __init__(self, db: Database):
-        self.db = db
-        self.scheduler = AsyncIOScheduler()
+    Jobs are stored in SQLite, so runs missed while the bot was down are
+    made up once on startup (coalesced, within SCHEDULER_MISFIRE_GRACE_SECONDS).
+    Bulk jobs additionally claim a (job, date) row in the scheduler_runs
+    ledger and are skipped if it was already done, even across restarts.
+    A claim records the instance running it and, like the leader lease,
+    expires unless renewed, so a new leader retries only runs whose
+    instance is gone.
     
-    async def assign_daily_challenges(self):
-        """Assign daily challenges to all users."""
-        # Get all users
-        leaderboard = await self.db.get_leaderboard(limit=1000)
+    Every instance registers the jobs, but only the one holding the
+    "scheduler" leader lease runs them; the others keep the scheduler
+    paused until they take over.
+    """
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        self.job_store = SQLiteJobStore(self.db.db_path)
+        self.scheduler = AsyncIOScheduler(
+            jobstores={'default': self.job_store},
+            job_defaults={'coalesce': True, 'misfire_grace_time': SCHEDULER_MISFIRE_GRACE_SECONDS}
+        )
+        self.leader = LeaderElection("scheduler", self.db)
+        self._pushes: Set[asyncio.Task] = set()
+    
+    async def run_once(self, job: str, run_date: str, func: Callable[..., Awaitable[Any]], *args: Any) -> bool:
+        """
+        Run a bulk job unless it already ran (or is running) for the date.
         
-        for user_data in leaderboard:
-            user_id = user_data['user_id']
-            level = user_data['level']
-            
-            # Select difficulty based on user level
-            if level <= 3:
-                difficulty = "easy"
-            elif level <= 7:
-                difficulty = "medium"
-            else:
-                difficulty = "hard"
-            
-            # Get random challenge of appropriate difficulty
-            challenges = await self.db.get_challenges_by_difficulty(difficulty)
-            if challenges:
-                challenge = random.choice(challenges)
-                await self.db.assign_daily_challenge(user_id, challenge['id'])
+        Args:
+            job: Job name in the ledger
+            run_date: Date the run is for (ISO format)
+            func: Coroutine function to run
+            *args: Its arguments
+        
+        Returns:
+            Whether the job ran to completion
+        """
+        holder = self.leader.holder
+        expires_at = time_module.time() + self.leader.lease_seconds
+        if not await self.db.claim_scheduler_run(job, run_date, holder, expires_at):
+            logger.debug("Skipping %s for %s: already run", job, run_date)
+            return False
+        renewal = asyncio.create_task(self._renew_run(job, run_date))
+        try:
+            await func(*args)
+        except BaseException as e:
+            await self.db.finish_scheduler_run(job, run_date, holder, 'failed')
+            if not isinstance(e, Exception):
+                raise
+            logger.exception("%s for %s failed", job, run_date)
+            return False
+        finally:
+            renewal.cancel()
+        await self.db.finish_scheduler_run(job, run_date, holder, 'done')
+        return True
+    
+    async def _renew_run(self, job: str, run_date: str) -> None:
+        """Keep a run's claim from expiring while it runs."""
+        while True:
+            await asyncio.sleep(self.leader.renew_seconds)
+            try:
+                renewed = await self.db.renew_scheduler_run(
+                    job, run_date, self.leader.holder, time_module.time() + self.leader.lease_seconds
+                )
+            except Exception:
+                logger.exception("Failed to renew the %s run for %s", job, run_date)
+                continue
+            if not renewed:
+                logger.warning("The %s run for %s was taken over by another instance", job, run_date)
+                return
+    
+    async def _users_in_timezone(self, timezone_name: Optional[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream the users of a time zone in batches of DAILY_SCHEDULER_BATCH_SIZE."""
+        after_user_id = 0
+        while True:
+            batch = await self.db.get_users_in_timezone(timezone_name, after_user_id, DAILY_SCHEDULER_BATCH_SIZE)
+            if not batch:
+                return
+            yield batch
+            after_user_id = batch[-1]['user_id']
+    
+    async def assign_daily_challenges(self, users: List[Dict[str, Any]], day: date) -> Counter:
+        """
+        Pick and push the daily challenge to users whose day just started.
+        
+        Picks aren't pinned: each is a hash of the user ID and their local
+        date, pinned when they open or submit it. Messages are rendered once
+        per challenge and sent through the shared outbound queue; users who
+        were already sent theirs for the day are skipped, and every
+        attempt's status is stored in daily_challenge_deliveries.
+        
+        Args:
+            users: User rows of one time zone
+            day: Their local date
+        
+        Returns:
+            Delivery statuses counted
+        """
+        picks = await daily_challenges.pick_batch(users, day)
+        delivered = await self.db.get_daily_challenge_delivered_user_ids(list(picks), day.isoformat())
+        recipients = [(user_id, challenge) for user_id, challenge in picks.items() if user_id not in delivered]
+        
+        statuses = await asyncio.gather(*(
+            outbox.send(
+                user_id, daily_challenges.render(challenge['id']),
+                reply_markup=get_challenge_actions_keyboard(challenge['id'])
+            )
+            for user_id, challenge in recipients
+        ))
+        await self.db.record_daily_challenge_deliveries([
+            (user_id, day.isoformat(), challenge['id'], status)
+            for (user_id, challenge), status in zip(recipients, statuses)
+        ])
+        return Counter(statuses)
+    
+    async def push_daily_challenges(self, timezone_name: Optional[str], day: date) -> Counter:
+        """Push the daily challenge to every user of a time zone."""
+        totals = Counter()
+        async for users in self._users_in_timezone(timezone_name):
+            totals += await self.assign_daily_challenges(users, day)
+        logger.info(
+            "Daily challenges for %s (%s): %s sent, %s blocked, %s failed", timezone_name or "default zone",
+            day, totals['sent'], totals['blocked'], totals['failed']
+        )
+        return totals
+    
+    async def process_daily_window(self, now: Optional[datetime] = None) -> int:
+        """
+        Start pushes for the time zones whose local DAILY_CHALLENGE_TIME has come.
+        
+        Runs every DAILY_SCHEDULER_INTERVAL_MINUTES. Only the distinct time
+        zones are checked, then the users of due zones are read through
+        idx_users_timezone, so each run touches only the users due in it.
+        A zone is due for DAILY_CHALLENGE_CATCH_UP_HOURS after its local
+        time, until its push is recorded as done in the ledger, which also
+        covers windows missed while the bot was down. Pushes run in the
+        background (100k users take about an hour at 30 msg/s), so later
+        windows aren't held up.
+        
+        Args:
+            now: Current time (aware)
+        
+        Returns:
+            Number of time zones started
+        """
+        now = now or datetime.now(timezone.utc)
+        start = now - timedelta(hours=DAILY_CHALLENGE_CATCH_UP_HOURS)
+        
+        hour, minute = map(int, DAILY_CHALLENGE_TIME.split(":"))
+        zones = zones_reaching(await self.db.get_user_timezones(), time(hour, minute), start, now)
+        if not zones:
+            return 0
+        
+        await daily_challenges.load()
+        for zone in zones:
+            day = now.astimezone(get_zone(zone)).date()
+            task = asyncio.create_task(self.run_once(
+                f"daily_challenges:{zone or 'default'}", day.isoformat(), self.push_daily_challenges, zone, day
+            ))
+            self._pushes.add(task)
+            task.add_done_callback(self._pushes.discard)
+        return len(zones)
     
     async def check_streaks(self):
         """Check and update user streaks."""
@@ -46,29 +198,63 @@ class BotScheduler:
             user_id = user_data['user_id']
             await self.db.update_streak(user_id)
     
-    def start(self):
-        """Start the scheduler."""
-        # Parse daily challenge time (format: "HH:MM")
-        hour, minute = map(int, DAILY_CHALLENGE_TIME.split(":"))
+    async def run_check_streaks(self):
+        """Check streaks once per day."""
+        await self.run_once("check_streaks", date.today().isoformat(), self.check_streaks)
+    
+    def _schedule(self, job_id: str, method: str, trigger: BaseTrigger) -> None:
+        """Add a job unless it is already stored, keeping its missed run times."""
+        job = self.scheduler.get_job(job_id)
+        if job is None:
+            try:
+                # Stored jobs reference their callable by name: this module's singleton
+                self.scheduler.add_job(f"{__name__}:bot_scheduler.{method}", trigger, id=job_id)
+            except ConflictingIdError:
+                # Another instance added it meanwhile
+                pass
+        elif str(job.trigger) != str(trigger):
+            self.scheduler.reschedule_job(job_id, trigger=trigger)
+    
+    async def _on_elected(self):
+        """Start running jobs, including ones missed while no instance was leading."""
+        # Runs of instances that are gone are retried; a slow previous
+        # leader that is still running one keeps renewing it
+        interrupted = await self.db.fail_expired_scheduler_runs(time_module.time())
+        if interrupted:
+            logger.info("%d scheduled runs were interrupted and will be retried", interrupted)
+        # Pick up the next run times the previous leader stored
+        self.job_store.reload()
+        self.scheduler.resume()
+    
+    async def _on_demoted(self):
+        """Stop running jobs; the new leader retries unfinished ones."""
+        self.scheduler.pause()
+        for task in list(self._pushes):
+            task.cancel()
+    
+    async def start(self):
+        """Start the scheduler; jobs run while this instance is the leader."""
+        # Paused until the jobs are registered, so stored ones keep their missed run times
+        self.scheduler.start(paused=True)
         
-        # Schedule daily challenge assignment
-        self.scheduler.add_job(
-            self.assign_daily_challenges,
-            CronTrigger(hour=hour, minute=minute),
-            id="daily_challenges",
-            replace_existing=True
+        # Check which time zones reached DAILY_CHALLENGE_TIME every few minutes
+        self._schedule(
+            "daily_challenges", "process_daily_window",
+            CronTrigger(minute=f"*/{DAILY_SCHEDULER_INTERVAL_MINUTES}")
         )
         
         # Schedule streak checking (midnight)
-        self.scheduler.add_job(
-            self.check_streaks,
-            CronTrigger(hour=0, minute=0),
-            id="check_streaks",
-            replace_existing=True
-        )
+        self._schedule("check_streaks", "run_check_streaks", CronTrigger(hour=0, minute=0))
         
-        self.scheduler.start()
+        await self.leader.start(self._on_elected, self._on_demoted)
     
-    def shutdown(self):
-        """Shutdown the scheduler."""
+    async def shutdown(self):
+        """Shutdown the scheduler, handing the leader lease over."""
+        await self.leader.stop()
         self.scheduler.shutdown()
+        for task in list(self._pushes):
+            task.cancel()
+        await asyncio.to_thread(self.job_store.wait_closed)
+
+
+bot_scheduler = BotScheduler()
@@ -0,0 +1,171 @@
+"""Broadcast audience segments compiled to SQL."""
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from database.db import Database
+from bot.config import SUPPORTED_LANGUAGES, BROADCAST_BATCH_SIZE
+
+SEGMENT_SYNTAX = """`all` - everyone who isn't banned, or any of:
+`active=7` - active within the last 7 days
+`level=3-10` - level range (`level=5` for 5 and up)
+`streak=3` - streak of at least 3 days
+`unsolved` - hasn't solved a challenge today
+`lang=python` - has submitted code in this language"""
+
+
+class Segment:
+    """Filter over users; every condition must match."""
+    
+    def __init__(self, active_days: Optional[int] = None, min_level: Optional[int] = None,
+                 max_level: Optional[int] = None, min_streak: Optional[int] = None,
+                 not_solved_today: bool = False, language: Optional[str] = None):
+        self.active_days = active_days
+        self.min_level = min_level
+        self.max_level = max_level
+        self.min_streak = min_streak
+        self.not_solved_today = not_solved_today
+        self.language = language
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in vars(self).items() if value not in (None, False)}
+    
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "Segment":
+        return cls(**(data or {}))
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+    
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> "Segment":
+        return cls.from_dict(json.loads(text) if text else None)
+    
+    def compile(self) -> Tuple[str, List[Any]]:
+        """
+        Compile the segment to a WHERE clause over `users u`.
+        
+        Banned users are always excluded with an anti-join on the
+        banned_users primary key; submission conditions are answered
+        from idx_submissions_user_activity without touching the table.
+        
+        Returns:
+            (SQL condition, parameters)
+        """
+        conditions = ["NOT EXISTS (SELECT 1 FROM banned_users b WHERE b.user_id = u.user_id)"]
+        params: List[Any] = []
+        
+        if self.active_days is not None:
+            # last_active is stored as a local-time ISO string
+            conditions.append("u.last_active >= ?")
+            params.append((datetime.now() - timedelta(days=self.active_days)).isoformat())
+        if self.min_level is not None:
+            conditions.append("u.level >= ?")
+            params.append(self.min_level)
+        if self.max_level is not None:
+            conditions.append("u.level <= ?")
+            params.append(self.max_level)
+        if self.min_streak is not None:
+            conditions.append("u.streak >= ?")
+            params.append(self.min_streak)
+        if self.not_solved_today:
+            # submitted_at is SQLite's CURRENT_TIMESTAMP, i.e. UTC
+            today_start = datetime.combine(date.today(), datetime.min.time()).astimezone(timezone.utc)
+            conditions.append(
+                """NOT EXISTS (SELECT 1 FROM submissions s
+                   WHERE s.user_id = u.user_id AND s.submitted_at >= ? AND s.status = 'completed')"""
+            )
+            params.append(today_start.strftime("%Y-%m-%d %H:%M:%S"))
+        if self.language is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM submissions s WHERE s.user_id = u.user_id AND s.language = ?)"
+            )
+            params.append(self.language)
+        
+        return " AND ".join(conditions), params
+    
+    def describe(self) -> str:
+        """Describe the segment for the admin."""
+        parts = []
+        if self.active_days is not None:
+            parts.append(f"active in the last {self.active_days} days")
+        if self.min_level is not None and self.max_level is not None:
+            parts.append(f"level {self.min_level}-{self.max_level}")
+        elif self.min_level is not None:
+            parts.append(f"level {self.min_level}+")
+        elif self.max_level is not None:
+            parts.append(f"level up to {self.max_level}")
+        if self.min_streak is not None:
+            parts.append(f"streak {self.min_streak}+ days")
+        if self.not_solved_today:
+            parts.append("haven't solved a challenge today")
+        if self.language is not None:
+            parts.append(f"use {self.language}")
+        return ", ".join(parts) if parts else "all users"
+
+
+def parse_segment(text: str) -> Segment:
+    """
+    Parse an admin's audience filter (see SEGMENT_SYNTAX).
+    
+    Args:
+        text: Filter such as "active=7 streak=3 lang=python"
+    
+    Returns:
+        Segment
+    
+    Raises:
+        ValueError: If the filter is invalid
+    """
+    segment = Segment()
+    for token in text.lower().replace(",", " ").split():
+        key, _, value = token.partition("=")
+        try:
+            if key == "all" and not value:
+                continue
+            if key == "unsolved" and not value:
+                segment.not_solved_today = True
+            elif key == "active":
+                segment.active_days = int(value)
+            elif key == "streak":
+                segment.min_streak = int(value)
+            elif key == "level":
+                low, dash, high = value.partition("-")
+                segment.min_level = int(low) if low else None
+                segment.max_level = int(high) if dash and high else None
+            elif key == "lang" and value in SUPPORTED_LANGUAGES:
+                segment.language = value
+            else:
+                raise ValueError(token)
+        except ValueError:
+            raise ValueError(f"Invalid filter: {token}") from None
+    return segment
+
+
+async def stream_user_id_batches(db: Database, segment: Segment, after_user_id: int = 0,
+                                 batch_size: int = BROADCAST_BATCH_SIZE) -> AsyncIterator[List[int]]:
+    """
+    Stream matching user IDs in ascending order, a batch at a time.
+    
+    Args:
+        db: Database
+        segment: Audience filter
+        after_user_id: Resume after this user ID
+        batch_size: IDs per batch
+    
+    Yields:
+        Non-empty lists of user IDs
+    """
+    condition, params = segment.compile()
+    while True:
+        batch = await db.get_segment_user_ids(condition, params, after_user_id, batch_size)
+        if not batch:
+            return
+        yield batch
+        after_user_id = batch[-1]
+
+
+async def stream_user_ids(db: Database, segment: Segment) -> AsyncIterator[int]:
+    """Stream matching user IDs in ascending order."""
+    async for batch in stream_user_id_batches(db, segment):
+        for user_id in batch:
+            yield user_id
@@ -0,0 +1,94 @@
+"""In-memory LSH index of submission signatures for near-duplicate lookups."""
+import logging
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+from database.db import Database
+from bot.config import SIMILARITY_ENABLED
+from bot.utils import minhash
+
+logger = logging.getLogger(__name__)
+
+
+class SimilarityIndex:
+    """LSH buckets mirrored from SQLite so lookups never touch the disk."""
+    
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        # submission_id -> (challenge_id, user_id, signature)
+        self.signatures: Dict[int, Tuple[int, int, array]] = {}
+        # (challenge_id, band, bucket) -> submission IDs
+        self.buckets: Dict[Tuple[int, int, int], List[int]] = {}
+    
+    async def load(self) -> None:
+        """Load (or reload) signatures and LSH buckets stored by add_submission."""
+        if not SIMILARITY_ENABLED:
+            return
+        signatures: Dict[int, Tuple[int, int, array]] = {}
+        buckets: Dict[Tuple[int, int, int], List[int]] = {}
+        for submission_id, challenge_id, user_id, blob in await self.db.get_submission_signatures():
+            signatures[submission_id] = (challenge_id, user_id, minhash.from_blob(blob))
+        for challenge_id, band, bucket, submission_id in await self.db.get_submission_lsh_buckets():
+            buckets.setdefault((challenge_id, band, bucket), []).append(submission_id)
+        # Swap both in at once so lookups never see a half-loaded index
+        self.signatures, self.buckets = signatures, buckets
+        logger.info("Similarity index loaded: %d submissions", len(self.signatures))
+    
+    def add(self, submission_id: int, challenge_id: int, user_id: int, sig: Optional[array]) -> None:
+        """Index a stored submission."""
+        if sig is None:
+            return
+        self.signatures[submission_id] = (challenge_id, user_id, sig)
+        for band, bucket in enumerate(minhash.band_hashes(sig)):
+            self.buckets.setdefault((challenge_id, band, bucket), []).append(submission_id)
+    
+    def query(self, challenge_id: int, sig: Optional[array], min_score: float = 0.5,
+              limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find prior submissions for a challenge similar to a signature.
+        
+        Args:
+            challenge_id: Challenge to search in
+            sig: MinHash signature of the new submission
+            min_score: Minimum estimated Jaccard similarity
+            limit: Maximum number of results
+        
+        Returns:
+            List of dicts with 'submission_id', 'user_id' and 'score',
+            most similar first
+        """
+        if sig is None:
+            return []
+        
+        candidates = set()
+        for band, bucket in enumerate(minhash.band_hashes(sig)):
+            candidates.update(self.buckets.get((challenge_id, band, bucket), ()))
+        
+        matches = []
+        for submission_id in candidates:
+            entry = self.signatures.get(submission_id)
+            if entry is None:
+                continue
+            score = minhash.similarity(sig, entry[2])
+            if score >= min_score:
+                matches.append({'submission_id': submission_id, 'user_id': entry[1], 'score': score})
+        
+        matches.sort(key=lambda match: (-match['score'], -match['submission_id']))
+        return matches[:limit]
+    
+    def remove(self, challenge_id: Optional[int] = None, user_id: Optional[int] = None) -> None:
+        """Forget submissions of a deleted challenge or user."""
+        removed = {
+            submission_id for submission_id, (c_id, u_id, _) in self.signatures.items()
+            if c_id == challenge_id or u_id == user_id
+        }
+        for submission_id in removed:
+            del self.signatures[submission_id]
+        for key in list(self.buckets):
+            remaining = [s for s in self.buckets[key] if s not in removed]
+            if remaining:
+                self.buckets[key] = remaining
+            else:
+                del self.buckets[key]
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,117 @@
+"""SM-2 spaced repetition for interview questions."""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from database.db import Database
+from bot.utils.question_store import InterviewQuestionStore, question_store
+from bot.config import INTERVIEW_DUE_LOOKAHEAD, INTERVIEW_NEW_QUESTION_ATTEMPTS
+
+MIN_EASE_FACTOR = 1.3
+INITIAL_EASE_FACTOR = 2.5
+PASSING_GRADE = 3
+
+
+def grade_from_score(score: int) -> int:
+    """Map a 0-10 evaluation score to an SM-2 grade (0-5)."""
+    return max(0, min(5, round(score / 2)))
+
+
+def sm2(repetitions: int, interval_days: int, ease_factor: float, grade: int) -> Tuple[int, int, float]:
+    """
+    Apply one SM-2 review.
+    
+    Args:
+        repetitions: Successful reviews in a row so far
+        interval_days: Current interval
+        ease_factor: Current ease factor
+        grade: Recall quality, 0 (blackout) to 5 (perfect)
+    
+    Returns:
+        (repetitions, interval_days, ease_factor) after the review
+    """
+    if grade >= PASSING_GRADE:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease_factor)
+        repetitions += 1
+    else:
+        # Failed questions start over and come back tomorrow
+        repetitions = 0
+        interval_days = 1
+    
+    ease_factor += 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+    return repetitions, interval_days, max(MIN_EASE_FACTOR, ease_factor)
+
+
+class InterviewScheduler:
+    """Picks each user's next interview question and reschedules answered ones."""
+    
+    def __init__(self, db: Optional[Database] = None, store: Optional[InterviewQuestionStore] = None):
+        self.db = db or Database()
+        self.store = store if store is not None else question_store
+    
+    async def record(self, user_id: int, question_id: int, score: int) -> datetime:
+        """
+        Reschedule a question after the user answered it.
+        
+        Args:
+            user_id: User ID
+            question_id: Interview question ID
+            score: Evaluation score (0-10)
+        
+        Returns:
+            When the question is due again
+        """
+        state = await self.db.get_interview_review(user_id, question_id)
+        grade = grade_from_score(score)
+        if state:
+            repetitions, interval_days, ease_factor = sm2(
+                state['repetitions'], state['interval_days'], state['ease_factor'], grade
+            )
+        else:
+            repetitions, interval_days, ease_factor = sm2(0, 0, INITIAL_EASE_FACTOR, grade)
+        
+        due_at = datetime.now() + timedelta(days=interval_days)
+        await self.db.save_interview_review(
+            user_id, question_id, repetitions, interval_days, ease_factor, grade, due_at.isoformat()
+        )
+        return due_at
+    
+    async def next_question(self, user_id: int, category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the question a user should practice next.
+        
+        The most overdue question comes first; without one a question the
+        user has not seen yet is picked at random.
+        
+        Args:
+            user_id: User ID
+            category: Only pick questions from this category
+        
+        Returns:
+            Question row with 'due' set for review questions, or None
+        """
+        # Category filtering happens in memory over the first few due rows,
+        # so the lookup itself stays a single range scan of the due index
+        due_ids = await self.db.get_due_interview_questions(
+            user_id, datetime.now().isoformat(), INTERVIEW_DUE_LOOKAHEAD if category else 1
+        )
+        for question_id in due_ids:
+            question = await self.store.get(question_id)
+            if question and (not category or question['category'] == category):
+                question['due'] = True
+                return question
+        
+        question = None
+        for _ in range(INTERVIEW_NEW_QUESTION_ATTEMPTS):
+            question = await self.store.get_random(category)
+            if not question or not await self.db.get_interview_review(user_id, question['id']):
+                break
+        if question:
+            question['due'] = False
+        return question
+
+
+interview_scheduler = InterviewScheduler()
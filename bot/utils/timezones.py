@@ -0,0 +1,82 @@
+"""User time zones and local-time scheduling windows."""
+import re
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Any, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+from bot.config import DEFAULT_TIMEZONE
+
+_OFFSET = re.compile(r"^(?:utc|gmt)?\s*([+-])\s*(\d{1,2})(?::?(\d{2}))?$", re.IGNORECASE)
+_ZONE_NAMES = {name.lower(): name for name in available_timezones()}
+
+
+def parse_timezone(text: str) -> Optional[str]:
+    """
+    Parse a time zone given by a user.
+
+    Args:
+        text: IANA name ("Europe/Berlin", case-insensitive) or a UTC offset
+            ("+3", "UTC-5", "+05:30")
+
+    Returns:
+        Time zone name to store, or None if invalid
+    """
+    text = text.strip()
+    if text.lower() in _ZONE_NAMES:
+        return _ZONE_NAMES[text.lower()]
+    if text.lower() in ("utc", "gmt"):
+        return "UTC"
+
+    match = _OFFSET.match(text)
+    if not match:
+        return None
+    sign, hours, minutes = match.group(1), int(match.group(2)), int(match.group(3) or 0)
+    if hours > 14 or minutes >= 60:
+        return None
+    if not minutes:
+        # Etc/GMT zones have inverted signs: Etc/GMT-3 is UTC+3
+        return "UTC" if not hours else f"Etc/GMT{'-' if sign == '+' else '+'}{hours}"
+    return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+
+def get_zone(name: Optional[str]) -> tzinfo:
+    """Get a tzinfo for a stored time zone name (DEFAULT_TIMEZONE if unset)."""
+    name = name or DEFAULT_TIMEZONE
+    if name.startswith("UTC") and len(name) == 9:
+        sign = 1 if name[3] == "+" else -1
+        return timezone(sign * timedelta(hours=int(name[4:6]), minutes=int(name[7:9])))
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def local_date(user: Dict[str, Any], now: Optional[datetime] = None) -> date:
+    """Get the current date in a user's time zone."""
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(get_zone(user.get('timezone'))).date()
+
+
+def zones_reaching(zone_names: Iterable[Optional[str]], local_time: time,
+                   start: datetime, end: datetime) -> List[Optional[str]]:
+    """
+    Find the time zones whose local clock showed `local_time` in (start, end].
+
+    Args:
+        zone_names: Stored time zone names (None for the default zone)
+        local_time: Local wall-clock time, e.g. 09:00
+        start: Window start (aware)
+        end: Window end (aware)
+
+    Returns:
+        The matching names
+    """
+    matching = []
+    for name in zone_names:
+        zone = get_zone(name)
+        local_end = end.astimezone(zone)
+        candidate = datetime.combine(local_end.date(), local_time, tzinfo=zone)
+        if candidate > local_end:
+            candidate = datetime.combine(local_end.date() - timedelta(days=1), local_time, tzinfo=zone)
+        if start < candidate <= end:
+            matching.append(name)
+    return matching
@@ -0,0 +1,356 @@
+"""Multi-process mode: one front process receiving updates, sharded over worker processes."""
+import asyncio
+import logging
+import multiprocessing
+import secrets
+import signal
+import time
+from typing import Any, Dict, List, Optional
+import aiohttp
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from bot.config import (
+    TELEGRAM_BOT_TOKEN, BOT_MODE, BOT_WORKERS, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_HOST,
+    WEBHOOK_PORT, WEBHOOK_REMOVE_ON_SHUTDOWN, WORKER_BASE_PORT, WORKER_FORWARD_BATCH_SIZE,
+    WORKER_QUEUE_SIZE, WORKER_REPORT_INTERVAL_SECONDS, WORKER_CACHE_REFRESH_SECONDS
+)
+from bot.utils.admin_utils import is_admin
+from bot.utils.daily_challenge import daily_challenges
+from bot.utils.question_store import question_store
+from bot.utils.similarity import similarity_index
+from bot.main import create_dispatcher, start_services, stop_services, get_webhook_secret
+
+logger = logging.getLogger(__name__)
+
+WORKER_SECRET_HEADER = "X-Worker-Secret"
+
+
+def update_shard_key(update: Dict[str, Any]) -> Optional[int]:
+    """
+    Get the ID that orders an update: its user, or its chat if it has no user.
+    
+    Args:
+        update: Raw update as sent by Telegram
+    
+    Returns:
+        User or chat ID, or None for updates without either (e.g. polls)
+    """
+    for key, payload in update.items():
+        if key == "update_id" or not isinstance(payload, dict):
+            continue
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return None
+
+
+def shard_for(update: Dict[str, Any], workers: int) -> int:
+    """
+    Pick the worker that handles an update.
+    
+    Every update of a user goes to the same worker, so they are handled
+    in order and never race on the user's FSM state. Admins always go to
+    worker 0, which runs broadcasts and can therefore cancel them.
+    """
+    key = update_shard_key(update)
+    if key is None or is_admin(key):
+        return 0
+    return key % workers
+
+
+def worker_port(index: int) -> int:
+    """Get the local port a worker listens on."""
+    return WORKER_BASE_PORT + index
+
+
+class UpdateWorker:
+    """Handles the updates forwarded to one worker process.
+    
+    Updates of the same shard key are chained so each starts after the
+    previous one finished; different users are handled concurrently.
+    Worker 0 is the primary and also runs the scheduler, outbox and the
+    other services that must run once per deployment.
+    """
+    
+    def __init__(self, index: int, secret: str):
+        self.index = index
+        self.secret = secret
+        self.primary = index == 0
+        self.bot: Optional[Bot] = None
+        self.dp: Optional[Dispatcher] = None
+        self.updates = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        # shard key -> task handling its latest update
+        self._tails: Dict[Optional[int], asyncio.Task] = {}
+        self._tasks = set()
+    
+    async def _handle(self, update: Dict[str, Any], previous: Optional[asyncio.Task]) -> None:
+        if previous:
+            # Only the order matters here, not the outcome
+            await asyncio.wait([previous])
+        try:
+            await self.dp.feed_raw_update(self.bot, update)
+        except Exception:
+            self.errors += 1
+            logger.exception("Update %s failed", update.get("update_id"))
+        finally:
+            self.updates += 1
+    
+    def feed(self, update: Dict[str, Any]) -> None:
+        """Start handling an update after the earlier ones of its user."""
+        key = update_shard_key(update)
+        task = asyncio.create_task(self._handle(update, self._tails.get(key)))
+        self._tails[key] = task
+        self._tasks.add(task)
+        
+        def done(_: asyncio.Task) -> None:
+            self._tasks.discard(task)
+            if self._tails.get(key) is task:
+                del self._tails[key]
+        task.add_done_callback(done)
+    
+    async def _receive(self, request: web.Request) -> web.Response:
+        if request.headers.get(WORKER_SECRET_HEADER) != self.secret:
+            return web.Response(status=401)
+        for update in await request.json():
+            self.feed(update)
+        return web.Response()
+    
+    def health(self) -> Dict[str, Any]:
+        """Counters reported to the front process."""
+        return {
+            'worker': self.index,
+            'pid': multiprocessing.current_process().pid,
+            'updates': self.updates,
+            'errors': self.errors,
+            'in_flight': len(self._tasks),
+            'uptime': time.monotonic() - self.started
+        }
+    
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.health())
+    
+    async def _refresh_caches(self) -> None:
+        """Pick up catalog, question bank and submission changes made in other processes."""
+        while True:
+            await asyncio.sleep(WORKER_CACHE_REFRESH_SECONDS)
+            try:
+                daily_challenges.invalidate()
+                question_store.invalidate()
+                await similarity_index.load()
+            except Exception:
+                logger.exception("Worker %d failed to refresh caches", self.index)
+    
+    async def run(self) -> None:
+        """Serve forwarded updates until SIGTERM."""
+        self.bot = Bot(token=TELEGRAM_BOT_TOKEN)
+        self.dp = create_dispatcher()
+        await start_services(self.bot, primary=self.primary)
+        await self.dp.emit_startup(bot=self.bot)
+        
+        app = web.Application()
+        app.router.add_post("/updates", self._receive)
+        app.router.add_get("/health", self._health)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", worker_port(self.index)).start()
+        refresher = asyncio.create_task(self._refresh_caches())
+        
+        stop = asyncio.Event()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        logger.info("Worker %d started on port %d", self.index, worker_port(self.index))
+        try:
+            await stop.wait()
+        finally:
+            refresher.cancel()
+            await runner.cleanup()
+            # Finish the updates already accepted
+            if self._tasks:
+                await asyncio.wait(list(self._tasks))
+            # Writes FSM states back
+            await self.dp.emit_shutdown(bot=self.bot)
+            await stop_services(self.bot, primary=self.primary)
+            logger.info("Worker %d stopped after %d updates", self.index, self.updates)
+
+
+def worker_process(index: int, secret: str) -> None:
+    """Entry point of a worker process."""
+    # Ctrl+C reaches the whole process group; the front stops workers once it has drained
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(UpdateWorker(index, secret).run())
+
+
+class WorkerPool:
+    """Front process: receives updates and forwards them to the workers.
+    
+    Each worker has its own queue, drained in order by one forwarder task
+    in batches of WORKER_FORWARD_BATCH_SIZE; a worker that is down or
+    restarting is retried until it takes the batch, so nothing is
+    reordered or dropped. Receiving pauses while a worker's queue is full.
+    """
+    
+    def __init__(self, workers: int = BOT_WORKERS):
+        self.workers = workers
+        self.secret = secrets.token_hex(16)
+        self.queues = [asyncio.Queue(WORKER_QUEUE_SIZE) for _ in range(workers)]
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._context = multiprocessing.get_context("spawn")
+        self._reported: Dict[int, int] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=worker_process, args=(index, self.secret), name=f"worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+        self._reported.pop(index, None)
+        logger.info("Started worker %d (pid %s)", index, process.pid)
+    
+    async def put(self, update: Dict[str, Any]) -> None:
+        """Queue an update for its worker."""
+        await self.queues[shard_for(update, self.workers)].put(update)
+    
+    async def _forward(self, index: int) -> None:
+        """Send a worker's queued updates to it, in order."""
+        queue = self.queues[index]
+        url = f"http://127.0.0.1:{worker_port(index)}/updates"
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < WORKER_FORWARD_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            delay = 0.1
+            while True:
+                try:
+                    async with self._session.post(
+                        url, json=batch, headers={WORKER_SECRET_HEADER: self.secret}
+                    ) as response:
+                        response.raise_for_status()
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # Worker still starting or being restarted
+                    logger.debug("Worker %d unavailable: %s", index, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 5.0)
+            for _ in batch:
+                queue.task_done()
+    
+    async def _report(self) -> None:
+        """Log each worker's health and throughput, restarting workers that died."""
+        while True:
+            await asyncio.sleep(WORKER_REPORT_INTERVAL_SECONDS)
+            for index, process in enumerate(self.processes):
+                if not process.is_alive():
+                    logger.error("Worker %d exited with code %s; restarting", index, process.exitcode)
+                    self._spawn(index)
+                    continue
+                try:
+                    async with self._session.get(f"http://127.0.0.1:{worker_port(index)}/health") as response:
+                        health = await response.json()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.warning("Worker %d: no health report (%s)", index, e)
+                    continue
+                rate = (health['updates'] - self._reported.get(index, 0)) / WORKER_REPORT_INTERVAL_SECONDS
+                self._reported[index] = health['updates']
+                logger.info(
+                    "Worker %d (pid %s): %d updates, %.1f/s, %d in flight, %d errors, %d queued, up %.0f min",
+                    index, health['pid'], health['updates'], max(rate, 0.0), health['in_flight'],
+                    health['errors'], self.queues[index].qsize(), health['uptime'] / 60
+                )
+    
+    async def _poll(self, bot: Bot, allowed_updates: List[str]) -> None:
+        """Receive updates with long polling."""
+        # Polling ignores updates while a webhook is set
+        await bot.delete_webhook()
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+            except Exception:
+                logger.exception("Failed to get updates")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                await self.put(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+                offset = update.update_id + 1
+    
+    async def _serve_webhook(self, bot: Bot, allowed_updates: List[str], stop: asyncio.Event) -> None:
+        """Receive updates on the webhook until stopped."""
+        if not WEBHOOK_BASE_URL:
+            raise RuntimeError("WEBHOOK_BASE_URL must be set in webhook mode")
+        secret = get_webhook_secret()
+        
+        async def receive(request: web.Request) -> web.Response:
+            if request.headers.get("X-Telegram-Bot-Api-Secret-Token") != secret:
+                return web.Response(status=401)
+            await self.put(await request.json())
+            return web.Response()
+        
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, receive)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        try:
+            # Set only once the server is listening, so no update is refused
+            await bot.set_webhook(
+                f"{WEBHOOK_BASE_URL.rstrip('/')}{WEBHOOK_PATH}",
+                secret_token=secret,
+                allowed_updates=allowed_updates
+            )
+            logger.info("Front started (webhook on %s:%s%s)", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH)
+            await stop.wait()
+        finally:
+            if WEBHOOK_REMOVE_ON_SHUTDOWN:
+                await bot.delete_webhook()
+            await runner.cleanup()
+    
+    async def run(self) -> None:
+        """Start the workers and forward updates to them until SIGINT/SIGTERM."""
+        bot = Bot(token=TELEGRAM_BOT_TOKEN)
+        allowed_updates = create_dispatcher().resolve_used_update_types()
+        for index in range(self.workers):
+            self._spawn(index)
+        
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        tasks = [asyncio.create_task(self._forward(index)) for index in range(self.workers)]
+        tasks.append(asyncio.create_task(self._report()))
+        
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        
+        try:
+            if BOT_MODE == "webhook":
+                await self._serve_webhook(bot, allowed_updates, stop)
+            else:
+                logger.info("Front started (polling, %d workers)", self.workers)
+                poller = asyncio.create_task(self._poll(bot, allowed_updates))
+                await stop.wait()
+                poller.cancel()
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            # Hand over everything received before stopping the workers
+            await asyncio.gather(*(queue.join() for queue in self.queues))
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for process in self.processes:
+                process.terminate()
+            for process in self.processes:
+                await asyncio.to_thread(process.join)
+            await self._session.close()
+            await bot.session.close()
+            logger.info("Front stopped")
+
+
+async def run_front() -> None:
+    """Run the front process with BOT_WORKERS workers."""
+    await WorkerPool().run()
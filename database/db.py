@@ -1,12 +1,21 @@
 """Database connection manager and CRUD operations."""
 import aiosqlite
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any
-from bot.config import DATABASE_PATH
+from typing import Optional, List, Dict, Any, Tuple
+from bot.config import DATABASE_PATH, SIMILARITY_ENABLED
+from bot.ai.verdict import verdict_columns
+from bot.utils import minhash
 from database.models import (
-    USERS_TABLE, CHALLENGES_TABLE, SUBMISSIONS_TABLE,
+    USERS_TABLE, USER_TIMEZONE_COLUMNS, USERS_TIMEZONE_INDEX, CHALLENGES_TABLE, SUBMISSIONS_TABLE,
     INTERVIEW_QUESTIONS_TABLE, USER_ACHIEVEMENTS_TABLE,
-    USER_DAILY_CHALLENGES_TABLE, BANNED_USERS_TABLE
+    USER_DAILY_CHALLENGES_TABLE, USER_DAILY_CHALLENGES_INDEX, DAILY_CHALLENGE_DELIVERIES_TABLE,
+    BANNED_USERS_TABLE, REVIEW_CACHE_TABLE,
+    REVIEW_JOBS_TABLE, REVIEW_JOB_COLUMNS, REVIEW_JOBS_INDEX, AI_CALLS_TABLE, AI_CALLS_INDEX,
+    AI_QUOTA_BUCKETS_TABLE, CHALLENGE_HINTS_TABLE, USER_HINTS_TABLE,
+    SUBMISSIONS_USER_CHALLENGE_INDEX, SUBMISSIONS_USER_ACTIVITY_INDEX, REVIEW_VERDICT_COLUMNS,
+    SUBMISSION_SIGNATURES_TABLE, SUBMISSION_LSH_TABLE,
+    INTERVIEW_REVIEWS_TABLE, INTERVIEW_REVIEWS_DUE_INDEX, BROADCASTS_TABLE, SCHEDULER_RUNS_TABLE,
+    SCHEDULER_RUN_COLUMNS, BROADCAST_COLUMNS,     SCHEDULER_JOBS_TABLE, SCHEDULER_JOBS_INDEX, LEADER_LEASES_TABLE, FSM_STATES_TABLE, FSM_STATES_UPDATED_INDEX
 )
 
 
@@ -19,15 +28,57 @@ class Database:
     async def init_db(self):
         """Initialize database and create tables."""
         async with aiosqlite.connect(self.db_path) as db:
+            # Readers don't block writers, so several processes can share the file
+            await db.execute("PRAGMA journal_mode=WAL")
             await db.execute(USERS_TABLE)
             await db.execute(CHALLENGES_TABLE)
             await db.execute(SUBMISSIONS_TABLE)
             await db.execute(INTERVIEW_QUESTIONS_TABLE)
             await db.execute(USER_ACHIEVEMENTS_TABLE)
             await db.execute(USER_DAILY_CHALLENGES_TABLE)
+            await db.execute(USER_DAILY_CHALLENGES_INDEX)
+            await db.execute(DAILY_CHALLENGE_DELIVERIES_TABLE)
             await db.execute(BANNED_USERS_TABLE)
+            await db.execute(REVIEW_CACHE_TABLE)
+            await db.execute(REVIEW_JOBS_TABLE)
+            await db.execute(REVIEW_JOBS_INDEX)
+            await db.execute(AI_CALLS_TABLE)
+            await db.execute(AI_CALLS_INDEX)
+            await db.execute(AI_QUOTA_BUCKETS_TABLE)
+            await db.execute(CHALLENGE_HINTS_TABLE)
+            await db.execute(USER_HINTS_TABLE)
+            await db.execute(SUBMISSIONS_USER_CHALLENGE_INDEX)
+            await db.execute(SUBMISSIONS_USER_ACTIVITY_INDEX)
+            await db.execute(SUBMISSION_SIGNATURES_TABLE)
+            await db.execute(SUBMISSION_LSH_TABLE)
+            await db.execute(INTERVIEW_REVIEWS_TABLE)
+            await db.execute(INTERVIEW_REVIEWS_DUE_INDEX)
+            await db.execute(BROADCASTS_TABLE)
+            await db.execute(SCHEDULER_RUNS_TABLE)
+            # Also created by the job store; existing tables spare it a write lock on start
+            await db.execute(SCHEDULER_JOBS_TABLE)
+            await db.execute(SCHEDULER_JOBS_INDEX)
+            await db.execute(LEADER_LEASES_TABLE)
+            await db.execute(FSM_STATES_TABLE)
+            await db.execute(FSM_STATES_UPDATED_INDEX)
+            await self._add_missing_columns(db, "users", USER_TIMEZONE_COLUMNS)
+            await db.execute(USERS_TIMEZONE_INDEX)
+            await self._add_missing_columns(db, "submissions", REVIEW_VERDICT_COLUMNS)
+            await self._add_missing_columns(db, "review_cache", REVIEW_VERDICT_COLUMNS)
+            await self._add_missing_columns(db, "review_jobs", REVIEW_JOB_COLUMNS)
+            await self._add_missing_columns(db, "scheduler_runs", SCHEDULER_RUN_COLUMNS)
+            await self._add_missing_columns(db, "broadcasts", BROADCAST_COLUMNS)
             await db.commit()
     
+    @staticmethod
+    async def _add_missing_columns(db: aiosqlite.Connection, table: str, columns: Dict[str, str]) -> None:
+        """Add columns introduced after a table was first created."""
+        async with db.execute(f"PRAGMA table_info({table})") as cursor:
+            existing = {row[1] for row in await cursor.fetchall()}
+        for name, definition in columns.items():
+            if name not in existing:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    
     # User operations
     async def create_user(self, user_id: int, username: str) -> None:
         """Create a new user."""
@@ -49,7 +100,7 @@ class Database:
     async def update_user_stats(self, user_id: int, **kwargs) -> None:
         """Update user statistics."""
         fields = ", ".join([f"{k} = ?" for k in kwargs.keys()])
-        values = list(kwargs.values()) + [user_id]
+        values = list(kwargs.values())
         
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute(
@@ -58,25 +109,58 @@ class Database:
             )
             await db.commit()
     
-    async def update_streak(self, user_id: int) -> int:
-        """Update user streak and return new streak value."""
-        user = await self.get_user(user_id)
-        if not user:
-            return 0
-        
+    async def set_user_timezone(self, user_id: int, timezone: str) -> None:
+        """Set a user's time zone."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("UPDATE users SET timezone = ? WHERE user_id = ?", (timezone, user_id))
+            await db.commit()
+    
+    async def get_user_timezones(self) -> List[Optional[str]]:
+        """Get the distinct time zones of all users (None for users without one)."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute("SELECT DISTINCT timezone FROM users") as cursor:
+                rows = await cursor.fetchall()
+                return [row[0] for row in rows]
+    
+    async def get_users_in_timezone(self, timezone: Optional[str], after_user_id: int,
+                                    limit: int) -> List[Dict[str, Any]]:
+        """Get the next batch of non-banned users in a time zone (None: no time zone set), by ID."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            # "IS ?" matches NULL too and is served by idx_users_timezone
+            async with db.execute(
+                """SELECT u.* FROM users u
+                   WHERE u.timezone IS ? AND u.user_id > ?
+                   AND NOT EXISTS (SELECT 1 FROM banned_users b WHERE b.user_id = u.user_id)
+                   ORDER BY u.user_id
+                   LIMIT ?""",
+                (timezone, after_user_id, limit)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    @staticmethod
+    def next_streak(user: Dict[str, Any]) -> int:
+        """Get a user's streak after being active today."""
         last_active = datetime.fromisoformat(user['last_active']).date()
         today = date.today()
         
         if (today - last_active).days == 1:
             # Continue streak
-            new_streak = user['streak'] + 1
+            return user['streak'] + 1
         elif (today - last_active).days == 0:
             # Same day
-            new_streak = user['streak']
-        else:
-            # Streak broken
-            new_streak = 1
+            return user['streak']
+        # Streak broken
+        return 1
+    
+    async def update_streak(self, user_id: int) -> int:
+        """Update user streak and return new streak value."""
+        user = await self.get_user(user_id)
+        if not user:
+            return 0
         
+        new_streak = self.next_streak(user)
         await self.update_user_stats(user_id, streak=new_streak)
         return new_streak
     
@@ -131,30 +215,186 @@ class Database:
                 row = await cursor.fetchone()
                 return dict(row) if row else None
     
-    async def assign_daily_challenge(self, user_id: int, challenge_id: int) -> None:
-        """Assign a daily challenge to user."""
-        today = date.today().isoformat()
+    async def get_daily_challenge_id(self, user_id: int, day: str) -> Optional[int]:
+        """Get the ID of the challenge pinned as a user's daily challenge for a day."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                """SELECT challenge_id FROM user_daily_challenges
+                   WHERE user_id = ? AND assigned_date = ?
+                   ORDER BY id LIMIT 1""",
+                (user_id, day)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else None
+    
+    async def assign_daily_challenge(self, user_id: int, challenge_id: int, day: Optional[str] = None) -> None:
+        """Assign a daily challenge to user unless one is already assigned for the day."""
+        day = day or date.today().isoformat()
         
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute(
-                """INSERT OR IGNORE INTO user_daily_challenges (user_id, challenge_id, assigned_date)
-                   VALUES (?, ?, ?)""",
-                (user_id, challenge_id, today)
+                """INSERT INTO user_daily_challenges (user_id, challenge_id, assigned_date)
+                   SELECT ?, ?, ?
+                   WHERE NOT EXISTS (SELECT 1 FROM user_daily_challenges WHERE user_id = ? AND assigned_date = ?)""",
+                (user_id, challenge_id, day, user_id, day)
+            )
+            await db.commit()
+    
+    async def get_daily_challenge_ids_for_users(self, user_ids: List[int], day: str) -> Dict[int, int]:
+        """Get the challenges pinned as daily challenges for a day, by user ID."""
+        if not user_ids:
+            return {}
+        placeholders = ",".join("?" * len(user_ids))
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f"""SELECT user_id, challenge_id FROM user_daily_challenges
+                    WHERE user_id IN ({placeholders}) AND assigned_date = ?
+                    ORDER BY id DESC""",
+                (*user_ids, day)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                # Newest first, so the oldest row wins like in get_daily_challenge_id
+                return dict(rows)
+    
+    async def get_daily_challenge_delivered_user_ids(self, user_ids: List[int], day: str) -> set:
+        """Get which of the users were already sent (or found blocked) their daily challenge for a day."""
+        if not user_ids:
+            return set()
+        placeholders = ",".join("?" * len(user_ids))
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f"""SELECT user_id FROM daily_challenge_deliveries
+                    WHERE user_id IN ({placeholders}) AND day = ? AND status != 'failed'""",
+                (*user_ids, day)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return {row[0] for row in rows}
+    
+    async def record_daily_challenge_deliveries(self, deliveries: List[Tuple[int, str, int, str]]) -> None:
+        """Store delivery statuses as (user_id, day, challenge_id, status) rows."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                """INSERT INTO daily_challenge_deliveries (user_id, day, challenge_id, status)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (user_id, day) DO UPDATE SET
+                   challenge_id = excluded.challenge_id, status = excluded.status,
+                   delivered_at = CURRENT_TIMESTAMP""",
+                deliveries
             )
             await db.commit()
     
+    async def get_daily_challenge_delivery_stats(self, day: str) -> Dict[str, int]:
+        """Count daily challenge deliveries for a day by status."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT status, COUNT(*) FROM daily_challenge_deliveries WHERE day = ? GROUP BY status",
+                (day,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return dict(rows)
+    
+    async def get_challenge_catalog(self) -> List[Dict[str, Any]]:
+        """Get every challenge, by ID."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM challenges ORDER BY id") as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    async def get_solved_challenge_ids(self, user_id: int) -> set:
+        """Get IDs of challenges a user has completed."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT DISTINCT challenge_id FROM submissions WHERE user_id = ? AND status = 'completed'",
+                (user_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return {row[0] for row in rows}
+    
+    async def get_solved_challenge_ids_for_users(self, user_ids: List[int]) -> Dict[int, set]:
+        """Get IDs of challenges each of the users has completed."""
+        solved: Dict[int, set] = {}
+        if not user_ids:
+            return solved
+        placeholders = ",".join("?" * len(user_ids))
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                f"""SELECT DISTINCT user_id, challenge_id FROM submissions
+                    WHERE user_id IN ({placeholders}) AND status = 'completed'""",
+                user_ids
+            ) as cursor:
+                async for user_id, challenge_id in cursor:
+                    solved.setdefault(user_id, set()).add(challenge_id)
+        return solved
+    
     # Submission operations
     async def add_submission(self, user_id: int, challenge_id: int, code: str,
-                            language: str, status: str, feedback: str, points_earned: int) -> int:
-        """Add a code submission."""
+                            language: str, status: str, feedback: str, points_earned: int,
+                            verdict: Optional[Dict[str, Any]] = None, signature=None,
+                            best_match: Optional[Dict[str, Any]] = None,
+                            review_job_id: Optional[int] = None,
+                            user_stats: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Add a code submission with its optional AI verdict.
+        
+        The MinHash signature and LSH bands of the code are stored with it;
+        pass a precomputed `signature` to avoid hashing the code twice and
+        `best_match` ({'submission_id', 'score'}) to record the closest
+        submission by another user. With `review_job_id` the review job is
+        marked as recorded, and with `user_stats` (column -> value, as for
+        update_user_stats) the user is updated, in the same transaction.
+        """
+        if signature is None and SIMILARITY_ENABLED:
+            signature = minhash.signature(code, language)
+        
         async with aiosqlite.connect(self.db_path) as db:
             cursor = await db.execute(
-                """INSERT INTO submissions (user_id, challenge_id, code, language, status, feedback, points_earned)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (user_id, challenge_id, code, language, status, feedback, points_earned)
+                """INSERT INTO submissions (user_id, challenge_id, code, language, status, feedback, points_earned,
+                                          verdict, review_score, review_issues)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (user_id, challenge_id, code, language, status, feedback, points_earned,
+                 *verdict_columns(verdict))
             )
+            submission_id = cursor.lastrowid
+            
+            if review_job_id is not None:
+                await db.execute(
+                    "UPDATE review_jobs SET submission_id = ? WHERE id = ?",
+                    (submission_id, review_job_id)
+                )
+            
+            if user_stats:
+                fields = ", ".join(f"{key} = ?" for key in user_stats)
+                await db.execute(
+                    f"UPDATE users SET {fields}, last_active = ? WHERE user_id = ?",
+                    [*user_stats.values(), datetime.now().isoformat(), user_id]
+                )
+            
+            if signature is not None:
+                await db.execute(
+                    """INSERT INTO submission_signatures
+                       (submission_id, challenge_id, user_id, signature, best_match_id, best_match_score)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (submission_id, challenge_id, user_id, minhash.to_blob(signature),
+                     best_match['submission_id'] if best_match else None,
+                     best_match['score'] if best_match else None)
+                )
+                await db.executemany(
+                    "INSERT OR IGNORE INTO submission_lsh (challenge_id, band, bucket, submission_id) VALUES (?, ?, ?, ?)",
+                    [(challenge_id, band, bucket, submission_id)
+                     for band, bucket in enumerate(minhash.band_hashes(signature))]
+                )
+            
             await db.commit()
-            return cursor.lastrowid
+            return submission_id
+    
+    async def get_submission(self, submission_id: int) -> Optional[Dict[str, Any]]:
+        """Get submission by ID."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM submissions WHERE id = ?", (submission_id,)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
     
     async def get_user_submissions(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """Get user's recent submissions."""
@@ -170,6 +410,511 @@ class Database:
                 rows = await cursor.fetchall()
                 return [dict(row) for row in rows]
     
+    async def get_latest_submission(self, user_id: int, challenge_id: int,
+                                    language: str) -> Optional[Dict[str, Any]]:
+        """Get the user's most recent submission for a challenge in a language."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                """SELECT * FROM submissions
+                   WHERE user_id = ? AND challenge_id = ? AND language = ?
+                   ORDER BY id DESC LIMIT 1""",
+                (user_id, challenge_id, language)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+    
+    # Near-duplicate index
+    async def get_submission_signatures(self) -> List[tuple]:
+        """Get all stored (submission_id, challenge_id, user_id, signature) rows."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT submission_id, challenge_id, user_id, signature FROM submission_signatures"
+            ) as cursor:
+                return await cursor.fetchall()
+    
+    async def get_submission_lsh_buckets(self) -> List[tuple]:
+        """Get all stored (challenge_id, band, bucket, submission_id) rows."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT challenge_id, band, bucket, submission_id FROM submission_lsh"
+            ) as cursor:
+                return await cursor.fetchall()
+    
+    async def get_similar_submission_flags(self, min_score: float, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recent submissions that closely match another user's submission."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                """SELECT s.submission_id, s.user_id, s.best_match_id, s.best_match_score, s.created_at,
+                          m.user_id as match_user_id, c.title as challenge_title,
+                          u.username, mu.username as match_username
+                   FROM submission_signatures s
+                   JOIN submission_signatures m ON m.submission_id = s.best_match_id
+                   JOIN challenges c ON c.id = s.challenge_id
+                   LEFT JOIN users u ON u.user_id = s.user_id
+                   LEFT JOIN users mu ON mu.user_id = m.user_id
+                   WHERE s.best_match_score >= ?
+                   ORDER BY s.submission_id DESC LIMIT ?""",
+                (min_score, limit)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    # Challenge hints
+    async def get_challenge_hints(self, challenge_id: int) -> List[str]:
+        """Get stored hints for a challenge, ordered by level."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT hint FROM challenge_hints WHERE challenge_id = ? ORDER BY level",
+                (challenge_id,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [row[0] for row in rows]
+    
+    async def get_challenge_hint(self, challenge_id: int, level: int) -> Optional[str]:
+        """Get a stored hint of the given level."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT hint FROM challenge_hints WHERE challenge_id = ? AND level = ?",
+                (challenge_id, level)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else None
+    
+    async def save_challenge_hint(self, challenge_id: int, level: int, hint: str) -> None:
+        """Store a generated hint."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO challenge_hints (challenge_id, level, hint) VALUES (?, ?, ?)",
+                (challenge_id, level, hint)
+            )
+            await db.commit()
+    
+    async def get_challenges_missing_hints(self, levels: int) -> List[int]:
+        """Get IDs of challenges with fewer than `levels` stored hints."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                """SELECT c.id FROM challenges c
+                   LEFT JOIN challenge_hints h ON h.challenge_id = c.id
+                   GROUP BY c.id
+                   HAVING COUNT(h.level) < ?
+                   ORDER BY c.id""",
+                (levels,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [row[0] for row in rows]
+    
+    async def get_hints_received(self, user_id: int, challenge_id: int) -> int:
+        """Get how many hints a user has received for a challenge."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT hints_received FROM user_hints WHERE user_id = ? AND challenge_id = ?",
+                (user_id, challenge_id)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else 0
+    
+    async def set_hints_received(self, user_id: int, challenge_id: int, count: int) -> None:
+        """Record that a user has received `count` hints for a challenge."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """INSERT INTO user_hints (user_id, challenge_id, hints_received) VALUES (?, ?, ?)
+                   ON CONFLICT (user_id, challenge_id) DO UPDATE SET
+                   hints_received = MAX(hints_received, excluded.hints_received),
+                   updated_at = CURRENT_TIMESTAMP""",
+                (user_id, challenge_id, count)
+            )
+            await db.commit()
+    
+    # Review cache
+    async def get_cached_review(self, challenge_id: int, language: str, code_hash: str,
+                                max_age_days: int, count_hit: bool = True) -> Optional[Dict[str, Any]]:
+        """Get a cached review, bumping its hit counter unless `count_hit` is False."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            # created_at is SQLite's CURRENT_TIMESTAMP (UTC), so the cutoff is computed in SQL too
+            async with db.execute(
+                """SELECT status, feedback, verdict, review_score, review_issues FROM review_cache
+                   WHERE challenge_id = ? AND language = ? AND code_hash = ?
+                   AND created_at >= datetime('now', ?)""",
+                (challenge_id, language, code_hash, f"-{max_age_days} days")
+            ) as cursor:
+                row = await cursor.fetchone()
+            
+            if not row or not count_hit:
+                return dict(row) if row else None
+            
+            await db.execute(
+                """UPDATE review_cache SET hit_count = hit_count + 1
+                   WHERE challenge_id = ? AND language = ? AND code_hash = ?""",
+                (challenge_id, language, code_hash)
+            )
+            await db.commit()
+            return dict(row)
+    
+    async def save_cached_review(self, challenge_id: int, language: str, code_hash: str,
+                                 status: str, feedback: str,
+                                 verdict: Optional[Dict[str, Any]] = None) -> None:
+        """Store a review result in the cache."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """INSERT OR REPLACE INTO review_cache
+                   (challenge_id, language, code_hash, status, feedback, verdict, review_score, review_issues)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (challenge_id, language, code_hash, status, feedback, *verdict_columns(verdict))
+            )
+            await db.commit()
+    
+    async def purge_review_cache(self, challenge_id: Optional[int] = None) -> int:
+        """Delete cached reviews (all or for one challenge) and return the number removed."""
+        async with aiosqlite.connect(self.db_path) as db:
+            if challenge_id is not None:
+                cursor = await db.execute("DELETE FROM review_cache WHERE challenge_id = ?", (challenge_id,))
+            else:
+                cursor = await db.execute("DELETE FROM review_cache")
+            await db.commit()
+            return cursor.rowcount
+    
+    async def get_review_cache_stats(self) -> Dict[str, int]:
+        """Get number of cached reviews and total stored hits."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM review_cache"
+            ) as cursor:
+                row = await cursor.fetchone()
+                return {'entries': row[0], 'hits': row[1]}
+    
+    # Review job queue
+    async def enqueue_review_job(self, user_id: int, chat_id: int, challenge_id: int,
+                                 code: str, language: str) -> int:
+        """Add a code review job to the queue."""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """INSERT INTO review_jobs (user_id, chat_id, challenge_id, code, language, available_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (user_id, chat_id, challenge_id, code, language, datetime.now().isoformat())
+            )
+            await db.commit()
+            return cursor.lastrowid
+    
+    async def set_review_job_message(self, job_id: int, message_id: int) -> None:
+        """Remember the status message shown to the user for a job."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "UPDATE review_jobs SET status_message_id = ? WHERE id = ?",
+                (message_id, job_id)
+            )
+            await db.commit()
+    
+    async def count_queued_review_jobs(self) -> int:
+        """Get number of pending and running review jobs."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT COUNT(*) FROM review_jobs WHERE status IN ('pending', 'running')"
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else 0
+    
+    async def get_review_job_position(self, job_id: int) -> int:
+        """Get 1-based position of a pending job in the queue."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT COUNT(*) FROM review_jobs WHERE status = 'pending' AND id <= ?",
+                (job_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else 0
+    
+    async def claim_review_job(self, stale_before: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest due job and mark it running.
+        
+        Running jobs whose heartbeat is older than `stale_before` are taken
+        over too: the process running them is gone.
+        """
+        now = datetime.now().isoformat()
+        
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            await db.execute("BEGIN IMMEDIATE")
+            async with db.execute(
+                """SELECT * FROM review_jobs
+                   WHERE (status = 'pending' AND available_at <= ?)
+                      OR (status = 'running' AND COALESCE(heartbeat_at, available_at) < ?)
+                   ORDER BY id LIMIT 1""",
+                (now, stale_before.isoformat())
+            ) as cursor:
+                row = await cursor.fetchone()
+            
+            if not row:
+                await db.rollback()
+                return None
+            
+            await db.execute(
+                """UPDATE review_jobs SET status = 'running', attempts = attempts + 1, heartbeat_at = ?
+                   WHERE id = ?""",
+                (now, row['id'])
+            )
+            await db.commit()
+            job = dict(row)
+            job['attempts'] += 1
+            return job
+    
+    async def complete_review_job(self, job_id: int) -> None:
+        """Remove a finished job from the queue."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM review_jobs WHERE id = ?", (job_id,))
+            await db.commit()
+    
+    async def fail_review_job(self, job_id: int, error: str, retry_at: Optional[datetime] = None) -> None:
+        """Record a job failure and either schedule a retry or mark it failed."""
+        async with aiosqlite.connect(self.db_path) as db:
+            if retry_at:
+                await db.execute(
+                    """UPDATE review_jobs SET status = 'pending', last_error = ?, available_at = ?
+                       WHERE id = ?""",
+                    (error, retry_at.isoformat(), job_id)
+                )
+            else:
+                await db.execute(
+                    "UPDATE review_jobs SET status = 'failed', last_error = ? WHERE id = ?",
+                    (error, job_id)
+                )
+            await db.commit()
+    
+    async def touch_review_job(self, job_id: int) -> None:
+        """Refresh the heartbeat of a running job."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "UPDATE review_jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                (datetime.now().isoformat(), job_id)
+            )
+            await db.commit()
+    
+    # Scheduler run ledger
+    async def claim_scheduler_run(self, job: str, run_date: str, holder: str, expires_at: float) -> bool:
+        """
+        Mark a bulk job as running for a day unless it already ran or is running.
+        
+        Args:
+            job: Job name
+            run_date: Date the run is for (ISO format)
+            holder: ID of the calling instance
+            expires_at: Unix time the claim lasts until unless renewed
+        
+        Returns:
+            True if the caller should run the job (first run, or the last one failed)
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """INSERT INTO scheduler_runs (job, run_date, status, holder, expires_at)
+                   VALUES (?, ?, 'running', ?, ?)
+                   ON CONFLICT (job, run_date) DO UPDATE SET
+                   status = 'running', started_at = CURRENT_TIMESTAMP, finished_at = NULL,
+                   holder = excluded.holder, expires_at = excluded.expires_at
+                   WHERE scheduler_runs.status = 'failed'""",
+                (job, run_date, holder, expires_at)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def renew_scheduler_run(self, job: str, run_date: str, holder: str, expires_at: float) -> bool:
+        """Extend a running claim; False if the caller no longer holds it."""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """UPDATE scheduler_runs SET expires_at = ?
+                   WHERE job = ? AND run_date = ? AND holder = ? AND status = 'running'""",
+                (expires_at, job, run_date, holder)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def finish_scheduler_run(self, job: str, run_date: str, holder: str, status: str) -> None:
+        """Record how a claimed job ended ('done' or 'failed'), unless another instance took it over."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """UPDATE scheduler_runs SET status = ?, finished_at = CURRENT_TIMESTAMP
+                   WHERE job = ? AND run_date = ? AND holder = ? AND status = 'running'""",
+                (status, job, run_date, holder)
+            )
+            await db.commit()
+    
+    async def fail_expired_scheduler_runs(self, now: float) -> int:
+        """
+        Mark running runs whose claim has expired as failed, so they are run again.
+        
+        Runs of an instance that is still alive (however slow) keep their
+        claim renewed and are left alone.
+        
+        Args:
+            now: Current Unix time
+        
+        Returns:
+            Number of runs marked failed
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """UPDATE scheduler_runs SET status = 'failed', finished_at = CURRENT_TIMESTAMP
+                   WHERE status = 'running' AND (expires_at IS NULL OR expires_at < ?)""",
+                (now,)
+            )
+            await db.commit()
+            return cursor.rowcount
+    
+    # Leader leases
+    async def acquire_lease(self, name: str, holder: str, now: float, expires_at: float) -> bool:
+        """
+        Take or renew a lease.
+        
+        Succeeds if nobody holds it, the caller already holds it, or the
+        current holder's lease has expired; a single statement, so two
+        instances can't both succeed.
+        
+        Args:
+            name: Lease name
+            holder: ID of the calling instance
+            now: Current Unix time
+            expires_at: Unix time the lease should last until
+        
+        Returns:
+            True if the caller holds the lease until expires_at
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """INSERT INTO leader_leases (name, holder, expires_at) VALUES (?, ?, ?)
+                   ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+                   WHERE leader_leases.holder = excluded.holder OR leader_leases.expires_at < ?""",
+                (name, holder, expires_at, now)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def release_lease(self, name: str, holder: str) -> None:
+        """Give up a lease if the caller holds it."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM leader_leases WHERE name = ? AND holder = ?", (name, holder))
+            await db.commit()
+    
+    # FSM storage
+    async def get_fsm_record(self, key: str) -> Optional[Tuple[Optional[str], str, float]]:
+        """Get a conversation's (state, data JSON, updated_at)."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                "SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return tuple(row) if row else None
+    
+    async def save_fsm_records(self, records: List[Tuple[str, Optional[str], str, float]],
+                               deleted_keys: List[str]) -> None:
+        """Write back conversations as (key, state, data JSON, updated_at) rows in one transaction."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                """INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                   state = excluded.state, data = excluded.data, updated_at = excluded.updated_at""",
+                records
+            )
+            await db.executemany("DELETE FROM fsm_states WHERE key = ?", [(key,) for key in deleted_keys])
+            await db.commit()
+    
+    async def delete_expired_fsm_records(self, before: float) -> int:
+        """Delete conversations idle since before a Unix time."""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute("DELETE FROM fsm_states WHERE updated_at < ?", (before,))
+            await db.commit()
+            return cursor.rowcount
+    
+    # AI call metrics
+    async def add_ai_call(self, method: str, model: str, outcome: str, queue_wait_ms: float,
+                          ttft_ms: Optional[float], total_ms: float,
+                          prompt_tokens: int, completion_tokens: int) -> None:
+        """Record a single AI call."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """INSERT INTO ai_calls (method, model, outcome, queue_wait_ms, ttft_ms, total_ms,
+                                         prompt_tokens, completion_tokens)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (method, model, outcome, queue_wait_ms, ttft_ms, total_ms, prompt_tokens, completion_tokens)
+            )
+            await db.commit()
+    
+    async def prune_ai_calls(self, days: int) -> int:
+        """Delete AI call records older than N days."""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "DELETE FROM ai_calls WHERE created_at < datetime('now', ?)",
+                (f"-{days} days",)
+            )
+            await db.commit()
+            return cursor.rowcount
+    
+    async def get_daily_token_usage(self, days: int = 7) -> List[Dict[str, Any]]:
+        """Get AI calls and tokens per day for the last N days."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                """SELECT date(created_at) as day, COUNT(*) as calls,
+                          SUM(prompt_tokens) as prompt_tokens,
+                          SUM(completion_tokens) as completion_tokens,
+                          SUM(outcome != 'ok') as failures
+                   FROM ai_calls
+                   WHERE created_at >= datetime('now', ?)
+                   GROUP BY day
+                   ORDER BY day DESC""",
+                (f"-{days} days",)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    # AI quotas
+    async def get_ai_quota_totals(self, oldest: Dict[str, int],
+                                  scopes: Optional[List[str]] = None) -> List[tuple]:
+        """
+        Sum quota counters over their rolling windows.
+        
+        Args:
+            oldest: period -> first bucket still inside its window
+            scopes: Scopes to sum (primary key lookups), or None for all
+        
+        Returns:
+            (scope, period, total) rows; periods without usage are left out
+        """
+        windows = " OR ".join("(period = ? AND bucket >= ?)" for _ in oldest)
+        params: List[Any] = [value for item in oldest.items() for value in item]
+        sql = f"SELECT scope, period, SUM(amount) FROM ai_quota_buckets WHERE ({windows})"
+        if scopes is not None:
+            sql += f" AND scope IN ({', '.join('?' for _ in scopes)})"
+            params.extend(scopes)
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(sql + " GROUP BY scope, period", params) as cursor:
+                return await cursor.fetchall()
+    
+    async def add_ai_quota_buckets(self, rows: List[tuple]) -> None:
+        """
+        Add (scope, period, bucket, amount) increments to the stored counters.
+        
+        Increments are added in place, so processes counting the same scope
+        don't overwrite each other.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                """INSERT INTO ai_quota_buckets (scope, period, bucket, amount) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (scope, period, bucket) DO UPDATE SET amount = amount + excluded.amount""",
+                rows
+            )
+            await db.commit()
+    
+    async def delete_expired_ai_quota_buckets(self, oldest: Dict[str, int]) -> None:
+        """Delete quota buckets older than the first one still in use (period -> bucket)."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "DELETE FROM ai_quota_buckets WHERE period = ? AND bucket < ?",
+                list(oldest.items())
+            )
+            await db.commit()
+    
     # Interview questions
     async def add_interview_question(self, category: str, question: str, answer: str, difficulty: str) -> int:
         """Add an interview question."""
@@ -197,6 +942,62 @@ class Database:
                 row = await cursor.fetchone()
                 return dict(row) if row else None
     
+    async def get_interview_question_bank(self) -> List[Tuple[int, str, str, str, str]]:
+        """Get every interview question as (id, category, question, answer, difficulty), by ID."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                """SELECT id, category, question, answer, difficulty
+                   FROM interview_questions ORDER BY id"""
+            ) as cursor:
+                return await cursor.fetchall()
+    
+    # Interview spaced repetition
+    async def get_interview_review(self, user_id: int, question_id: int) -> Optional[Dict[str, Any]]:
+        """Get a user's spaced repetition state for a question."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT * FROM interview_reviews WHERE user_id = ? AND question_id = ?",
+                (user_id, question_id)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+    
+    async def save_interview_review(self, user_id: int, question_id: int, repetitions: int,
+                                    interval_days: int, ease_factor: float, grade: int,
+                                    due_at: str) -> None:
+        """Store a user's spaced repetition state for a question."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                """INSERT INTO interview_reviews
+                   (user_id, question_id, repetitions, interval_days, ease_factor, last_grade, due_at, reviewed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (user_id, question_id) DO UPDATE SET
+                   repetitions = excluded.repetitions,
+                   interval_days = excluded.interval_days,
+                   ease_factor = excluded.ease_factor,
+                   last_grade = excluded.last_grade,
+                   due_at = excluded.due_at,
+                   reviewed_at = excluded.reviewed_at""",
+                (user_id, question_id, repetitions, interval_days, ease_factor, grade, due_at,
+                 datetime.now().isoformat())
+            )
+            await db.commit()
+    
+    async def get_due_interview_questions(self, user_id: int, now: str, limit: int = 1) -> List[int]:
+        """Get IDs of a user's questions due for review by `now`, most overdue first."""
+        async with aiosqlite.connect(self.db_path) as db:
+            # Served by idx_interview_reviews_due: a range scan, no sort
+            async with db.execute(
+                """SELECT question_id FROM interview_reviews
+                   WHERE user_id = ? AND due_at <= ?
+                   ORDER BY due_at
+                   LIMIT ?""",
+                (user_id, now, limit)
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [row[0] for row in rows]
+    
     async def get_interview_categories(self) -> List[str]:
         """Get all interview question categories."""
         async with aiosqlite.connect(self.db_path) as db:
@@ -349,9 +1150,128 @@ class Database:
             await db.execute("DELETE FROM user_achievements WHERE user_id = ?", (user_id,))
             await db.execute("DELETE FROM user_daily_challenges WHERE user_id = ?", (user_id,))
             await db.execute("DELETE FROM banned_users WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM review_jobs WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM user_hints WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM interview_reviews WHERE user_id = ?", (user_id,))
+            await db.execute("DELETE FROM daily_challenge_deliveries WHERE user_id = ?", (user_id,))
+            await db.execute(
+                """DELETE FROM submission_lsh WHERE submission_id IN
+                   (SELECT submission_id FROM submission_signatures WHERE user_id = ?)""",
+                (user_id,)
+            )
+            await db.execute("DELETE FROM submission_signatures WHERE user_id = ?", (user_id,))
             await db.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
             await db.commit()
     
+    # Broadcasts
+    async def create_broadcast(self, admin_id: int, text: str, segment: str, total: int,
+                               progress_chat_id: int, progress_message_id: int,
+                               holder: str, expires_at: float) -> int:
+        """Create a running broadcast held by the calling instance and return its ID."""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """INSERT INTO broadcasts (admin_id, text, segment, total, progress_chat_id, progress_message_id,
+                                           holder, expires_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (admin_id, text, segment, total, progress_chat_id, progress_message_id, holder, expires_at)
+            )
+            await db.commit()
+            return cursor.lastrowid
+    
+    async def get_broadcast(self, broadcast_id: int) -> Optional[Dict[str, Any]]:
+        """Get a broadcast by ID."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+    
+    async def get_running_broadcasts(self) -> List[Dict[str, Any]]:
+        """Get broadcasts that were interrupted before finishing."""
+        async with aiosqlite.connect(self.db_path) as db:
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM broadcasts WHERE status = 'running' ORDER BY id") as cursor:
+                rows = await cursor.fetchall()
+                return [dict(row) for row in rows]
+    
+    async def count_segment_users(self, condition: str, params: List[Any]) -> int:
+        """Count users matching a compiled segment condition."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(f"SELECT COUNT(*) FROM users u WHERE {condition}", params) as cursor:
+                row = await cursor.fetchone()
+                return row[0]
+    
+    async def get_segment_user_ids(self, condition: str, params: List[Any],
+                                   after_user_id: int, limit: int) -> List[int]:
+        """Get the next IDs above `after_user_id` matching a compiled segment condition, in ID order."""
+        async with aiosqlite.connect(self.db_path) as db:
+            # Keyset pagination on the primary key: each batch is an index range scan
+            async with db.execute(
+                f"""SELECT u.user_id FROM users u
+                    WHERE u.user_id > ? AND {condition}
+                    ORDER BY u.user_id
+                    LIMIT ?""",
+                [after_user_id, *params, limit]
+            ) as cursor:
+                rows = await cursor.fetchall()
+                return [row[0] for row in rows]
+    
+    async def claim_broadcast(self, broadcast_id: int, holder: str, now: float, expires_at: float) -> bool:
+        """
+        Take or renew the right to send a running broadcast.
+        
+        Succeeds if the caller already holds it or the holder's lease has
+        expired; a single statement, so two instances can't both succeed.
+        
+        Args:
+            broadcast_id: Broadcast ID
+            holder: ID of the calling instance
+            now: Current Unix time
+            expires_at: Unix time the lease should last until
+        
+        Returns:
+            True if the caller holds the broadcast until expires_at
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """UPDATE broadcasts SET holder = ?, expires_at = ?
+                   WHERE id = ? AND status = 'running'
+                   AND (holder = ? OR expires_at IS NULL OR expires_at < ?)""",
+                (holder, expires_at, broadcast_id, holder, now)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def release_broadcast(self, broadcast_id: int, holder: str) -> None:
+        """Let another instance resume a broadcast right away, if the caller holds it."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "UPDATE broadcasts SET expires_at = 0 WHERE id = ? AND holder = ?",
+                (broadcast_id, holder)
+            )
+            await db.commit()
+    
+    async def checkpoint_broadcast(self, broadcast_id: int, holder: str, last_user_id: int,
+                                   sent: int, failed: int, blocked: int) -> bool:
+        """Record broadcast progress after a batch; False if another instance took the broadcast over."""
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                """UPDATE broadcasts SET last_user_id = ?, sent = ?, failed = ?, blocked = ?
+                   WHERE id = ? AND holder = ?""",
+                (last_user_id, sent, failed, blocked, broadcast_id, holder)
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    
+    async def finish_broadcast(self, broadcast_id: int, holder: str, status: str) -> None:
+        """Mark a broadcast as 'completed' or 'cancelled', unless another instance took it over."""
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "UPDATE broadcasts SET status = ?, finished_at = ? WHERE id = ? AND holder = ?",
+                (status, datetime.now().isoformat(), broadcast_id, holder)
+            )
+            await db.commit()
+    
     # Admin operations - Challenge Management
     async def get_all_challenges(self, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
         """Get all challenges with pagination."""
@@ -386,6 +1306,12 @@ class Database:
         async with aiosqlite.connect(self.db_path) as db:
             await db.execute("DELETE FROM submissions WHERE challenge_id = ?", (challenge_id,))
             await db.execute("DELETE FROM user_daily_challenges WHERE challenge_id = ?", (challenge_id,))
+            await db.execute("DELETE FROM review_cache WHERE challenge_id = ?", (challenge_id,))
+            await db.execute("DELETE FROM review_jobs WHERE challenge_id = ?", (challenge_id,))
+            await db.execute("DELETE FROM challenge_hints WHERE challenge_id = ?", (challenge_id,))
+            await db.execute("DELETE FROM user_hints WHERE challenge_id = ?", (challenge_id,))
+            await db.execute("DELETE FROM submission_signatures WHERE challenge_id = ?", (challenge_id,))
+            await db.execute("DELETE FROM submission_lsh WHERE challenge_id = ?", (challenge_id,))
             await db.execute("DELETE FROM challenges WHERE id = ?", (challenge_id,))
             await db.commit()
     
@@ -426,6 +1352,16 @@ class Database:
                 rows = await cursor.fetchall()
                 return {row[0]: row[1] for row in rows}
     
+    async def get_review_verdict_stats(self) -> Dict[str, Any]:
+        """Get AI verdict counts and the average review score."""
+        async with aiosqlite.connect(self.db_path) as db:
+            async with db.execute(
+                """SELECT SUM(verdict = 'pass'), SUM(verdict = 'fail'), AVG(review_score)
+                   FROM submissions WHERE verdict IS NOT NULL"""
+            ) as cursor:
+                row = await cursor.fetchone()
+                return {'pass': row[0] or 0, 'fail': row[1] or 0, 'avg_score': row[2]}
+    
     async def get_top_users(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get most active users by submission count."""
         async with aiosqlite.connect(self.db_path) as db:
@@ -503,6 +1439,7 @@ class Database:
     async def delete_interview_question(self, question_id: int) -> None:
         """Delete interview question."""
         async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DELETE FROM interview_reviews WHERE question_id = ?", (question_id,))
             await db.execute("DELETE FROM interview_questions WHERE id = ?", (question_id,))
             await db.commit()
     
@@ -13,10 +13,18 @@ CREATE TABLE IF NOT EXISTS users (
     completed_challenges INTEGER DEFAULT 0,
     streak INTEGER DEFAULT 0,
     last_active TEXT,
-    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    timezone TEXT
 )
 """
 
+# Added to existing users tables; NULL means DEFAULT_TIMEZONE
+USER_TIMEZONE_COLUMNS = {"timezone": "TEXT"}
+
+USERS_TIMEZONE_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_users_timezone ON users (timezone, user_id)
+"""
+
 CHALLENGES_TABLE = """
 CREATE TABLE IF NOT EXISTS challenges (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,6 +50,9 @@ CREATE TABLE IF NOT EXISTS submissions (
     feedback TEXT,
     points_earned INTEGER DEFAULT 0,
     submitted_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    verdict TEXT,
+    review_score INTEGER,
+    review_issues TEXT,
     FOREIGN KEY (user_id) REFERENCES users(user_id),
     FOREIGN KEY (challenge_id) REFERENCES challenges(id)
 )
@@ -80,6 +91,22 @@ CREATE TABLE IF NOT EXISTS user_daily_challenges (
 )
 """
 
+USER_DAILY_CHALLENGES_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_user_daily_challenges_user_date ON user_daily_challenges (user_id, assigned_date)
+"""
+
+# Delivery status of each user's daily challenge push ('sent', 'blocked', 'failed')
+DAILY_CHALLENGE_DELIVERIES_TABLE = """
+CREATE TABLE IF NOT EXISTS daily_challenge_deliveries (
+    user_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    challenge_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    delivered_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, day)
+) WITHOUT ROWID
+"""
+
 BANNED_USERS_TABLE = """
 CREATE TABLE IF NOT EXISTS banned_users (
     user_id INTEGER PRIMARY KEY,
@@ -90,6 +117,243 @@ CREATE TABLE IF NOT EXISTS banned_users (
 )
 """
 
+REVIEW_CACHE_TABLE = """
+CREATE TABLE IF NOT EXISTS review_cache (
+    challenge_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    code_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    feedback TEXT NOT NULL,
+    hit_count INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    verdict TEXT,
+    review_score INTEGER,
+    review_issues TEXT,
+    PRIMARY KEY (challenge_id, language, code_hash),
+    FOREIGN KEY (challenge_id) REFERENCES challenges(id)
+)
+"""
+
+REVIEW_JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS review_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    challenge_id INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    language TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    last_error TEXT,
+    status_message_id INTEGER,
+    available_at TEXT NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (challenge_id) REFERENCES challenges(id)
+)
+"""
+
+# Added to review_jobs after it was first released
+REVIEW_JOB_COLUMNS = {
+    "submission_id": "INTEGER",  # Set once the result is recorded; retries don't record it again
+    "heartbeat_at": "TEXT"  # Refreshed while a worker runs the job; stale ones are taken over
+}
+
+REVIEW_JOBS_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_review_jobs_status ON review_jobs (status, available_at, id)
+"""
+
+AI_CALLS_TABLE = """
+CREATE TABLE IF NOT EXISTS ai_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    method TEXT NOT NULL,
+    model TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    queue_wait_ms REAL DEFAULT 0,
+    ttft_ms REAL,
+    total_ms REAL NOT NULL,
+    prompt_tokens INTEGER DEFAULT 0,
+    completion_tokens INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+AI_CALLS_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_ai_calls_created_at ON ai_calls (created_at)
+"""
+
+AI_QUOTA_BUCKETS_TABLE = """
+CREATE TABLE IF NOT EXISTS ai_quota_buckets (
+    scope TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (scope, period, bucket)
+)
+"""
+
+SUBMISSIONS_USER_CHALLENGE_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_submissions_user_challenge ON submissions (user_id, challenge_id, id)
+"""
+
+# Covers the per-user submission checks of broadcast segments
+SUBMISSIONS_USER_ACTIVITY_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_submissions_user_activity ON submissions (user_id, submitted_at, status, language)
+"""
+
+CHALLENGE_HINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS challenge_hints (
+    challenge_id INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    hint TEXT NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (challenge_id, level),
+    FOREIGN KEY (challenge_id) REFERENCES challenges(id)
+)
+"""
+
+USER_HINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_hints (
+    user_id INTEGER NOT NULL,
+    challenge_id INTEGER NOT NULL,
+    hints_received INTEGER DEFAULT 0,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, challenge_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (challenge_id) REFERENCES challenges(id)
+)
+"""
+
+SUBMISSION_SIGNATURES_TABLE = """
+CREATE TABLE IF NOT EXISTS submission_signatures (
+    submission_id INTEGER PRIMARY KEY,
+    challenge_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    signature BLOB NOT NULL,
+    best_match_id INTEGER,
+    best_match_score REAL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (submission_id) REFERENCES submissions(id)
+)
+"""
+
+SUBMISSION_LSH_TABLE = """
+CREATE TABLE IF NOT EXISTS submission_lsh (
+    challenge_id INTEGER NOT NULL,
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    submission_id INTEGER NOT NULL,
+    PRIMARY KEY (challenge_id, band, bucket, submission_id)
+) WITHOUT ROWID
+"""
+
+# SM-2 spaced repetition state per user and interview question
+INTERVIEW_REVIEWS_TABLE = """
+CREATE TABLE IF NOT EXISTS interview_reviews (
+    user_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    interval_days INTEGER NOT NULL DEFAULT 0,
+    ease_factor REAL NOT NULL DEFAULT 2.5,
+    last_grade INTEGER,
+    due_at TEXT NOT NULL,
+    reviewed_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, question_id)
+) WITHOUT ROWID
+"""
+
+INTERVIEW_REVIEWS_DUE_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_interview_reviews_due ON interview_reviews (user_id, due_at)
+"""
+
+# Broadcasts with a checkpoint: recipients are sent in user_id order, so
+# everyone above last_user_id is still pending after a restart
+BROADCASTS_TABLE = """
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    admin_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    segment TEXT,
+    status TEXT NOT NULL DEFAULT 'running',
+    total INTEGER DEFAULT 0,
+    last_user_id INTEGER DEFAULT 0,
+    sent INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    blocked INTEGER DEFAULT 0,
+    progress_chat_id INTEGER,
+    progress_message_id INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    finished_at TEXT
+)
+"""
+
+# Added to broadcasts after it was first released
+BROADCAST_COLUMNS = {
+    "holder": "TEXT",  # Instance sending it
+    "expires_at": "REAL"  # Unix time; renewed while it sends, another instance resumes it once past
+}
+
+# APScheduler jobs (pickled state), see bot/utils/job_store.py
+SCHEDULER_JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS apscheduler_jobs (
+    id TEXT PRIMARY KEY,
+    next_run_time REAL,
+    job_state BLOB NOT NULL
+)
+"""
+
+SCHEDULER_JOBS_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_apscheduler_jobs_next_run_time ON apscheduler_jobs (next_run_time)
+"""
+
+# Idempotency ledger: one row per bulk job and day ('running', 'done', 'failed')
+SCHEDULER_RUNS_TABLE = """
+CREATE TABLE IF NOT EXISTS scheduler_runs (
+    job TEXT NOT NULL,
+    run_date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    finished_at TEXT,
+    PRIMARY KEY (job, run_date)
+) WITHOUT ROWID
+"""
+
+# Added to scheduler_runs after it was first released
+SCHEDULER_RUN_COLUMNS = {
+    "holder": "TEXT",  # Instance running it
+    "expires_at": "REAL"  # Unix time; renewed while it runs, a new leader retries it once past
+}
+
+# Leases for leader election: one row per role, held by one instance at a time
+LEADER_LEASES_TABLE = """
+CREATE TABLE IF NOT EXISTS leader_leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+# Conversation (FSM) states, keyed by "bot:chat:user:thread:business_connection:destiny"
+FSM_STATES_TABLE = """
+CREATE TABLE IF NOT EXISTS fsm_states (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+FSM_STATES_UPDATED_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)
+"""
+
+# Structured AI review verdict, added to existing submissions and review_cache tables
+REVIEW_VERDICT_COLUMNS = {
+    "verdict": "TEXT",  # "pass" or "fail"
+    "review_score": "INTEGER",  # 0-10
+    "review_issues": "TEXT"  # JSON list of short issue descriptions
+}
+
 # Achievement definitions
 ACHIEVEMENTS = {
     "first_challenge": {
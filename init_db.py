@@ -2,6 +2,9 @@
 import asyncio
 import json
 from database.db import Database
+from bot.ai.hints import hint_generator
+from bot.ai.mistral_client import ai_client
+from bot.config import MISTRAL_API_KEY, HINT_PREGENERATION_ENABLED
 
 
 async def load_challenges():
@@ -12,8 +15,9 @@ async def load_challenges():
     with open('data/challenges.json', 'r', encoding='utf-8') as f:
         challenges = json.load(f)
     
+    challenge_ids = []
     for challenge in challenges:
-        await db.add_challenge(
+        challenge_id = await db.add_challenge(
             title=challenge['title'],
             description=challenge['description'],
             difficulty=challenge['difficulty'],
@@ -22,8 +26,25 @@ async def load_challenges():
             solution=challenge['solution'],
             points=challenge['points']
         )
+        challenge_ids.append(challenge_id)
     
     print(f"✅ Loaded {len(challenges)} challenges")
+    return challenge_ids
+
+
+async def generate_hints(challenge_ids):
+    """Pre-generate tiered hints for the loaded challenges."""
+    if not MISTRAL_API_KEY or not HINT_PREGENERATION_ENABLED:
+        print("⚠️ Skipping hint generation (the bot will generate them on startup)")
+        return
+    
+    try:
+        results = await asyncio.gather(*(hint_generator.generate(cid) for cid in challenge_ids))
+    finally:
+        await ai_client.close()
+    
+    complete = sum(1 for count in results if count == hint_generator.levels)
+    print(f"✅ Generated hints for {complete}/{len(challenge_ids)} challenges")
 
 
 async def load_interview_questions():
@@ -48,8 +69,9 @@ async def main():
     """Main initialization function."""
     print("🚀 Initializing database with sample data...")
     
-    await load_challenges()
+    challenge_ids = await load_challenges()
     await load_interview_questions()
+    await generate_hints(challenge_ids)
     
     print("✅ Database initialization complete!")
 
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from bot.ai.answer_scoring import AnswerScorer, answer_terms, evaluation_score, format_precheck
+
+QUESTIONS = [
+    {"id": 1, "answer": "A hash table maps keys to buckets with a hash function; collisions use chaining."},
+    {"id": 2, "answer": "A queue is first in, first out: elements are added at the back and removed from the front."},
+    {"id": 3, "answer": "An index speeds up lookups in a database table at the cost of slower writes."},
+]
+
+
+class Store:
+    """Question store over a fixed list."""
+    
+    def __init__(self, questions):
+        self.questions = questions
+        self.version = 1
+    
+    async def load(self):
+        pass
+    
+    def answers(self):
+        return [question["answer"] for question in self.questions]
+
+
+@pytest.fixture
+def scorer():
+    scorer = AnswerScorer(Store(QUESTIONS), cache_size=2)
+    asyncio.run(scorer.load())
+    return scorer
+
+
+def test_answers_are_split_into_terms():
+    assert answer_terms("The Queues and a queue, in C++!") == ["queue", "queue", "c++"]
+    assert answer_terms("class process") == ["class", "process"]
+    assert answer_terms(None) == []
+
+
+def test_better_answers_score_higher(scorer):
+    question = QUESTIONS[0]
+    good = scorer.score(question, "It hashes each key to a bucket and handles collisions by chaining entries")
+    vague = scorer.score(question, "It is a kind of table that stores data somewhere")
+    assert good["score"] > vague["score"]
+    assert good["coverage"] > vague["coverage"]
+    assert good["trivial"] is None and vague["trivial"] is None
+    assert "collision" in vague["missing"]
+
+
+def test_trivial_answers_are_flagged(scorer):
+    question = QUESTIONS[1]
+    assert scorer.score(question, "")["trivial"] == "empty"
+    assert scorer.score(question, "the and of")["trivial"] == "empty"
+    assert scorer.score(question, "FIFO order")["trivial"] == "too_short"
+    copied = scorer.score(question, question["answer"])
+    assert copied["trivial"] == "copied" and copied["similarity"] == pytest.approx(1.0)
+
+
+def test_reference_cache_is_bounded(scorer):
+    for question in QUESTIONS:
+        scorer.score(question, "some answer about things")
+    assert list(scorer._references) == [2, 3]
+
+
+def test_evaluation_scores_are_read_and_clamped():
+    assert evaluation_score("Overall: 7/10, good") == 7
+    assert evaluation_score("I'd give it 8.6 out of 10") == 9
+    assert evaluation_score("Score: 12/10") == 10
+    assert evaluation_score("No score here") is None
+    assert "not mentioned: chaining" in format_precheck(
+        {"score": 5, "similarity": 0.5, "coverage": 0.5, "missing": ["chaining"]}
+    )
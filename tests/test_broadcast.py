@@ -0,0 +1,87 @@
+import asyncio
+import aiosqlite
+import pytest
+from database.db import Database
+from bot.utils.broadcast import BroadcastEngine
+from bot.utils.segments import Segment
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    
+    async def setup():
+        await db.init_db()
+        for user_id in range(1, 4):
+            await db.create_user(user_id, f"user{user_id}")
+    
+    asyncio.run(setup())
+    return db
+
+
+def engine(db, sent, gate):
+    engine = BroadcastEngine(db)
+    
+    async def send(bot, broadcast_id, user_id, text):
+        await gate.wait()
+        sent.append((engine.holder, user_id))
+        return 'sent'
+    
+    engine._send = send
+    return engine
+
+
+async def wait_for(condition):
+    for _ in range(100):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    pytest.fail("Timed out")
+
+
+def test_live_instance_keeps_its_broadcast(db):
+    async def run():
+        sent, gate = [], asyncio.Event()
+        first, second = engine(db, sent, gate), engine(db, sent, gate)
+        await first.start(None)
+        broadcast_id = await first.create(None, 1, "Hello", Segment(), 1, None)
+        
+        # A second instance (e.g. the new one of a deploy) leaves it alone
+        await second.start(None)
+        resumed_while_held = broadcast_id in second._tasks
+        
+        # Once the first one stops, the second resumes it right away
+        await first.stop()
+        await second._resume()
+        gate.set()
+        await wait_for(lambda: not second._tasks)
+        await second.stop()
+        return resumed_while_held, sent, await db.get_broadcast(broadcast_id)
+    
+    resumed_while_held, sent, broadcast = asyncio.run(run())
+    assert not resumed_while_held
+    assert len({holder for holder, _ in sent}) == 1
+    assert sorted(user_id for _, user_id in sent) == [1, 2, 3]
+    assert broadcast['status'] == 'completed' and broadcast['sent'] == 3
+
+
+def test_sender_that_lost_its_lease_stops(db):
+    async def run():
+        sent, gate = [], asyncio.Event()
+        first, second = engine(db, sent, gate), engine(db, sent, gate)
+        broadcast_id = await first.create(None, 1, "Hello", Segment(), 1, None)
+        
+        # The first instance stalled past its lease
+        async with aiosqlite.connect(db.db_path) as conn:
+            await conn.execute("UPDATE broadcasts SET expires_at = 0")
+            await conn.commit()
+        await second.start(None)
+        gate.set()
+        await wait_for(lambda: not first._tasks and not second._tasks)
+        await second.stop()
+        return sent, await db.get_broadcast(broadcast_id), first.holder
+    
+    sent, broadcast, first_holder = asyncio.run(run())
+    assert broadcast['status'] == 'completed' and broadcast['holder'] != first_holder
+    # The batch both were sending is sent twice at most; the stale sender records nothing
+    assert broadcast['sent'] == 3
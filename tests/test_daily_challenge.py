@@ -0,0 +1,67 @@
+import asyncio
+from datetime import date
+import pytest
+from database.db import Database
+from bot.utils.daily_challenge import DailyChallengeSelector, difficulty_for_level
+
+DAY = date(2024, 5, 1)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    
+    async def setup():
+        await db.init_db()
+        for number in range(5):
+            await db.add_challenge(f"Easy {number}", "...", "easy", "python", "[]", None, 10)
+        await db.add_challenge("Medium", "...", "Medium", "python", "[]", None, 20)
+        await db.create_user(1, "alice")
+    
+    asyncio.run(setup())
+    return db
+
+
+@pytest.fixture
+def selector(db):
+    selector = DailyChallengeSelector(db)
+    asyncio.run(selector.load())
+    return selector
+
+
+def test_levels_map_to_difficulties():
+    assert [difficulty_for_level(level) for level in (1, 3, 4, 7, 8)] == [
+        "easy", "easy", "medium", "medium", "hard"
+    ]
+
+
+def test_pick_is_stable_per_user_and_day(selector):
+    pick = selector.select(1, 1, DAY)
+    assert pick == selector.select(1, 1, DAY)
+    assert pick in range(1, 6)
+    # Varies across users and days
+    assert len({selector.select(user_id, 1, DAY) for user_id in range(50)}) > 1
+    # Difficulties are matched case-insensitively; none stored for "hard"
+    assert selector.select(1, 5, DAY) == 6
+    assert selector.select(1, 9, DAY) is None
+
+
+def test_solved_challenges_are_skipped_until_all_are_solved(selector):
+    pick = selector.select(1, 1, DAY)
+    assert selector.select(1, 1, DAY, {pick}) not in (pick, None)
+    assert selector.select(1, 1, DAY, {1, 2, 3, 4, 5}) == pick
+
+
+def test_opened_challenge_stays_for_the_day(db, selector):
+    async def run():
+        user = await db.get_user(1)
+        peek = await selector.today(user, DAY, persist=False)
+        opened = await selector.today(user, DAY)
+        # Solving it doesn't move today's challenge to another one
+        await db.add_submission(1, opened['id'], "print(1)", "python", "completed", "", 10)
+        again = await selector.today(user, DAY)
+        batch = await selector.pick_batch([user], DAY)
+        return peek, opened, again, batch
+    
+    peek, opened, again, batch = asyncio.run(run())
+    assert peek['id'] == opened['id'] == again['id'] == batch[1]['id']
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from database.db import Database
+from bot.utils.fsm_storage import SQLiteStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=3)
+OTHER_KEY = StorageKey(bot_id=1, chat_id=4, user_id=4)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    return db
+
+
+def test_state_survives_a_restart(db):
+    async def run():
+        storage = SQLiteStorage(db)
+        await storage.set_state(KEY, "Interview:answering")
+        await storage.set_data(KEY, {"question_id": 7})
+        await storage.set_state(OTHER_KEY, "Submit:code")
+        await storage.set_state(OTHER_KEY, None)
+        await storage.close()
+        
+        restarted = SQLiteStorage(db)
+        return (await restarted.get_state(KEY), await restarted.get_data(KEY),
+                await restarted.get_state(OTHER_KEY))
+    
+    state, data, other_state = asyncio.run(run())
+    assert (state, data, other_state) == ("Interview:answering", {"question_id": 7}, None)
+
+
+def test_unserializable_data_keeps_the_batch_pending(db):
+    async def run():
+        storage = SQLiteStorage(db)
+        await storage.set_state(KEY, "Interview:answering")
+        await storage.set_data(OTHER_KEY, {"bad": object()})
+        with pytest.raises(TypeError):
+            await storage.flush()
+        stored = await db.get_fsm_record("1:2:3:0::default")
+        
+        # Once the data is fixed, the whole batch is written
+        await storage.set_data(OTHER_KEY, {"fixed": True})
+        await storage.flush()
+        return stored, await SQLiteStorage(db).get_state(KEY), await SQLiteStorage(db).get_data(OTHER_KEY)
+    
+    stored, state, data = asyncio.run(run())
+    assert stored is None
+    assert state == "Interview:answering"
+    assert data == {"fixed": True}
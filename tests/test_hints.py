@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from database.db import Database
+from bot.ai import hints as hints_module
+from bot.ai.hints import HintGenerator
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    asyncio.run(db.add_challenge("Add", "Add two numbers", "easy", "python", "[]", None, 10))
+    return db
+
+
+@pytest.fixture
+def ai_calls(monkeypatch):
+    calls = []
+    
+    async def generate_hint(description, language, level, previous_hints, user_id=None):
+        calls.append((level, list(previous_hints)))
+        return f"hint {level}"
+    
+    monkeypatch.setattr(hints_module.ai_client, "generate_hint", generate_hint)
+    return calls
+
+
+def generate_level(db, level):
+    async def run():
+        generator = HintGenerator(db)
+        challenge = await db.get_challenge(1)
+        return await generator.generate_level(challenge, level, user_id=1)
+    return asyncio.run(run())
+
+
+def test_missing_lower_levels_are_generated_in_order_and_stored(db, ai_calls):
+    assert generate_level(db, 3) == "hint 3"
+    assert ai_calls == [(1, []), (2, ["hint 1"]), (3, ["hint 1", "hint 2"])]
+    assert asyncio.run(db.get_challenge_hints(1)) == ["hint 1", "hint 2", "hint 3"]
+    
+    # Stored now: asking again doesn't call the AI
+    assert generate_level(db, 3) == "hint 3"
+    assert len(ai_calls) == 3
+
+
+def test_failed_generation_keeps_the_levels_before_it(db, ai_calls, monkeypatch):
+    async def generate_hint(description, language, level, previous_hints, user_id=None):
+        ai_calls.append((level, list(previous_hints)))
+        return "hint 1" if level == 1 else "❌ AI unavailable"
+    
+    monkeypatch.setattr(hints_module.ai_client, "generate_hint", generate_hint)
+    assert generate_level(db, 2) == "❌ AI unavailable"
+    assert asyncio.run(db.get_challenge_hints(1)) == ["hint 1"]
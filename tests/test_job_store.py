@@ -0,0 +1,87 @@
+import asyncio
+import time
+import aiosqlite
+import pytest
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from database.db import Database
+from bot.utils.job_store import SQLiteJobStore
+
+
+def tick():
+    pass
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    return db
+
+
+def start_scheduler(db):
+    store = SQLiteJobStore(db.db_path)
+    scheduler = AsyncIOScheduler(jobstores={'default': store})
+    scheduler.start(paused=True)
+    return scheduler, store
+
+
+async def stop_scheduler(scheduler, store):
+    scheduler.shutdown()
+    await asyncio.to_thread(store.wait_closed)
+
+
+async def count_stored_jobs(db):
+    async with aiosqlite.connect(db.db_path) as conn:
+        async with conn.execute("SELECT COUNT(*) FROM apscheduler_jobs") as cursor:
+            return (await cursor.fetchone())[0]
+
+
+def test_jobs_survive_restart(db):
+    async def first():
+        scheduler, store = start_scheduler(db)
+        scheduler.add_job(f"{__name__}:tick", CronTrigger(hour=3), id="tick")
+        await stop_scheduler(scheduler, store)
+    
+    async def second():
+        scheduler, store = start_scheduler(db)
+        job = scheduler.get_job("tick")
+        await stop_scheduler(scheduler, store)
+        return job
+    
+    asyncio.run(first())
+    job = asyncio.run(second())
+    assert job is not None
+    assert str(job.trigger) == str(CronTrigger(hour=3))
+
+
+def test_add_job_does_not_wait_for_a_write_lock_of_this_process(db):
+    async def run():
+        scheduler, store = start_scheduler(db)
+        async with aiosqlite.connect(db.db_path) as conn:
+            # A write transaction that can only finish once the event loop runs again
+            await conn.execute("BEGIN IMMEDIATE")
+            started = time.monotonic()
+            scheduler.add_job(f"{__name__}:tick", CronTrigger(hour=3), id="tick")
+            elapsed = time.monotonic() - started
+            await conn.rollback()
+        await stop_scheduler(scheduler, store)
+        return elapsed
+    
+    assert asyncio.run(run()) < 1.0
+    assert asyncio.run(count_stored_jobs(db)) == 1
+
+
+def test_reload_picks_up_jobs_stored_by_another_instance(db):
+    async def run():
+        scheduler, store = start_scheduler(db)
+        other, other_store = start_scheduler(db)
+        other.add_job(f"{__name__}:tick", CronTrigger(hour=3), id="tick")
+        await stop_scheduler(other, other_store)
+        assert scheduler.get_job("tick") is None
+        store.reload()
+        job = scheduler.get_job("tick")
+        await stop_scheduler(scheduler, store)
+        return job
+    
+    assert asyncio.run(run()) is not None
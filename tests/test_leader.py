@@ -0,0 +1,89 @@
+import asyncio
+import time
+import pytest
+from database.db import Database
+from bot.utils.leader import LeaderElection
+from bot.utils.scheduler import BotScheduler
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    return db
+
+
+def test_one_instance_holds_the_lease_until_it_expires(db):
+    async def run():
+        now = time.time()
+        taken = await db.acquire_lease("scheduler", "a", now, now + 30)
+        refused = await db.acquire_lease("scheduler", "b", now + 1, now + 31)
+        renewed = await db.acquire_lease("scheduler", "a", now + 10, now + 40)
+        expired = await db.acquire_lease("scheduler", "b", now + 41, now + 71)
+        lost = await db.acquire_lease("scheduler", "a", now + 42, now + 72)
+        return taken, refused, renewed, expired, lost
+    
+    assert asyncio.run(run()) == (True, False, True, True, False)
+
+
+def test_stopping_hands_the_lease_over(db):
+    async def run():
+        first, second = LeaderElection("scheduler", db), LeaderElection("scheduler", db)
+        elected = []
+        
+        async def on_first_elected():
+            elected.append("first")
+        
+        async def on_second_elected():
+            elected.append("second")
+        
+        await first.start(on_first_elected)
+        await asyncio.sleep(0.1)
+        await second.start(on_second_elected)
+        await asyncio.sleep(0.1)
+        leaders = (first.is_leader, second.is_leader)
+        await first.stop()
+        await second._set_leader(await second._try_acquire())
+        await second.stop()
+        return leaders, elected
+    
+    assert asyncio.run(run()) == ((True, False), ["first", "second"])
+
+
+def test_new_leader_retries_only_runs_of_instances_that_are_gone(db):
+    async def run():
+        now = time.time()
+        # A slow leader still renewing its run, and one that died mid-run
+        await db.claim_scheduler_run("check_streaks", "2024-01-01", "slow", now + 30)
+        await db.claim_scheduler_run("check_streaks", "2024-01-02", "dead", now - 1)
+        interrupted = await db.fail_expired_scheduler_runs(now)
+        # The new leader runs the dead one's again; the slow one's stays with it
+        slow = await db.claim_scheduler_run("check_streaks", "2024-01-01", "new", now + 30)
+        retried = await db.claim_scheduler_run("check_streaks", "2024-01-02", "new", now + 30)
+        # The dead one's late report doesn't overwrite the retry
+        await db.finish_scheduler_run("check_streaks", "2024-01-02", "dead", "done")
+        renewed = await db.renew_scheduler_run("check_streaks", "2024-01-02", "dead", now + 60)
+        rerun = await db.claim_scheduler_run("check_streaks", "2024-01-02", "other", now + 30)
+        return interrupted, slow, retried, renewed, rerun
+    
+    assert asyncio.run(run()) == (1, False, True, False, False)
+
+
+def test_runs_are_renewed_while_they_run(db):
+    scheduler = BotScheduler(db)
+    scheduler.leader.lease_seconds = 0.2
+    scheduler.leader.renew_seconds = 0.05
+    calls = []
+    
+    async def job():
+        await asyncio.sleep(0.5)
+        # Well past the first claim's expiry, yet not taken over
+        calls.append(await db.fail_expired_scheduler_runs(time.time()))
+    
+    async def run():
+        done = await scheduler.run_once("check_streaks", "2024-01-01", job)
+        again = await scheduler.run_once("check_streaks", "2024-01-01", job)
+        return done, again
+    
+    assert asyncio.run(run()) == (True, False)
+    assert calls == [0]
@@ -0,0 +1,67 @@
+import asyncio
+import time
+import pytest
+from database.db import Database
+from bot.ai import quota as quota_module
+from bot.ai.quota import AIQuota, bucket_of, oldest_bucket
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    return db
+
+
+def test_buckets_cover_the_window():
+    assert bucket_of("requests_hour", 3600) == 12
+    assert oldest_bucket("requests_hour", 3600) == 1
+    assert bucket_of("tokens_day", 86400 * 2) == 48
+    assert oldest_bucket("tokens_day", 86400 * 2) == 25
+
+
+def test_limits_are_shared_between_processes(db, monkeypatch):
+    monkeypatch.setattr(quota_module, "AI_GLOBAL_REQUESTS_PER_HOUR", 4)
+    monkeypatch.setattr(quota_module, "AI_USER_REQUESTS_PER_HOUR", 2)
+    
+    async def run():
+        # Two worker processes, each reviewing jobs of the same user
+        first, second = AIQuota(db), AIQuota(db)
+        await first.add_request(1)
+        allowed = await second.check(1)
+        await second.add_request(1)
+        await first.add_tokens(1, 100)
+        user_limited = await first.check(1), await second.check(1), await second.check(2)
+        await first.add_request(2)
+        await second.add_request(None)
+        global_limited = await first.check(3)
+        return allowed, user_limited, global_limited, await second.usage(1), await first.usage()
+    
+    allowed, user_limited, global_limited, user, total = asyncio.run(run())
+    assert allowed is None
+    assert "this hour" in user_limited[0] and "this hour" in user_limited[1] and user_limited[2] is None
+    assert "busy" in global_limited
+    assert user == {"requests_hour": 2, "requests_day": 2, "tokens_hour": 100, "tokens_day": 100}
+    assert total["requests_hour"] == 4 and total["tokens_day"] == 100
+
+
+def test_old_usage_leaves_the_window(db, monkeypatch):
+    quota = AIQuota(db)
+    
+    async def run():
+        await quota.add_request(1)
+        await quota.add_tokens(1, 50)
+        await quota.add_request(2)
+        await quota.add_tokens(2, 500)
+        later = time.time() + 2 * 3600
+        monkeypatch.setattr(quota_module.time, "time", lambda: later)
+        usage = await quota.usage(1)
+        top = await quota.top_users()
+        await quota.delete_expired()
+        hour_rows = await db.get_ai_quota_totals({"requests_hour": 0})
+        return usage, top, hour_rows
+    
+    usage, top, hour_rows = asyncio.run(run())
+    assert usage["requests_hour"] == 0 and usage["requests_day"] == 1
+    assert [user_id for user_id, _ in top] == [2, 1]
+    assert hour_rows == []
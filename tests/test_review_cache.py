@@ -0,0 +1,74 @@
+import asyncio
+import time
+import aiosqlite
+import pytest
+from database.db import Database
+from bot.ai.review_cache import ReviewCache, code_hash, normalize_code
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    return db
+
+
+@pytest.fixture
+def far_east_timezone(monkeypatch):
+    # Local time 14 hours ahead of UTC, where a local-time cutoff would be off
+    monkeypatch.setenv("TZ", "Etc/GMT-14")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_python_formatting_comments_and_docstrings_are_ignored():
+    a = 'def f(x):\n    """Add one."""\n    return x + 1  # increment\n'
+    b = "def f(x):\n\n    return (x + 1)\n"
+    assert normalize_code(a, "python") == normalize_code(b, "python")
+    assert code_hash(a, "python") == code_hash(b, "python")
+    assert code_hash(a, "python") != code_hash("def f(x):\n    return x + 2\n", "python")
+
+
+def test_unparsable_python_and_javascript_fall_back_to_text_cleanup():
+    assert normalize_code("def f(:\n    pass  # x\n", "python") == normalize_code("def f(:\n    pass\n", "python")
+    a = "function f(x) {\n  // add one\n  return x + 1;\n}"
+    b = "function f(x) { return x + 1; }"
+    assert normalize_code(a, "javascript") == normalize_code(b, "javascript")
+
+
+async def store_review(db, created_hours_ago):
+    await db.save_cached_review(1, "python", "h", "completed", "ok")
+    async with aiosqlite.connect(db.db_path) as conn:
+        await conn.execute(
+            "UPDATE review_cache SET created_at = datetime('now', ?)", (f"-{created_hours_ago} hours",)
+        )
+        await conn.commit()
+
+
+def test_max_age_is_measured_in_utc(db, far_east_timezone):
+    asyncio.run(store_review(db, 30 * 24 - 2))
+    assert asyncio.run(db.get_cached_review(1, "python", "h", 30)) is not None
+    
+    asyncio.run(store_review(db, 30 * 24 + 2))
+    assert asyncio.run(db.get_cached_review(1, "python", "h", 30)) is None
+
+
+def test_probes_are_not_counted(db):
+    cache = ReviewCache(db)
+    code = "print(1)\n"
+    
+    async def run():
+        await cache.put(1, "python", code, "completed", "ok")
+        assert await cache.get(1, "python", code, count=False) is not None
+        assert await cache.get(1, "python", "print(2)\n", count=False) is None
+        assert (cache.hits, cache.misses) == (0, 0)
+        assert (await db.get_review_cache_stats())['hits'] == 0
+        
+        assert await cache.get(1, "python", code) is not None
+        assert await cache.get(1, "python", "print(2)\n") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert (await db.get_review_cache_stats())['hits'] == 1
+    
+    asyncio.run(run())
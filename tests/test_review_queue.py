@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta
+import aiosqlite
+import pytest
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import SendMessage
+from database.db import Database
+from bot.ai.review_cache import ReviewCache
+from bot.handlers import submissions
+from bot.utils.review_queue import ReviewQueue, UnknownUserError
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    asyncio.run(db.create_user(1, "alice"))
+    asyncio.run(db.add_challenge("Add", "Add two numbers", "easy", "python", "[]", None, 10))
+    return db
+
+
+@pytest.fixture
+def handler_deps(db, monkeypatch):
+    async def grade(code, language, challenge):
+        return {"verdict": "skipped", "passed": 0, "total": 0, "message": "", "elapsed_ms": 0}
+    
+    async def review_code(code, language, description, **kwargs):
+        return {"feedback": "Looks fine. " * 1000, "verdict": {"verdict": "pass", "score": 9, "issues": []}}
+    
+    monkeypatch.setattr(submissions, "db", db)
+    monkeypatch.setattr(submissions, "review_cache", ReviewCache(db))
+    monkeypatch.setattr(submissions.ai_quota, "db", db)
+    monkeypatch.setattr(submissions.sandbox, "grade", grade)
+    monkeypatch.setattr(submissions.ai_client, "review_code", review_code)
+    monkeypatch.setattr(submissions, "INCREMENTAL_REVIEW_ENABLED", False)
+
+
+class FailingBot:
+    """Bot whose messages never get through."""
+    
+    def __init__(self):
+        self.sent = []
+    
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+        raise TelegramNetworkError(SendMessage(chat_id=chat_id, text=text), "timed out")
+
+
+async def count_submissions(db):
+    async with aiosqlite.connect(db.db_path) as conn:
+        async with conn.execute("SELECT COUNT(*) FROM submissions") as cursor:
+            return (await cursor.fetchone())[0]
+
+
+def test_unknown_users_are_rejected_at_enqueue(db):
+    queue = ReviewQueue(db)
+    with pytest.raises(UnknownUserError):
+        asyncio.run(queue.enqueue(2, 2, 1, "print(1)", "python"))
+
+
+def test_only_running_jobs_without_a_heartbeat_are_taken_over(db):
+    async def run():
+        queue = ReviewQueue(db)
+        await queue.enqueue(1, 1, 1, "a = 1", "python")
+        await queue.enqueue(1, 1, 1, "a = 2", "python")
+        first = await db.claim_review_job(datetime.now() - timedelta(minutes=2))
+        second = await db.claim_review_job(datetime.now() - timedelta(minutes=2))
+        # Both are running with fresh heartbeats: nothing to take
+        assert await db.claim_review_job(datetime.now() - timedelta(minutes=2)) is None
+        # The first one's worker went away two minutes ago
+        async with aiosqlite.connect(db.db_path) as conn:
+            await conn.execute(
+                "UPDATE review_jobs SET heartbeat_at = ? WHERE id = ?",
+                ((datetime.now() - timedelta(minutes=3)).isoformat(), first['id'])
+            )
+            await conn.commit()
+        taken = await db.claim_review_job(datetime.now() - timedelta(minutes=2))
+        assert taken['id'] == first['id'] and taken['attempts'] == 2
+        assert await db.claim_review_job(datetime.now() - timedelta(minutes=2)) is None
+        return second
+    
+    assert asyncio.run(run())['status'] == 'pending'
+
+
+def test_failed_send_does_not_record_the_submission_twice(db, handler_deps):
+    bot = FailingBot()
+    
+    async def run():
+        queue = ReviewQueue(db)
+        await queue.enqueue(1, 1, 1, "def add(a, b):\n    return a + b", "python")
+        job = await db.claim_review_job(datetime.now())
+        await queue._process(bot, submissions.process_review_job, job)
+        
+        # Even if the job ran again (e.g. taken over from a stuck worker)
+        async with aiosqlite.connect(db.db_path) as conn:
+            await conn.execute("UPDATE review_jobs SET status = 'pending'")
+            await conn.commit()
+        job = await db.claim_review_job(datetime.now())
+        if job:
+            await submissions.process_review_job(bot, job)
+        return await count_submissions(db), await db.get_user(1)
+    
+    submissions_count, user = asyncio.run(run())
+    assert submissions_count == 1
+    assert user['completed_challenges'] == 1
+    assert len(bot.sent) == 1
+    assert len(bot.sent[0]) <= submissions.MAX_MESSAGE_LENGTH
+
+
+def test_stats_are_recorded_with_the_submission(db):
+    async def run():
+        with pytest.raises(aiosqlite.OperationalError):
+            await db.add_submission(1, 1, "a = 1", "python", "completed", "", 10,
+                                    user_stats={"no_such_column": 1})
+        await db.add_submission(1, 1, "a = 2", "python", "completed", "", 10,
+                                user_stats={"rating": 10, "completed_challenges": 1, "streak": 1})
+        return await count_submissions(db), await db.get_user(1)
+    
+    submissions_count, user = asyncio.run(run())
+    assert submissions_count == 1
+    assert (user['rating'], user['completed_challenges'], user['streak']) == (10, 1, 1)
+
+
+def test_failing_achievements_do_not_lose_the_result(db, handler_deps, monkeypatch):
+    bot = FailingBot()
+    
+    async def broken(*args):
+        raise aiosqlite.OperationalError("database is locked")
+    
+    monkeypatch.setattr(submissions, "check_and_award_achievements", broken)
+    
+    async def run():
+        queue = ReviewQueue(db)
+        await queue.enqueue(1, 1, 1, "def add(a, b):\n    return a + b", "python")
+        job = await db.claim_review_job(datetime.now())
+        await queue._process(bot, submissions.process_review_job, job)
+        # Finished: removed from the queue rather than scheduled for a retry
+        async with aiosqlite.connect(db.db_path) as conn:
+            async with conn.execute("SELECT COUNT(*) FROM review_jobs") as cursor:
+                jobs = (await cursor.fetchone())[0]
+        return jobs, await db.get_user(1)
+    
+    jobs, user = asyncio.run(run())
+    assert jobs == 0
+    assert user['completed_challenges'] == 1 and user['total_challenges'] == 1
+    assert len(bot.sent) == 1
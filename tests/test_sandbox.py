@@ -0,0 +1,171 @@
+import asyncio
+import json
+import shutil
+import subprocess
+import sys
+import time
+import pytest
+import bot.sandbox.pool as pool_module
+from bot.sandbox.pool import SandboxPool, clean_message
+from bot.sandbox.test_cases import parse_test_cases, values_match
+
+CHALLENGE = {
+    "test_cases": "Input: 1, 2\nExpected: 3\nInput: 2, 2\nExpected: 4",
+    "solution": "def add(a, b):\n    return a + b"
+}
+
+
+def grade(code, language="python", challenge=CHALLENGE):
+    async def run():
+        pool = SandboxPool(size=1)
+        await pool.start()
+        try:
+            if pool.unavailable:
+                pytest.skip(f"Sandbox unavailable here: {pool.unavailable}")
+            return await pool.grade(code, language, challenge)
+        finally:
+            await pool.close()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def secret_file(tmp_path):
+    path = tmp_path / ".env"
+    path.write_text("TELEGRAM_BOT_TOKEN=123456:do-not-leak\n")
+    return path
+
+
+@pytest.fixture
+def short_timeout(monkeypatch):
+    monkeypatch.setattr(pool_module, "SANDBOX_TIMEOUT_SECONDS", 1)
+
+
+def test_text_and_json_test_cases_are_parsed():
+    assert parse_test_cases(CHALLENGE["test_cases"]) == [([1, 2], 3), ([2, 2], 4)]
+    assert parse_test_cases("Input: nums = [1, 2], k = true\nExpected: null") == [([[1, 2], True], None)]
+    assert parse_test_cases('[{"input": [[1, 2]], "expected": 2}, {"input": "3", "expected": 1}]') == [
+        ([[1, 2]], 2), ([3], 1)
+    ]
+    assert parse_test_cases("Input: (\nExpected: 1") == []
+    assert parse_test_cases(None) == []
+
+
+def test_values_match_treats_tuples_as_lists_and_floats_loosely():
+    assert values_match((1, 2), [1, 2])
+    assert values_match(0.1 + 0.2, 0.3)
+    assert not values_match("1", 1)
+    assert not values_match([1, 2], [1, 2, 3])
+
+
+def test_clean_message_is_one_bounded_line():
+    assert clean_message("a\nb\x1b[31m") == "a b [31m"
+    message = clean_message("x" * 1000, limit=50)
+    assert len(message) == 50 and message.endswith("…")
+
+
+def test_correct_solution_passes():
+    assert grade(CHALLENGE["solution"])["verdict"] == "passed"
+
+
+def test_secrets_outside_the_jail_are_unreadable(secret_file):
+    result = grade(f"def add(a, b):\n    raise Exception(open({str(secret_file)!r}).read())")
+    assert result["verdict"] == "failed"
+    assert "do-not-leak" not in result["message"]
+    assert "FileNotFoundError" in result["message"]
+
+
+def test_bot_files_are_not_writable(tmp_path):
+    target = tmp_path / "bot.db"
+    target.write_bytes(b"")
+    result = grade(f"def add(a, b):\n    open({str(target)!r}, 'wb').write(b'x')")
+    assert result["verdict"] == "failed"
+    assert target.read_bytes() == b""
+
+
+def test_forged_results_on_inherited_fds_do_not_pass():
+    code = (
+        "import os\n"
+        "for fd in range(3, 10):\n"
+        "    try:\n"
+        "        os.write(fd, b'{\"results\": [{\"value\": 3}, {\"value\": 4}]}\\n')\n"
+        "    except OSError:\n"
+        "        pass\n"
+        "os._exit(0)\n"
+    )
+    assert grade(code)["verdict"] == "error"
+
+
+def test_network_is_unreachable_even_through_the_c_module():
+    code = "import _socket\ndef add(a, b):\n    _socket.socket().connect(('1.1.1.1', 80))"
+    result = grade(code)
+    assert result["verdict"] == "failed"
+    assert "OSError" in result["message"]
+
+
+def test_submission_runs_unprivileged():
+    result = grade("import os\ndef add(a, b):\n    return os.getuid()")
+    assert "got 0" not in result["message"]
+
+
+def test_fork_bomb_is_bounded():
+    code = (
+        "import os, time\n"
+        "def add(a, b):\n"
+        "    forks = 0\n"
+        "    try:\n"
+        "        while forks < 10000:\n"
+        "            if os.fork() == 0:\n"
+        "                time.sleep(60)\n"
+        "            forks += 1\n"
+        "    except OSError:\n"
+        "        return -1\n"
+        "    return forks\n"
+    )
+    result = grade(code)
+    assert "got -1" in result["message"]
+    # The sleeping children die with the submission's process
+    for _ in range(20):
+        if not subprocess.run(["pgrep", "-f", "sandbox/harness.py"], capture_output=True).stdout:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("Sandbox processes left behind")
+
+
+def test_endless_loop_times_out(short_timeout):
+    assert grade("def add(a, b):\n    while True:\n        pass")["verdict"] == "error"
+
+
+def test_long_messages_are_truncated():
+    result = grade("def add(a, b):\n    raise ValueError('x' * 5000)")
+    assert len(result["message"]) <= pool_module.SANDBOX_MESSAGE_MAX_CHARS
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="node not installed")
+def test_javascript_escape_from_vm_stays_in_the_jail(secret_file):
+    code = (
+        "const p = this.constructor.constructor('return process')();\n"
+        "function add(a, b) {\n"
+        f"    return p.mainModule.require('fs').readFileSync({json.dumps(str(secret_file))}, 'utf8');\n"
+        "}\n"
+    )
+    result = grade(code, "javascript")
+    assert result["verdict"] == "failed"
+    assert "do-not-leak" not in result["message"]
+
+
+def test_nothing_runs_when_the_jail_cannot_be_set_up(monkeypatch):
+    failing = [sys.executable, "-c", 'print(\'{"error": "sandbox", "message": "unshare: EPERM"}\')']
+    monkeypatch.setattr(SandboxPool, "_command", lambda self, language: failing)
+    
+    async def run():
+        pool = SandboxPool(size=1)
+        await pool.start()
+        try:
+            return pool.unavailable, await pool.grade(CHALLENGE["solution"], "python", CHALLENGE)
+        finally:
+            await pool.close()
+    
+    unavailable, result = asyncio.run(run())
+    assert unavailable == "unshare: EPERM"
+    assert result["verdict"] == "skipped"
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+import aiosqlite
+import pytest
+from database.db import Database
+from bot.utils.segments import Segment, parse_segment, stream_user_id_batches
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    
+    async def setup():
+        await db.init_db()
+        await db.add_challenge("Add", "Add two numbers", "easy", "python", "[]", None, 10)
+        for user_id in range(1, 7):
+            await db.create_user(user_id, f"user{user_id}")
+        await db.update_user_stats(1, level=5, streak=4)
+        await db.update_user_stats(2, level=2, streak=0)
+        await db.update_user_stats(3, level=12, streak=10)
+        await db.update_user_stats(4, level=7, streak=3)
+        await db.add_submission(1, 1, "print(1)", "python", "completed", "", 10)
+        await db.add_submission(4, 1, "console.log(1)", "javascript", "failed", "", 0)
+        await db.ban_user(3, 99)
+    
+    asyncio.run(setup())
+    return db
+
+
+def matching(db, segment):
+    async def run():
+        return [user_id async for batch in stream_user_id_batches(db, segment, batch_size=2) for user_id in batch]
+    return asyncio.run(run())
+
+
+def test_filters_are_parsed():
+    segment = parse_segment("active=7, level=3-10 streak=2 unsolved lang=Python")
+    assert segment.to_dict() == {
+        "active_days": 7, "min_level": 3, "max_level": 10, "min_streak": 2,
+        "not_solved_today": True, "language": "python"
+    }
+    assert parse_segment("level=5").to_dict() == {"min_level": 5}
+    assert parse_segment("all").to_dict() == {}
+    assert Segment.from_json(segment.to_json()).to_dict() == segment.to_dict()
+    assert parse_segment("level=3-10").describe() == "level 3-10"
+
+
+@pytest.mark.parametrize("text", ["lang=cobol", "active=soon", "unsolved=1", "banned", "level=a-b"])
+def test_invalid_filters_are_rejected(text):
+    with pytest.raises(ValueError, match="Invalid filter"):
+        parse_segment(text)
+
+
+def test_banned_users_are_never_matched(db):
+    assert matching(db, Segment()) == [1, 2, 4, 5, 6]
+    assert matching(db, parse_segment("level=5")) == [1, 4]
+
+
+def test_conditions_are_combined(db):
+    assert matching(db, parse_segment("level=3-6 streak=3")) == [1]
+    assert matching(db, parse_segment("unsolved")) == [2, 4, 5, 6]
+    assert matching(db, parse_segment("lang=javascript")) == [4]
+    assert matching(db, parse_segment("active=1 lang=python")) == [1]
+
+
+def test_inactive_users_are_left_out(db):
+    async def age(user_id):
+        async with aiosqlite.connect(db.db_path) as conn:
+            await conn.execute(
+                "UPDATE users SET last_active = ? WHERE user_id = ?",
+                ((datetime.now() - timedelta(days=10)).isoformat(), user_id)
+            )
+            await conn.commit()
+    
+    asyncio.run(age(2))
+    assert matching(db, parse_segment("active=7")) == [1, 4, 5, 6]
+    assert matching(db, parse_segment("active=30")) == [1, 2, 4, 5, 6]
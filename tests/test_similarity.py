@@ -0,0 +1,147 @@
+import asyncio
+from datetime import datetime
+import pytest
+from database.db import Database
+from bot.ai.review_cache import ReviewCache
+from bot.handlers import submissions
+from bot.utils import minhash
+from bot.utils.admin_utils import escape_markdown
+from bot.utils.review_queue import ReviewQueue
+from bot.utils.similarity import SimilarityIndex
+
+SOLUTION = """
+def two_sum(nums, target):
+    seen = {}
+    for i, num in enumerate(nums):
+        if target - num in seen:
+            return [seen[target - num], i]
+        seen[num] = i
+    return []
+"""
+
+RENAMED = """
+def two_sum(values, goal):
+    # Remember where each value was
+    index = {}
+    for j, value in enumerate(values):
+        if goal - value in index:
+            return [index[goal - value], j]
+        index[value] = j
+    return []
+"""
+
+DIFFERENT = """
+def two_sum(nums, target):
+    for i in range(len(nums)):
+        for j in range(i + 1, len(nums)):
+            if nums[i] + nums[j] == target:
+                return [i, j]
+    return None
+"""
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    return db
+
+
+def test_renamed_identifiers_and_comments_do_not_change_the_signature():
+    assert minhash.code_tokens("x = 1  # one", "python") == ["$", "=", "0"]
+    a = minhash.signature(SOLUTION, "python")
+    assert minhash.similarity(a, minhash.signature(RENAMED, "python")) == 1.0
+    assert minhash.similarity(a, minhash.signature(DIFFERENT, "python")) < 0.5
+    assert minhash.signature("   ", "python") is None
+
+
+def test_signatures_survive_storage():
+    sig = minhash.signature(SOLUTION, "python")
+    assert minhash.from_blob(minhash.to_blob(sig)) == sig
+    assert minhash.band_hashes(minhash.from_blob(minhash.to_blob(sig))) == minhash.band_hashes(sig)
+
+
+def test_index_finds_near_duplicates_within_a_challenge_only():
+    index = SimilarityIndex()
+    index.add(1, 10, 100, minhash.signature(SOLUTION, "python"))
+    index.add(2, 10, 200, minhash.signature(DIFFERENT, "python"))
+    index.add(3, 11, 300, minhash.signature(SOLUTION, "python"))
+    
+    matches = index.query(10, minhash.signature(RENAMED, "python"))
+    assert [(m['submission_id'], m['user_id'], m['score']) for m in matches] == [(1, 100, 1.0)]
+    assert index.query(12, minhash.signature(RENAMED, "python")) == []
+    
+    index.remove(user_id=100)
+    assert index.query(10, minhash.signature(RENAMED, "python")) == []
+
+
+def test_index_is_rebuilt_from_stored_submissions(db):
+    async def run():
+        await db.create_user(100, "alice")
+        challenge_id = await db.add_challenge("Two Sum", "Find two numbers", "easy", "python", "[]", None, 10)
+        submission_id = await db.add_submission(100, challenge_id, SOLUTION, "python", "completed", "ok", 10)
+        index = SimilarityIndex(db)
+        await index.load()
+        return submission_id, index.query(challenge_id, minhash.signature(RENAMED, "python"))
+    
+    submission_id, matches = asyncio.run(run())
+    assert [m['submission_id'] for m in matches] == [submission_id]
+
+
+def test_usernames_are_escaped_for_markdown():
+    assert escape_markdown("john_doe*[x]`") == "john\\_doe\\*\\[x]\\`"
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+    
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(text)
+
+
+@pytest.mark.parametrize("tests_verdict, reused", [("passed", True), ("skipped", False)])
+def test_near_duplicate_reviews_are_reused_only_once_tests_pass(db, monkeypatch, tests_verdict, reused):
+    ai_reviews = []
+    
+    async def grade(code, language, challenge):
+        passed = 2 if tests_verdict == "passed" else 0
+        return {"verdict": tests_verdict, "passed": passed, "total": passed, "message": "", "elapsed_ms": 1}
+    
+    async def review_code(code, language, description, **kwargs):
+        ai_reviews.append(code)
+        return {"feedback": "Fresh review", "verdict": {"verdict": "fail", "score": 3, "issues": []}}
+    
+    index = SimilarityIndex(db)
+    cache = ReviewCache(db)
+    monkeypatch.setattr(submissions, "db", db)
+    monkeypatch.setattr(submissions, "review_cache", cache)
+    monkeypatch.setattr(submissions, "similarity_index", index)
+    monkeypatch.setattr(submissions.ai_quota, "db", db)
+    monkeypatch.setattr(submissions.sandbox, "grade", grade)
+    monkeypatch.setattr(submissions.ai_client, "review_code", review_code)
+    monkeypatch.setattr(submissions, "INCREMENTAL_REVIEW_ENABLED", False)
+    
+    async def run():
+        await db.create_user(100, "alice")
+        await db.create_user(200, "bob")
+        challenge_id = await db.add_challenge("Two Sum", "Find two numbers", "easy", "python", "[]", None, 10)
+        # Alice's solution was reviewed as correct
+        verdict = {"verdict": "pass", "score": 9, "issues": []}
+        await db.add_submission(100, challenge_id, SOLUTION, "python", "completed", "Great job", 10,
+                                verdict=verdict, signature=minhash.signature(SOLUTION, "python"))
+        await cache.put(challenge_id, "python", SOLUTION, "completed", "Great job", verdict)
+        await index.load()
+        
+        # Bob's renamed copy looks identical to the signatures
+        queue = ReviewQueue(db)
+        await queue.enqueue(200, 200, challenge_id, RENAMED, "python")
+        job = await db.claim_review_job(datetime.now())
+        bot = RecordingBot()
+        await queue._process(bot, submissions.process_review_job, job)
+        return bot.sent[0], await db.get_user(200)
+    
+    text, user = asyncio.run(run())
+    assert ("Great job" in text) is reused
+    assert ai_reviews == ([] if reused else [RENAMED])
+    assert user['completed_challenges'] == (1 if reused else 0)
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from database.db import Database
+from bot.utils.spaced_repetition import (
+    InterviewScheduler, MIN_EASE_FACTOR, INITIAL_EASE_FACTOR, grade_from_score, sm2
+)
+
+
+class Store:
+    """Question store over a fixed list."""
+    
+    def __init__(self, questions):
+        self.questions = {question['id']: question for question in questions}
+    
+    async def get(self, question_id):
+        question = self.questions.get(question_id)
+        return dict(question) if question else None
+    
+    async def get_random(self, category=None):
+        for question in self.questions.values():
+            if not category or question['category'] == category:
+                return dict(question)
+        return None
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    asyncio.run(db.init_db())
+    asyncio.run(db.create_user(1, "alice"))
+    return db
+
+
+def test_scores_map_to_grades():
+    assert [grade_from_score(score) for score in (0, 1, 5, 6, 10)] == [0, 0, 2, 3, 5]
+    assert grade_from_score(15) == 5
+
+
+def test_passing_reviews_grow_the_interval():
+    state = sm2(0, 0, INITIAL_EASE_FACTOR, 5)
+    assert state == (1, 1, pytest.approx(2.6))
+    state = sm2(*state, 5)
+    assert state[:2] == (2, 6)
+    assert sm2(*state, 4)[:2] == (3, round(6 * state[2]))
+
+
+def test_failed_review_starts_over_and_ease_has_a_floor():
+    repetitions, interval_days, ease_factor = sm2(4, 30, 1.4, 0)
+    assert (repetitions, interval_days) == (0, 1)
+    assert ease_factor == MIN_EASE_FACTOR
+
+
+def test_due_questions_come_before_new_ones(db):
+    store = Store([
+        {"id": 1, "category": "python", "question": "GIL?"},
+        {"id": 2, "category": "sql", "question": "Indexes?"},
+    ])
+    scheduler = InterviewScheduler(db, store)
+    
+    async def run():
+        new = await scheduler.next_question(1)
+        due_at = await scheduler.record(1, new['id'], 10)
+        # Not due yet, and a seen question is not offered as new while others remain
+        upcoming = await scheduler.next_question(1, "sql")
+        await db.save_interview_review(
+            1, 2, 1, 1, INITIAL_EASE_FACTOR, 4, (datetime.now() - timedelta(hours=1)).isoformat()
+        )
+        return new, due_at, upcoming, await scheduler.next_question(1)
+    
+    new, due_at, upcoming, due = asyncio.run(run())
+    assert new['id'] == 1 and new['due'] is False
+    assert timedelta(hours=23) < due_at - datetime.now() <= timedelta(days=1)
+    assert upcoming['id'] == 2 and upcoming['due'] is False
+    assert due['id'] == 2 and due['due'] is True
@@ -0,0 +1,55 @@
+from datetime import datetime, time, timedelta, timezone
+import pytest
+from bot.utils import timezones
+from bot.utils.timezones import get_zone, local_date, parse_timezone, zones_reaching
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("europe/berlin", "Europe/Berlin"),
+    (" UTC ", "UTC"),
+    ("+3", "Etc/GMT-3"),
+    ("UTC-5", "Etc/GMT+5"),
+    ("utc+00:00", "UTC"),
+    ("+05:30", "UTC+05:30"),
+    ("-0930", "UTC-09:30"),
+    ("+15", None),
+    ("+3:75", None),
+    ("Mars/Olympus", None),
+])
+def test_parse_timezone(text, expected):
+    assert parse_timezone(text) == expected
+
+
+def test_offsets_with_minutes_become_fixed_zones():
+    assert get_zone("UTC+05:30").utcoffset(None) == timedelta(hours=5, minutes=30)
+    assert get_zone("UTC-09:30").utcoffset(None) == -timedelta(hours=9, minutes=30)
+    assert get_zone("Nowhere/Special") is timezone.utc
+
+
+def test_local_date_uses_the_default_zone_when_unset(monkeypatch):
+    monkeypatch.setattr(timezones, "DEFAULT_TIMEZONE", "Asia/Tokyo")
+    now = datetime(2024, 3, 1, 20, 0, tzinfo=timezone.utc)
+    assert local_date({"timezone": None}, now).day == 2
+    assert local_date({"timezone": "America/New_York"}, now).day == 1
+
+
+def test_zones_reaching_a_local_time():
+    zones = [None, "Europe/Berlin", "Etc/GMT-3", "UTC+05:30", "America/New_York"]
+    # 06:00 UTC is 09:00 at UTC+3 only
+    start = datetime(2024, 1, 15, 5, 55, tzinfo=timezone.utc)
+    assert zones_reaching(zones, time(9), start, start + timedelta(minutes=5)) == ["Etc/GMT-3"]
+    # The window end is inclusive, the start exclusive
+    start = datetime(2024, 1, 15, 3, 30, tzinfo=timezone.utc)
+    assert zones_reaching(zones, time(9), start, start + timedelta(minutes=5)) == []
+    assert zones_reaching(zones, time(9), start - timedelta(minutes=5), start) == ["UTC+05:30"]
+
+
+def test_zones_reaching_across_midnight_and_dst():
+    # 23:30 in New York on a summer day (UTC-4) is 03:30 UTC the next day
+    start = datetime(2024, 7, 2, 3, 0, tzinfo=timezone.utc)
+    assert zones_reaching(["America/New_York"], time(23, 30), start, start + timedelta(hours=1)) == [
+        "America/New_York"
+    ]
+    # In winter (UTC-5) the same window misses it
+    start = datetime(2024, 1, 2, 3, 0, tzinfo=timezone.utc)
+    assert zones_reaching(["America/New_York"], time(23, 30), start, start + timedelta(hours=1)) == []
@@ -0,0 +1,38 @@
+from bot.ai.token_budget import (
+    CHARS_PER_TOKEN, estimate_tokens, fit_code, response_token_budget, strip_comments
+)
+from bot.config import MISTRAL_CONTEXT_WINDOW, MISTRAL_MIN_RESPONSE_TOKENS
+
+
+def test_small_code_is_sent_unchanged():
+    code = "def f(x):\n    # add one\n    return x + 1\n"
+    assert fit_code(code, "python", 100) == code
+
+
+def test_comments_are_stripped_but_not_inside_strings():
+    python = 'url = "http://x#y"  # the url\n\n# note\nprint(url)\n'
+    assert strip_comments(python, "python") == 'url = "http://x#y"\nprint(url)'
+    js = 'const s = "a // b"; /* block\n comment */ // line\nlet t = 1;'
+    assert strip_comments(js, "javascript") == 'const s = "a // b";\nlet t = 1;'
+
+
+def test_large_code_keeps_head_and_tail_within_budget():
+    lines = [f"x{i} = {i}  # value {i}" for i in range(1000)]
+    fitted = fit_code("\n".join(lines), "python", 200)
+    assert estimate_tokens(fitted) <= 200 + 10
+    assert fitted.startswith("x0 = 0\n")
+    assert fitted.endswith("x999 = 999")
+    assert "lines omitted" in fitted
+    assert "# value" not in fitted
+
+
+def test_single_huge_line_is_sliced():
+    fitted = fit_code("x" * 10000, "javascript", 100)
+    assert "[truncated]" in fitted
+    assert len(fitted) <= 100 * CHARS_PER_TOKEN + 30
+
+
+def test_response_budget_fits_the_context_window():
+    assert response_token_budget(100, 500) == 500
+    assert response_token_budget(MISTRAL_CONTEXT_WINDOW - 300, 1000) == max(300, MISTRAL_MIN_RESPONSE_TOKENS)
+    assert response_token_budget(MISTRAL_CONTEXT_WINDOW, 1000) == MISTRAL_MIN_RESPONSE_TOKENS
@@ -0,0 +1,41 @@
+from bot.ai.verdict import (
+    MAX_ISSUES, parse_review, validate_verdict, verdict_columns, verdict_from_row
+)
+
+
+def test_fenced_verdict_is_split_from_the_feedback():
+    text = '```json\n{"verdict": "pass", "score": 8, "issues": ["Missing edge case"]}\n```\n\nNice work!'
+    verdict, feedback = parse_review(text)
+    assert verdict == {"verdict": "pass", "score": 8, "issues": ["Missing edge case"]}
+    assert feedback == "Nice work!"
+
+
+def test_bare_json_verdict_is_accepted():
+    verdict, feedback = parse_review('  {"verdict": "FAIL", "score": 3} Off by one in the loop.')
+    assert verdict == {"verdict": "fail", "score": 3, "issues": []}
+    assert feedback == "Off by one in the loop."
+
+
+def test_missing_or_invalid_verdict_keeps_the_whole_text():
+    for text in ("Just prose, no JSON.", '{"verdict": "maybe"} text', '```json\n{"verdict": \n```', None):
+        verdict, feedback = parse_review(text)
+        assert verdict is None
+        assert feedback == text
+
+
+def test_verdict_values_are_normalized():
+    verdict = validate_verdict({"verdict": True, "score": 14.6, "issues": [" a ", "", 3] + ["x"] * 10})
+    assert verdict["verdict"] == "pass"
+    assert verdict["score"] == 10
+    assert verdict["issues"][:2] == ["a", "3"]
+    assert len(verdict["issues"]) == MAX_ISSUES
+    assert validate_verdict({"verdict": "pass", "score": True})["score"] is None
+    assert validate_verdict(["pass"]) is None
+
+
+def test_stored_columns_round_trip():
+    verdict = {"verdict": "fail", "score": 4, "issues": ["Слишком медленно"]}
+    stored = dict(zip(("verdict", "review_score", "review_issues"), verdict_columns(verdict)))
+    assert verdict_from_row(stored) == verdict
+    assert verdict_columns(None) == (None, None, None)
+    assert verdict_from_row({"verdict": None}) is None